@@ -0,0 +1,239 @@
+# api.py - Versioned JSON API with cursor pagination, ETags and batch sale posting
+import base64
+from datetime import date, datetime
+from functools import wraps
+from flask import Blueprint, jsonify, request, make_response
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from database import (db, Item, Supplier, Customer, Employee, WorkerTask, PurchaseOrder, PurchaseItem,
+                      SalesOrder, SaleItem, AccountsPayable, AccountsReceivable)
+from data_versions import table_versions, make_etag
+from barcodes import barcode_index
+import pos_sales
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Exposed fields and equality filters per resource
+RESOURCES = {
+    'items': {
+        'model': Item,
+        'fields': ['id', 'sku', 'name', 'category', 'current_stock', 'min_stock_level', 'cost_price',
+                   'selling_price', 'hsn_code', 'gst_rate', 'preferred_supplier_id', 'created_date',
+                   'tally_synced', 'version'],
+        'filters': ['sku', 'category', 'hsn_code', 'preferred_supplier_id'],
+    },
+    'suppliers': {
+        'model': Supplier,
+        'fields': ['id', 'name', 'contact_person', 'phone', 'email', 'address', 'gst_number',
+                   'tally_synced', 'version'],
+        'filters': ['gst_number'],
+    },
+    'customers': {
+        'model': Customer,
+        'fields': ['id', 'name', 'phone', 'email', 'address', 'gst_number', 'credit_limit',
+                   'outstanding_balance', 'tally_synced', 'version'],
+        'filters': ['phone', 'gst_number'],
+    },
+    'workers': {
+        'model': Employee,
+        'fields': ['id', 'name', 'role', 'department', 'hourly_rate', 'commission_rate', 'phone', 'email', 'join_date',
+                   'version'],
+        'filters': ['role', 'department'],
+    },
+    'tasks': {
+        'model': WorkerTask,
+        'fields': ['id', 'employee_id', 'task_type', 'description', 'assigned_date', 'due_date', 'status',
+                   'completed_date', 'priority', 'version'],
+        'filters': ['employee_id', 'status', 'priority'],
+    },
+    'purchase_orders': {
+        'model': PurchaseOrder,
+        'fields': ['id', 'po_number', 'supplier_id', 'order_date', 'total_amount', 'status', 'tally_synced',
+                   'warehouse_id', 'version'],
+        'filters': ['supplier_id', 'status', 'warehouse_id'],
+        'lines': (PurchaseItem, 'purchase_order_id', ['id', 'item_id', 'quantity', 'unit_cost', 'total_cost',
+                                                      'lot_number', 'expiry_date']),
+    },
+    'sales_orders': {
+        'model': SalesOrder,
+        'fields': ['id', 'invoice_number', 'customer_id', 'employee_id', 'sale_date', 'total_amount',
+                   'gst_amount', 'discount', 'status', 'tally_synced', 'warehouse_id', 'customer_gstin',
+                   'place_of_supply', 'inter_state', 'version'],
+        'filters': ['customer_id', 'employee_id', 'status', 'warehouse_id'],
+        'lines': (SaleItem, 'sales_order_id', ['id', 'item_id', 'employee_id', 'quantity', 'unit_price',
+                                                'total_price', 'discount', 'gst_rate', 'taxable_value',
+                                                'tax_amount']),
+    },
+    'payables': {
+        'model': AccountsPayable,
+        'fields': ['id', 'purchase_order_id', 'supplier_id', 'due_date', 'amount', 'status', 'paid_date',
+                   'version'],
+        'filters': ['supplier_id', 'status'],
+    },
+    'receivables': {
+        'model': AccountsReceivable,
+        'fields': ['id', 'sales_order_id', 'customer_id', 'due_date', 'amount', 'status', 'paid_date',
+                   'version'],
+        'filters': ['customer_id', 'status'],
+    },
+}
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+@api.errorhandler(ApiError)
+def handle_api_error(error):
+    return jsonify({'error': error.message}), error.status
+
+def api_login_required(f):
+    # JSON 401 instead of the login page redirect used by the HTML views
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def _resource(name):
+    resource = RESOURCES.get(name)
+    if not resource:
+        raise ApiError(f'Unknown resource: {name}', 404)
+    return resource
+
+def _selected_fields(resource):
+    """Sparse fieldset from ?fields=a,b,c; id is always included"""
+    requested = request.args.get('fields')
+    if not requested:
+        return resource['fields']
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in resource['fields']]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    return ['id'] + [field for field in fields if field != 'id']
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _row_dict(fields, row):
+    return {field: _serialize(value) for field, value in zip(fields, row)}
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError('Invalid cursor')
+
+def _conditional(etag, build):
+    """304 when the client already has this ETag, otherwise the JSON body from build()"""
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(jsonify(build()))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@api.route('/<resource_name>')
+@api_login_required
+def list_resource(resource_name):
+    resource = _resource(resource_name)
+    model = resource['model']
+    fields = _selected_fields(resource)
+
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    after_id = decode_cursor(request.args['cursor']) if request.args.get('cursor') else 0
+    filters = {key: value for key, value in request.args.items() if key in resource['filters']}
+
+    # The table counter changes on any insert, update or delete, so it is enough to
+    # answer a conditional request without touching the resource table itself
+    etag = make_etag(resource_name, table_versions(model.__tablename__), fields, limit, after_id,
+                     sorted(filters.items()))
+
+    def build():
+        query = db.session.query(*[getattr(model, field) for field in fields]) \
+            .filter(model.id > after_id, *[getattr(model, key) == value for key, value in filters.items()]) \
+            .order_by(model.id).limit(limit + 1)
+        rows = query.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'data': [_row_dict(fields, row) for row in rows],
+            'next_cursor': encode_cursor(rows[-1][0]) if has_more else None,
+            'has_more': has_more
+        }
+
+    return _conditional(etag, build)
+
+@api.route('/<resource_name>/<int:resource_id>')
+@api_login_required
+def get_resource(resource_name, resource_id):
+    resource = _resource(resource_name)
+    model = resource['model']
+    fields = _selected_fields(resource)
+    lines = resource.get('lines')
+
+    version = db.session.query(model.version).filter(model.id == resource_id).scalar()
+    if version is None:
+        raise ApiError(f'{resource_name} {resource_id} not found', 404)
+    line_version = table_versions(lines[0].__tablename__) if lines else ()
+    etag = make_etag(resource_name, resource_id, version, line_version, fields)
+
+    def build():
+        row = db.session.query(*[getattr(model, field) for field in fields]).filter(model.id == resource_id).one()
+        data = _row_dict(fields, row)
+        if lines:
+            line_model, foreign_key, line_fields = lines
+            data['lines'] = [_row_dict(line_fields, line) for line in
+                             db.session.query(*[getattr(line_model, field) for field in line_fields])
+                             .filter(getattr(line_model, foreign_key) == resource_id)
+                             .order_by(line_model.id)]
+        return {'data': data}
+
+    return _conditional(etag, build)
+
+@api.route('/barcodes/<code>')
+@api_login_required
+def lookup_barcode(code):
+    """Scanner lookup by barcode or SKU; ?warehouse_id= adds the stock at that location"""
+    result = barcode_index.lookup(code, request.args.get('warehouse_id', type=int))
+    if result is None:
+        raise ApiError(f'No item with barcode or SKU {code}', 404)
+    return jsonify({'data': result})
+
+@api.route('/sales/batch', methods=['POST'])
+@api_login_required
+def post_sales_batch():
+    payload = request.get_json(silent=True)
+    sales = payload.get('sales') if isinstance(payload, dict) else None
+    if not isinstance(sales, list) or not sales:
+        raise ApiError('Body must be a JSON object with a non-empty "sales" array')
+    if len(sales) > pos_sales.MAX_BATCH_SIZE:
+        raise ApiError(f'At most {pos_sales.MAX_BATCH_SIZE} sales per batch')
+
+    try:
+        results = pos_sales.post_sales(sales)
+    except (pos_sales.StockConflict, IntegrityError):
+        # Nothing was committed; retrying is safe because posted keys come back as duplicates
+        db.session.rollback()
+        raise ApiError('Stock or sales changed while posting, please retry the batch', 409)
+    except Exception:
+        db.session.rollback()
+        raise
+
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in ('posted', 'duplicate', 'rejected')}
+    return jsonify({'results': results, **counts})
@@ -1,34 +1,84 @@
 # app.py - COMPLETE WORKING VERSION
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Flask, Response, stream_with_context, render_template, request, redirect, url_for, flash, jsonify, send_file
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+import click
 import random
 import os
-import pandas as pd
 from io import BytesIO
 import shutil
+import tempfile
+import threading
+import time
 from functools import wraps
+from sqlalchemy.orm import selectinload
 
 # Import database after initializing app to avoid circular imports
-from database import db, User, Item, Supplier, Customer, Employee, PurchaseOrder, PurchaseItem, SalesOrder, SaleItem, AccountsPayable, AccountsReceivable, WorkerTask, StockAlert, TallySyncLog, SystemLog, BackupLog
-from tally_integration import TallyIntegration
+from database import db, User, Item, Supplier, Customer, Employee, PurchaseOrder, PurchaseItem, SalesOrder, SaleItem, AccountsPayable, AccountsReceivable, WorkerTask, EmployeePerformance, StockAlert, TallySyncLog, SystemLog, BackupLog, StockMovement, ItemImportBatch, ItemImportRow, Warehouse, StockTransfer
+from credit_control import apply_receivable, settle_receivable, check_credit_limit, reconcile_customer_balances
+import sales_analytics
+import inventory_valuation
+import stock_ledger
+import reorder_engine
+import stock_alerts
+import warehouses
+import lots
+import tax
+import documents
+import commissions
+import item_import
+import data_versions
+import reference_data
+import migrations
+from cache import reference_cache
+from template_cache import fragment_cache
+from user_cache import user_cache
+from events import event_bus, format_sse
+from barcodes import barcode_index, set_item_barcodes, parse_codes, BarcodeError
+from documents import document_cache
+from passwords import hash_password, verify_password, login_throttle
+from api import api
+from config import Config
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'inventory-system-secret-key-2024'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///inventory.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///inventory.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['CACHE_TTL'] = 300
+# Password hashing policy: 'pbkdf2' (default), 'pbkdf2-fast', 'scrypt' or any Werkzeug method string.
+# Existing hashes are upgraded the next time each user logs in.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2')
+app.config['LOGIN_RATE_LIMIT_IP'] = (20, 60)     # attempts per IP per 60 seconds
+app.config['LOGIN_RATE_LIMIT_USER'] = (5, 300)   # failed attempts per username per 5 minutes
+app.config['LOGIN_HASH_CONCURRENCY'] = None      # concurrent password checks, defaults to CPU count
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL')  # optional, shares the cache across processes
+app.config['EVENTS_REDIS_URL'] = os.environ.get('EVENTS_REDIS_URL')  # optional, relays live events across processes
+app.config['EVENTS_MAX_SUBSCRIBERS'] = 500      # open /events/stream connections per process
+app.config['EVENTS_HEARTBEAT'] = 15             # seconds between keep-alive comments
+app.config['EVENTS_STREAM_SECONDS'] = 300       # clients reconnect after this, resuming from Last-Event-ID
+app.config['BARCODE_CHECK_INTERVAL'] = 2.0      # seconds between checks for barcode edits by other processes
+app.config['DOCUMENT_CACHE_DIR'] = os.environ.get('DOCUMENT_CACHE_DIR')  # rendered invoices/POs, defaults to instance/documents
+app.config['DOCUMENT_RENDER_WORKERS'] = None     # processes for batch rendering, defaults to CPU count
 
 # Initialize extensions
 db.init_app(app)
+reference_cache.init_app(app)
+fragment_cache.init_app(app)
+user_cache.init_app(app)
+login_throttle.init_app(app)
+event_bus.init_app(app)
+barcode_index.init_app(app)
+document_cache.init_app(app)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+app.register_blueprint(api)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load(user_id)
 
 def admin_required(f):
     @wraps(f)
@@ -65,8 +115,10 @@ def update_stock_alert(item_id):
     try:
         item = Item.query.get(item_id)
         if item:
-            # Remove existing unresolved alerts for this item
-            StockAlert.query.filter_by(item_id=item_id, resolved=False).delete()
+            # Remove existing unresolved stock level alerts for this item; expiry alerts have their own scan
+            StockAlert.query.filter(StockAlert.item_id == item_id, StockAlert.resolved == False,  # noqa: E712
+                                    StockAlert.alert_type.in_(stock_alerts.STOCK_ALERT_TYPES)) \
+                .delete(synchronize_session=False)
             
             if item.current_stock <= 0:
                 alert = StockAlert(
@@ -82,29 +134,47 @@ def update_stock_alert(item_id):
                     message=f'Low stock alert: {item.name} has only {item.current_stock} units left'
                 )
                 db.session.add(alert)
+
+            # Locations with their own reorder level
+            for warehouse_id, warehouse_name, quantity in stock_alerts.location_shortfalls(item_id):
+                db.session.add(StockAlert(
+                    item_id=item_id,
+                    warehouse_id=warehouse_id,
+                    alert_type='out_of_stock' if quantity <= 0 else 'low_stock',
+                    message=(f'OUT OF STOCK at {warehouse_name}: {item.name} needs restocking' if quantity <= 0
+                             else f'Low stock at {warehouse_name}: {item.name} has only {quantity} units left')
+                ))
             
             db.session.commit()
     except Exception as e:
         print(f"Error updating stock alert: {e}")
         db.session.rollback()
 
+def dashboard_stats():
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'total_items': Item.query.count(),
+        'low_stock': StockAlert.query.filter_by(resolved=False).count(),
+        'total_payable': db.session.query(db.func.sum(AccountsPayable.amount)).filter_by(status='pending').scalar() or 0,
+        'total_receivable': db.session.query(db.func.sum(AccountsReceivable.amount)).filter_by(status='pending').scalar() or 0,
+        'pending_tasks': WorkerTask.query.filter_by(status='pending').count(),
+        # A range on sale_date can use ix_sales_order_date; date(sale_date) = ... cannot
+        'total_sales_today': db.session.query(db.func.sum(SalesOrder.total_amount)).filter(
+            SalesOrder.sale_date >= today, SalesOrder.sale_date < today + timedelta(days=1)
+        ).scalar() or 0
+    }
+
+def recent_stock_alerts(limit=5):
+    return StockAlert.query.filter_by(resolved=False).order_by(StockAlert.created_date.desc()).limit(limit).all()
+
 # Routes
 @app.route('/')
 @login_required
 def dashboard():
     try:
-        stats = {
-            'total_items': Item.query.count(),
-            'low_stock': StockAlert.query.filter_by(resolved=False).count(),
-            'total_payable': db.session.query(db.func.sum(AccountsPayable.amount)).filter_by(status='pending').scalar() or 0,
-            'total_receivable': db.session.query(db.func.sum(AccountsReceivable.amount)).filter_by(status='pending').scalar() or 0,
-            'pending_tasks': WorkerTask.query.filter_by(status='pending').count(),
-            'total_sales_today': db.session.query(db.func.sum(SalesOrder.total_amount)).filter(
-                db.func.date(SalesOrder.sale_date) == datetime.now().date()
-            ).scalar() or 0
-        }
-        
-        recent_alerts = StockAlert.query.filter_by(resolved=False).order_by(StockAlert.created_date.desc()).limit(5).all()
+        fragment_cache.load_versions()
+        stats = dashboard_stats()
+        recent_alerts = recent_stock_alerts()
         pending_tasks = WorkerTask.query.filter_by(status='pending').order_by(WorkerTask.due_date).limit(5).all()
         recent_sales = SalesOrder.query.order_by(SalesOrder.sale_date.desc()).limit(5).all()
         
@@ -113,6 +183,52 @@ def dashboard():
         flash(f'Error loading dashboard: {str(e)}', 'danger')
         return render_template('dashboard.html', stats={}, alerts=[], tasks=[], recent_sales=[], format_currency=format_currency)
 
+@app.route('/dashboard/live')
+@login_required
+def dashboard_live():
+    """Statistics and recent alerts for the live dashboard, fetched when an event arrives"""
+    try:
+        stats = dashboard_stats()
+        alerts = [{
+            'id': alert.id,
+            'item_name': alert.item.name if alert.item else '',
+            'alert_type': alert.alert_type,
+            'message': alert.message,
+            'created_date': alert.created_date.strftime('%Y-%m-%d %H:%M')
+        } for alert in recent_stock_alerts()]
+        display = {key: format_currency(stats[key]) for key in ('total_payable', 'total_receivable', 'total_sales_today')}
+        return jsonify({'stats': dict(stats, **display), 'alerts': alerts})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/events/stream')
+@login_required
+def event_stream():
+    """Server-Sent Events: alert, sale and purchase events as they commit"""
+    if event_bus.subscriber_count() >= app.config['EVENTS_MAX_SUBSCRIBERS']:
+        return Response('retry: 30000\n\n', status=503, mimetype='text/event-stream')
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0) or None
+    except ValueError:
+        last_event_id = None
+    heartbeat = app.config['EVENTS_HEARTBEAT']
+    deadline = time.monotonic() + app.config['EVENTS_STREAM_SECONDS']
+    subscription = event_bus.subscribe(last_event_id)
+
+    # Not wrapped in stream_with_context: the request context (and its pooled database
+    # connection) is released as soon as this view returns, so an idle stream holds no connection
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while time.monotonic() < deadline:
+                item = subscription.get(timeout=heartbeat)
+                yield format_sse(item) if item else ': keep-alive\n\n'
+        finally:
+            subscription.close()
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
@@ -122,14 +238,29 @@ def login():
             flash('Please enter both username and password', 'warning')
             return render_template('login.html')
         
+        refused = login_throttle.check(request.remote_addr or '-', username)
+        if refused:
+            flash(refused, 'danger')
+            return render_template('login.html'), 429
+        
         user = User.query.filter_by(username=username, is_active=True).first()
         
-        if user and check_password_hash(user.password, password):
+        try:
+            with login_throttle.hashing_slot():
+                valid = user is not None and verify_password(user, password)
+        except TimeoutError:
+            flash('The server is busy, please try again in a moment', 'warning')
+            return render_template('login.html'), 503
+        
+        if valid:
+            db.session.commit()  # saves a rehashed password when the policy changed
+            login_throttle.succeeded(username)
             login_user(user)
             log_activity('LOGIN', f'User {username} logged in')
             next_page = request.args.get('next')
             return redirect(next_page or url_for('dashboard'))
         else:
+            login_throttle.failed(username)
             flash('Invalid credentials or account disabled', 'danger')
     
     return render_template('login.html')
@@ -146,11 +277,15 @@ def logout():
 @login_required
 def items():
     try:
-        all_items = Item.query.all()
-        return render_template('items.html', items=all_items, format_currency=format_currency)
+        # Left as a query: it only runs when the cached items table fragment is stale
+        all_items = Item.query.options(selectinload(Item.barcodes))
+        suppliers = reference_data.supplier_options()
+        return render_template('items.html', items=all_items, suppliers=suppliers, gst_slabs=tax.GST_SLABS,
+                               default_gst_rate=Config.GST_PERCENT, format_currency=format_currency)
     except Exception as e:
         flash(f'Error loading items: {str(e)}', 'danger')
-        return render_template('items.html', items=[], format_currency=format_currency)
+        return render_template('items.html', items=[], suppliers=[], gst_slabs=tax.GST_SLABS,
+                               default_gst_rate=Config.GST_PERCENT, format_currency=format_currency)
 
 @app.route('/add_item', methods=['POST'])
 @login_required
@@ -163,6 +298,8 @@ def add_item():
         min_stock_level = float(request.form.get('min_stock_level', 5))
         cost_price = float(request.form.get('cost_price', 0))
         selling_price = float(request.form.get('selling_price', 0))
+        preferred_supplier_id = request.form.get('preferred_supplier_id') or None
+        hsn_code, gst_rate = tax.item_tax(request.form.get('hsn_code'), request.form.get('gst_rate'))
         
         if not name or not sku:
             flash('Name and SKU are required', 'warning')
@@ -175,15 +312,23 @@ def add_item():
         
         item = Item(
             name=name, sku=sku, category=category, current_stock=current_stock,
-            min_stock_level=min_stock_level, cost_price=cost_price, selling_price=selling_price
+            min_stock_level=min_stock_level, cost_price=cost_price, selling_price=selling_price,
+            preferred_supplier_id=preferred_supplier_id, hsn_code=hsn_code, gst_rate=gst_rate
         )
         
+        set_item_barcodes(item, parse_codes(request.form.get('barcodes')))
         db.session.add(item)
+        db.session.flush()
+        inventory_valuation.adjust_layers(item, current_stock, source='opening')
+        stock_ledger.record_movement(item.id, current_stock, 'opening', 'Item', item.id)
         db.session.commit()
         
         update_stock_alert(item.id)
         log_activity('ADD_ITEM', f'Added item: {name} (SKU: {sku})')
         flash('Item added successfully', 'success')
+    except (BarcodeError, tax.TaxError) as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
     except Exception as e:
         db.session.rollback()
         flash(f'Error adding item: {str(e)}', 'danger')
@@ -199,10 +344,17 @@ def edit_item(item_id):
             item.name = request.form.get('name')
             item.sku = request.form.get('sku')
             item.category = request.form.get('category')
-            item.current_stock = float(request.form.get('current_stock', 0))
+            new_stock = float(request.form.get('current_stock', 0))
             item.min_stock_level = float(request.form.get('min_stock_level', 5))
             item.cost_price = float(request.form.get('cost_price', 0))
             item.selling_price = float(request.form.get('selling_price', 0))
+            item.preferred_supplier_id = request.form.get('preferred_supplier_id') or None
+            item.hsn_code, item.gst_rate = tax.item_tax(request.form.get('hsn_code'), request.form.get('gst_rate'))
+            set_item_barcodes(item, parse_codes(request.form.get('barcodes')))
+            
+            inventory_valuation.adjust_layers(item, new_stock - (item.current_stock or 0))
+            stock_ledger.record_movement(item.id, new_stock - (item.current_stock or 0), 'adjustment', 'Item', item.id)
+            item.current_stock = new_stock
             
             db.session.commit()
             update_stock_alert(item.id)
@@ -210,6 +362,9 @@ def edit_item(item_id):
             flash('Item updated successfully', 'success')
         else:
             flash('Item not found', 'warning')
+    except (BarcodeError, tax.TaxError) as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
     except Exception as e:
         db.session.rollback()
         flash(f'Error updating item: {str(e)}', 'danger')
@@ -235,18 +390,90 @@ def delete_item(item_id):
     
     return redirect(url_for('items'))
 
+@app.route('/forecast_min_stock', methods=['POST'])
+@login_required
+def forecast_min_stock():
+    import demand_forecast  # numpy is only needed here
+    try:
+        method = request.form.get('method', 'ses')
+        if method not in demand_forecast.FORECAST_METHODS:
+            raise ValueError('Invalid forecast method')
+        updated = demand_forecast.apply_forecast(
+            history_days=int(request.form.get('history_days', 365)),
+            lead_time_days=int(request.form.get('lead_time_days', 7)),
+            service_level=float(request.form.get('service_level', 0.95)),
+            method=method,
+            dry_run=request.form.get('dry_run') == 'on'
+        )
+        if request.form.get('dry_run') == 'on':
+            flash(f'Forecast would update the minimum stock level of {updated} items', 'info')
+        else:
+            log_activity('FORECAST_MIN_STOCK', f'Updated min stock level of {updated} items from forecast')
+            flash(f'Minimum stock levels updated for {updated} items', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error running forecast: {str(e)}', 'danger')
+
+    return redirect(url_for('items'))
+
+@app.route('/import_items', methods=['POST'])
+@login_required
+def import_items():
+    try:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV or Excel file', 'warning')
+            return redirect(url_for('items'))
+
+        extension = os.path.splitext(upload.filename)[1].lower()
+        if extension not in ('.csv', '.xlsx'):
+            flash('Only .csv and .xlsx files can be imported', 'warning')
+            return redirect(url_for('items'))
+
+        handle, path = tempfile.mkstemp(suffix=extension, prefix='item_import_')
+        os.close(handle)
+        upload.save(path)
+
+        batch = ItemImportBatch(filename=upload.filename, user_id=current_user.id)
+        db.session.add(batch)
+        db.session.commit()
+
+        threading.Thread(target=item_import.run_import, args=(app, batch.id, path), daemon=True).start()
+        log_activity('IMPORT_ITEMS', f'Started item import from {upload.filename} (batch {batch.id})')
+        return redirect(url_for('import_items_progress', batch_id=batch.id))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error starting import: {str(e)}', 'danger')
+        return redirect(url_for('items'))
+
+@app.route('/import_items/<int:batch_id>')
+@login_required
+def import_items_progress(batch_id):
+    batch = ItemImportBatch.query.get_or_404(batch_id)
+    errors = ItemImportRow.query.filter(ItemImportRow.batch_id == batch_id, ItemImportRow.error.isnot(None)) \
+        .order_by(ItemImportRow.row_number).limit(500).all()
+    return render_template('item_import.html', batch=batch, progress=item_import.batch_progress(batch), errors=errors)
+
+@app.route('/import_items/<int:batch_id>/status')
+@login_required
+def import_items_status(batch_id):
+    batch = ItemImportBatch.query.get_or_404(batch_id)
+    return jsonify(item_import.batch_progress(batch))
+
 # Purchase Management
 @app.route('/purchase')
 @login_required
 def purchase():
     try:
         purchases = PurchaseOrder.query.all()
-        suppliers = Supplier.query.all()
-        items = Item.query.all()
-        return render_template('purchase.html', purchases=purchases, suppliers=suppliers, items=items, format_currency=format_currency)
+        suppliers = reference_data.supplier_options()
+        items = reference_data.item_options()
+        return render_template('purchase.html', purchases=purchases, suppliers=suppliers, items=items,
+                               warehouses=reference_data.warehouse_options(),
+                               supplier_names=reference_data.names(suppliers), format_currency=format_currency)
     except Exception as e:
         flash(f'Error loading purchases: {str(e)}', 'danger')
-        return render_template('purchase.html', purchases=[], suppliers=[], items=[], format_currency=format_currency)
+        return render_template('purchase.html', purchases=[], suppliers=[], items=[], warehouses=[], supplier_names={}, format_currency=format_currency)
 
 @app.route('/create_purchase', methods=['POST'])
 @login_required
@@ -256,15 +483,19 @@ def create_purchase():
         items = request.form.getlist('item_id[]')
         quantities = request.form.getlist('quantity[]')
         unit_costs = request.form.getlist('unit_cost[]')
+        lot_numbers = request.form.getlist('lot_number[]')
+        expiry_dates = request.form.getlist('expiry_date[]')
         
         if not supplier_id:
             flash('Supplier is required', 'warning')
             return redirect(url_for('purchase'))
+        warehouse_id = warehouses.resolve_warehouse_id(request.form.get('warehouse_id'))
         
         po = PurchaseOrder(
             supplier_id=supplier_id,
             po_number=generate_po_number(),
-            status='pending'
+            status='pending',
+            warehouse_id=warehouse_id
         )
         db.session.add(po)
         db.session.flush()
@@ -276,12 +507,17 @@ def create_purchase():
                 unit_cost = float(unit_costs[i])
                 total_cost = quantity * unit_cost
                 
+                lot_number = lot_numbers[i].strip() if i < len(lot_numbers) else ''
+                expiry_date = expiry_dates[i] if i < len(expiry_dates) else ''
+                
                 purchase_item = PurchaseItem(
                     purchase_order_id=po.id,
                     item_id=items[i],
                     quantity=quantity,
                     unit_cost=unit_cost,
-                    total_cost=total_cost
+                    total_cost=total_cost,
+                    lot_number=lot_number or None,
+                    expiry_date=datetime.strptime(expiry_date, '%Y-%m-%d').date() if expiry_date else None
                 )
                 db.session.add(purchase_item)
                 total_amount += total_cost
@@ -296,6 +532,24 @@ def create_purchase():
     
     return redirect(url_for('purchase'))
 
+@app.route('/approve_purchase/<int:po_id>')
+@login_required
+def approve_purchase(po_id):
+    try:
+        po = PurchaseOrder.query.get(po_id)
+        if po and po.status == 'draft':
+            po.status = 'pending'
+            db.session.commit()
+            log_activity('APPROVE_PURCHASE', f'Approved draft purchase order: {po.po_number}')
+            flash('Purchase order approved', 'success')
+        else:
+            flash('Purchase order not found or not a draft', 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error approving purchase: {str(e)}', 'danger')
+    
+    return redirect(url_for('purchase'))
+
 @app.route('/receive_purchase/<int:po_id>')
 @login_required
 def receive_purchase(po_id):
@@ -308,8 +562,14 @@ def receive_purchase(po_id):
             for purchase_item in po.items:
                 item = Item.query.get(purchase_item.item_id)
                 if item:
+                    inventory_valuation.record_purchase_layer(item, purchase_item)
+                    lots.receive_lot(purchase_item, po.warehouse_id)
+                    stock_ledger.record_movement(item.id, purchase_item.quantity, 'purchase', 'PurchaseOrder', po.id,
+                                                 warehouse_id=po.warehouse_id)
                     item.current_stock += purchase_item.quantity
                     update_stock_alert(purchase_item.item_id)
+            # A lot may arrive already inside the expiry warning window
+            stock_alerts.refresh_expiry_alerts([purchase_item.item_id for purchase_item in po.items])
             
             # Create payable entry
             payable = AccountsPayable(
@@ -333,18 +593,27 @@ def receive_purchase(po_id):
     return redirect(url_for('purchase'))
 
 # Sales Management
+@app.route('/purchase/<int:po_id>/document')
+@login_required
+def purchase_order_document(po_id):
+    return _document_response('purchase_order', po_id, 'purchase')
+
 @app.route('/sales')
 @login_required
 def sales():
     try:
         sales_orders = SalesOrder.query.all()
-        customers = Customer.query.all()
-        items = Item.query.all()
-        employees = Employee.query.all()
-        return render_template('sales.html', sales=sales_orders, customers=customers, items=items, employees=employees, format_currency=format_currency)
+        customers = reference_data.customer_options()
+        items = reference_data.item_options()
+        employees = reference_data.employee_options()
+        return render_template('sales.html', sales=sales_orders, customers=customers, items=items, employees=employees,
+                               warehouses=reference_data.warehouse_options(),
+                               customer_names=reference_data.names(customers), employee_names=reference_data.names(employees),
+                               format_currency=format_currency)
     except Exception as e:
         flash(f'Error loading sales: {str(e)}', 'danger')
-        return render_template('sales.html', sales=[], customers=[], items=[], employees=[], format_currency=format_currency)
+        return render_template('sales.html', sales=[], customers=[], items=[], employees=[], warehouses=[], customer_names={}, employee_names={},
+                               format_currency=format_currency)
 
 @app.route('/create_sale', methods=['POST'])
 @login_required
@@ -355,19 +624,22 @@ def create_sale():
         items = request.form.getlist('item_id[]')
         quantities = request.form.getlist('quantity[]')
         assigned_employees = request.form.getlist('assigned_employee[]')
+        line_discounts = request.form.getlist('line_discount[]')
         discount = float(request.form.get('discount', 0))
         
         if not customer_id or not employee_id:
             flash('Customer and employee are required', 'warning')
             return redirect(url_for('sales'))
+        warehouse_id = warehouses.resolve_warehouse_id(request.form.get('warehouse_id'))
         
-        # Check stock availability first
+        # Check stock availability first, at the location the sale ships from
+        on_hand = warehouses.available([item_id for item_id in items if item_id], warehouse_id)
         for i in range(len(items)):
             if items[i] and quantities[i]:
                 item = Item.query.get(items[i])
                 quantity = float(quantities[i])
-                if item and item.current_stock < quantity:
-                    flash(f'Insufficient stock for {item.name}. Available: {item.current_stock}', 'warning')
+                if item and on_hand.get(item.id, 0) < quantity:
+                    flash(f'Insufficient stock for {item.name}. Available: {on_hand.get(item.id, 0)}', 'warning')
                     return redirect(url_for('sales'))
         
         sale = SalesOrder(
@@ -375,39 +647,44 @@ def create_sale():
             employee_id=employee_id,
             invoice_number=generate_invoice_number(),
             status='pending',
-            discount=discount
+            discount=discount,
+            warehouse_id=warehouse_id
         )
         db.session.add(sale)
         db.session.flush()
         
-        total_amount = 0
+        own_discounts = []
         for i in range(len(items)):
             if items[i] and quantities[i] and assigned_employees[i]:
                 item = Item.query.get(items[i])
                 if item:
                     quantity = float(quantities[i])
-                    unit_price = item.selling_price
-                    total_price = quantity * unit_price
-                    
-                    sale_item = SaleItem(
-                        sales_order_id=sale.id,
-                        item_id=items[i],
+                    sale.items.append(SaleItem(
+                        item=item,
                         employee_id=assigned_employees[i],
                         quantity=quantity,
-                        unit_price=unit_price,
-                        total_price=total_price
-                    )
-                    db.session.add(sale_item)
-                    total_amount += total_price
+                        unit_price=item.selling_price,
+                        total_price=quantity * item.selling_price
+                    ))
+                    own_discounts.append(float(line_discounts[i] or 0) if i < len(line_discounts) else 0)
         
-        # Apply discount and calculate GST (18%)
-        sale.total_amount = total_amount - discount
-        sale.gst_amount = sale.total_amount * 0.18
-        sale.total_amount += sale.gst_amount
+        # Discounts come off each line, then GST at each item's rate (tax.py)
+        customer = Customer.query.get(customer_id)
+        tax.price_sale(sale, customer, own_discounts)
+        
+        # Enforce customer credit limit against the running balance and the other pending orders
+        allowed, available = check_credit_limit(customer, sale.total_amount, exclude_order_id=sale.id)
+        if not allowed:
+            db.session.rollback()
+            flash(f'Credit limit exceeded for {customer.name}. Available credit: {format_currency(available)}', 'warning')
+            return redirect(url_for('sales'))
         
         db.session.commit()
         log_activity('CREATE_SALE', f'Created sales order: {sale.invoice_number}')
         flash('Sales order created successfully', 'success')
+    except tax.TaxError as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
     except Exception as e:
         db.session.rollback()
         flash(f'Error creating sale: {str(e)}', 'danger')
@@ -421,13 +698,18 @@ def complete_sale(sale_id):
         sale = SalesOrder.query.get(sale_id)
         if sale and sale.status == 'pending':
             sale.status = 'completed'
+            inventory_valuation.consume_sale_layers(sale)
+            lots.allocate_sale(sale)
             
             # Update stock
             for sale_item in sale.items:
                 item = Item.query.get(sale_item.item_id)
                 if item:
+                    stock_ledger.record_movement(item.id, -sale_item.quantity, 'sale', 'SalesOrder', sale.id,
+                                                 warehouse_id=sale.warehouse_id)
                     item.current_stock -= sale_item.quantity
                     update_stock_alert(sale_item.item_id)
+            stock_alerts.refresh_expiry_alerts([sale_item.item_id for sale_item in sale.items])
             
             # Create receivable entry
             receivable = AccountsReceivable(
@@ -438,6 +720,8 @@ def complete_sale(sale_id):
                 status='pending'
             )
             db.session.add(receivable)
+            apply_receivable(sale.customer_id, receivable.amount)
+            sales_analytics.record_sale(sale)
             
             db.session.commit()
             log_activity('COMPLETE_SALE', f'Completed sales order: {sale.invoice_number}')
@@ -450,6 +734,318 @@ def complete_sale(sale_id):
     
     return redirect(url_for('sales'))
 
+@app.route('/sales/<int:sale_id>/invoice')
+@login_required
+def sale_invoice(sale_id):
+    return _document_response('invoice', sale_id, 'sales')
+
+def _document_response(kind, order_id, back):
+    """One document inline, PDF when WeasyPrint is installed, else printable HTML"""
+    fmt = request.args.get('format') or documents.default_format()
+    try:
+        document = documents.render_document(kind, order_id, fmt)
+    except documents.DocumentError as e:
+        flash(str(e), 'warning')
+        return redirect(url_for(back))
+    except Exception as e:
+        flash(f'Error rendering document: {str(e)}', 'danger')
+        return redirect(url_for(back))
+    if document is None:
+        return render_template('404.html'), 404
+    filename, content = document
+    return send_file(BytesIO(content), mimetype=documents.MIMETYPES[fmt], download_name=filename,
+                     as_attachment=request.args.get('download') == '1')
+
+@app.route('/sales/invoices.zip')
+@login_required
+def sale_invoices_zip():
+    """Every invoice for a month (or a date range) in one ZIP, streamed as it renders"""
+    try:
+        start, end = _invoice_period(request.args)
+        fmt = request.args.get('format') or documents.default_format()
+        documents.check_format('invoice', fmt)  # before the download starts, while we can still flash
+        sale_ids = _invoice_ids(start, end)
+    except (ValueError, documents.DocumentError) as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('sales'))
+    if not sale_ids:
+        flash('No invoices in that period', 'info')
+        return redirect(url_for('sales'))
+    log_activity('EXPORT_INVOICES', f'Downloaded {len(sale_ids)} invoices for {start} to {end}')
+
+    # stream_with_context keeps the database session for loading each chunk as the ZIP goes out
+    archive = documents.zip_stream(documents.render_batch('invoice', sale_ids, fmt,
+                                                          workers=app.config['DOCUMENT_RENDER_WORKERS']))
+    return Response(stream_with_context(archive), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="invoices_{start:%Y%m%d}_{end:%Y%m%d}.zip"'})
+
+def _invoice_period(args):
+    """(start, end) dates from ?month=YYYY-MM or ?start=&end=, this month by default"""
+    if args.get('start') or args.get('end'):
+        start = datetime.strptime(args['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(args['end'], '%Y-%m-%d').date()
+        if start > end:
+            raise ValueError('Start date is after the end date')
+        return start, end
+    month = datetime.strptime(args['month'], '%Y-%m').date() if args.get('month') else datetime.now().date().replace(day=1)
+    next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return month, next_month - timedelta(days=1)
+
+def _invoice_ids(start, end):
+    return [sale_id for sale_id, in db.session.query(SalesOrder.id)
+            .filter(SalesOrder.sale_date >= start, SalesOrder.sale_date < end + timedelta(days=1))
+            .order_by(SalesOrder.sale_date, SalesOrder.id)]
+
+# Warehouses and transfers
+@app.route('/warehouses')
+@login_required
+def warehouse_list():
+    try:
+        summaries = warehouses.warehouse_summaries()
+        transfers = StockTransfer.query.options(selectinload(StockTransfer.items)) \
+            .order_by(StockTransfer.created_date.desc()).limit(50).all()
+        items = reference_data.item_options()
+        return render_template('warehouses.html', summaries=summaries, transfers=transfers,
+                               warehouses=reference_data.warehouse_options(), items=items,
+                               warehouse_names={summary['warehouse'].id: summary['warehouse'].name for summary in summaries},
+                               item_names=reference_data.names(items), format_currency=format_currency)
+    except Exception as e:
+        flash(f'Error loading warehouses: {str(e)}', 'danger')
+        return render_template('warehouses.html', summaries=[], transfers=[], warehouses=[], items=[],
+                               warehouse_names={}, item_names={}, format_currency=format_currency)
+
+@app.route('/add_warehouse', methods=['POST'])
+@login_required
+@admin_required
+def add_warehouse():
+    try:
+        code = request.form.get('code', '').strip().upper()
+        name = request.form.get('name', '').strip()
+        if not code or not name:
+            flash('Warehouse code and name are required', 'warning')
+            return redirect(url_for('warehouse_list'))
+        if Warehouse.query.filter_by(code=code).first():
+            flash(f'Warehouse code {code} already exists', 'warning')
+            return redirect(url_for('warehouse_list'))
+        
+        warehouse = Warehouse(code=code, name=name, address=request.form.get('address'))
+        db.session.add(warehouse)
+        db.session.commit()
+        log_activity('ADD_WAREHOUSE', f'Added warehouse: {name} ({code})')
+        flash('Warehouse added successfully', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error adding warehouse: {str(e)}', 'danger')
+    
+    return redirect(url_for('warehouse_list'))
+
+@app.route('/edit_warehouse/<int:warehouse_id>', methods=['POST'])
+@login_required
+@admin_required
+def edit_warehouse(warehouse_id):
+    try:
+        warehouse = Warehouse.query.get(warehouse_id)
+        if not warehouse:
+            flash('Warehouse not found', 'warning')
+            return redirect(url_for('warehouse_list'))
+        
+        active = request.form.get('active') == 'on'
+        make_default = request.form.get('is_default') == 'on'
+        if not active and (warehouse.is_default or make_default):
+            flash('The default warehouse cannot be deactivated', 'warning')
+            return redirect(url_for('warehouse_list'))
+        if not active and warehouse.active and warehouses.holds_stock(warehouse.id):
+            flash(f'{warehouse.name} still holds stock; transfer it out before deactivating', 'warning')
+            return redirect(url_for('warehouse_list'))
+        
+        warehouse.name = request.form.get('name', warehouse.name).strip() or warehouse.name
+        warehouse.address = request.form.get('address')
+        warehouse.active = active
+        if make_default and not warehouse.is_default:
+            Warehouse.query.filter(Warehouse.id != warehouse.id).update({Warehouse.is_default: False})
+            warehouse.is_default = True
+        db.session.commit()
+        log_activity('EDIT_WAREHOUSE', f'Updated warehouse: {warehouse.name} ({warehouse.code})')
+        flash('Warehouse updated successfully', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error updating warehouse: {str(e)}', 'danger')
+    
+    return redirect(url_for('warehouse_list'))
+
+@app.route('/warehouses/<int:warehouse_id>')
+@login_required
+def warehouse_detail(warehouse_id):
+    warehouse = Warehouse.query.get(warehouse_id)
+    if not warehouse:
+        flash('Warehouse not found', 'warning')
+        return redirect(url_for('warehouse_list'))
+    try:
+        page = max(request.args.get('page', 1, type=int), 1)
+        search = request.args.get('q', '').strip()
+        rows, total = warehouses.warehouse_stock(warehouse.id, page=page, search=search)
+        return render_template('warehouse_detail.html', warehouse=warehouse, rows=rows, total=total, page=page,
+                               per_page=100, search=search, items=reference_data.item_options())
+    except Exception as e:
+        flash(f'Error loading warehouse stock: {str(e)}', 'danger')
+        return redirect(url_for('warehouse_list'))
+
+@app.route('/warehouses/<int:warehouse_id>/reorder_level', methods=['POST'])
+@login_required
+def set_location_reorder_level(warehouse_id):
+    try:
+        item_id = request.form.get('item_id', type=int)
+        level = request.form.get('min_stock_level', '').strip()
+        if not item_id or not Item.query.get(item_id) or not Warehouse.query.get(warehouse_id):
+            flash('Item or warehouse not found', 'warning')
+            return redirect(url_for('warehouse_detail', warehouse_id=warehouse_id))
+        
+        # The row may not exist yet for an item never stocked here; quantity stays with the ledger trigger
+        db.session.execute(db.text("""
+            INSERT INTO item_stock (item_id, warehouse_id, quantity, min_stock_level)
+            VALUES (:item_id, :warehouse_id, 0, :level)
+            ON CONFLICT (item_id, warehouse_id) DO UPDATE SET min_stock_level = excluded.min_stock_level
+        """), {'item_id': item_id, 'warehouse_id': warehouse_id, 'level': float(level) if level else None})
+        db.session.commit()
+        update_stock_alert(item_id)
+        log_activity('SET_REORDER_LEVEL', f'Reorder level for item {item_id} at warehouse {warehouse_id}: {level or "cleared"}')
+        flash('Reorder level updated', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error updating reorder level: {str(e)}', 'danger')
+    
+    return redirect(url_for('warehouse_detail', warehouse_id=warehouse_id))
+
+@app.route('/create_transfer', methods=['POST'])
+@login_required
+def create_transfer():
+    try:
+        items = request.form.getlist('item_id[]')
+        quantities = request.form.getlist('quantity[]')
+        lines = [(items[i], float(quantities[i])) for i in range(len(items)) if items[i] and quantities[i]]
+        transfer = warehouses.create_transfer(request.form.get('from_warehouse_id'), request.form.get('to_warehouse_id'),
+                                              lines, notes=request.form.get('notes'), user_id=current_user.id)
+        db.session.commit()
+        log_activity('CREATE_TRANSFER', f'Created stock transfer: {transfer.transfer_number}')
+        flash('Transfer order created successfully', 'success')
+    except (warehouses.TransferError, ValueError) as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error creating transfer: {str(e)}', 'danger')
+    
+    return redirect(url_for('warehouse_list'))
+
+@app.route('/complete_transfer/<int:transfer_id>')
+@login_required
+def complete_transfer(transfer_id):
+    try:
+        transfer = StockTransfer.query.get(transfer_id)
+        if not transfer:
+            flash('Transfer not found', 'warning')
+            return redirect(url_for('warehouse_list'))
+        
+        warehouses.complete_transfer(transfer)
+        # Location reorder levels may now be crossed at either end, and lots have moved
+        stock_alerts.refresh_stock_alerts([line.item_id for line in transfer.items])
+        stock_alerts.refresh_expiry_alerts([line.item_id for line in transfer.items])
+        db.session.commit()
+        log_activity('COMPLETE_TRANSFER', f'Completed stock transfer: {transfer.transfer_number}')
+        flash('Transfer completed and stock moved', 'success')
+    except warehouses.TransferError as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error completing transfer: {str(e)}', 'danger')
+    
+    return redirect(url_for('warehouse_list'))
+
+@app.route('/cancel_transfer/<int:transfer_id>')
+@login_required
+def cancel_transfer(transfer_id):
+    try:
+        transfer = StockTransfer.query.get(transfer_id)
+        if transfer:
+            warehouses.cancel_transfer(transfer)
+            db.session.commit()
+            log_activity('CANCEL_TRANSFER', f'Cancelled stock transfer: {transfer.transfer_number}')
+            flash('Transfer cancelled', 'success')
+        else:
+            flash('Transfer not found', 'warning')
+    except warehouses.TransferError as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error cancelling transfer: {str(e)}', 'danger')
+    
+    return redirect(url_for('warehouse_list'))
+
+# Stock Alerts
+@app.route('/alerts')
+@login_required
+def alerts():
+    try:
+        active_alerts = StockAlert.query.options(selectinload(StockAlert.lot)).filter_by(resolved=False) \
+            .order_by(StockAlert.created_date.desc()).all()
+        return render_template('alerts.html', alerts=active_alerts)
+    except Exception as e:
+        flash(f'Error loading alerts: {str(e)}', 'danger')
+        return render_template('alerts.html', alerts=[])
+
+@app.route('/resolve_alert/<int:alert_id>')
+@login_required
+def resolve_alert(alert_id):
+    try:
+        alert = StockAlert.query.get(alert_id)
+        if alert and not alert.resolved:
+            alert.resolved = True
+            db.session.commit()
+            log_activity('RESOLVE_ALERT', f'Resolved stock alert {alert_id}')
+            flash('Alert resolved', 'success')
+        else:
+            flash('Alert not found or already resolved', 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error resolving alert: {str(e)}', 'danger')
+    
+    return redirect(url_for('alerts'))
+
+@app.route('/resolve_all_alerts')
+@login_required
+def resolve_all_alerts():
+    try:
+        resolved_count = StockAlert.query.filter_by(resolved=False).update({StockAlert.resolved: True})
+        db.session.commit()
+        log_activity('RESOLVE_ALERTS', f'Resolved {resolved_count} stock alerts')
+        flash(f'Resolved {resolved_count} alerts', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error resolving alerts: {str(e)}', 'danger')
+    
+    return redirect(url_for('alerts'))
+
+@app.route('/auto_reorder', methods=['POST'])
+@login_required
+def auto_reorder():
+    try:
+        lookback_days = int(request.form.get('lookback_days', 90))
+        cover_days = int(request.form.get('cover_days', 30))
+        result = reorder_engine.generate_draft_orders(lookback_days=lookback_days, cover_days=cover_days)
+        
+        log_activity('AUTO_REORDER', f"Created {len(result['orders'])} draft purchase orders ({result['lines']} lines)")
+        flash(f"Created {len(result['orders'])} draft purchase orders with {result['lines']} lines", 'success')
+        if result['skipped']:
+            names = ', '.join(item['name'] for item in result['skipped'][:10])
+            flash(f"{len(result['skipped'])} items skipped because they have no supplier: {names}", 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error generating reorders: {str(e)}', 'danger')
+    
+    return redirect(url_for('purchase'))
+
 # Accounts Payable
 @app.route('/payable')
 @login_required
@@ -499,6 +1095,7 @@ def mark_received(receivable_id):
         if receivable and receivable.status == 'pending':
             receivable.status = 'paid'
             receivable.paid_date = datetime.now()
+            settle_receivable(receivable.customer_id, receivable.amount)
             db.session.commit()
             log_activity('MARK_RECEIVED', f'Marked receivable as paid: {receivable.id}')
             flash('Payment marked as received', 'success')
@@ -692,10 +1289,12 @@ def delete_customer(customer_id):
 def workers():
     try:
         all_workers = Employee.query.all()
-        return render_template('workers.html', workers=all_workers, format_currency=format_currency)
+        return render_template('workers.html', workers=all_workers, default_commission=Config.COMMISSION_PERCENT,
+                               format_currency=format_currency)
     except Exception as e:
         flash(f'Error loading workers: {str(e)}', 'danger')
-        return render_template('workers.html', workers=[], format_currency=format_currency)
+        return render_template('workers.html', workers=[], default_commission=Config.COMMISSION_PERCENT,
+                               format_currency=format_currency)
 
 @app.route('/add_worker', methods=['POST'])
 @login_required
@@ -705,6 +1304,7 @@ def add_worker():
         role = request.form.get('role')
         department = request.form.get('department')
         hourly_rate = float(request.form.get('hourly_rate', 0))
+        commission_rate = _commission_rate(request.form.get('commission_rate'))
         phone = request.form.get('phone')
         email = request.form.get('email')
         address = request.form.get('address')
@@ -718,6 +1318,7 @@ def add_worker():
             role=role,
             department=department,
             hourly_rate=hourly_rate,
+            commission_rate=commission_rate,
             phone=phone,
             email=email,
             address=address
@@ -743,6 +1344,7 @@ def edit_worker(worker_id):
             worker.role = request.form.get('role')
             worker.department = request.form.get('department')
             worker.hourly_rate = float(request.form.get('hourly_rate', 0))
+            worker.commission_rate = _commission_rate(request.form.get('commission_rate'))
             worker.phone = request.form.get('phone')
             worker.email = request.form.get('email')
             worker.address = request.form.get('address')
@@ -765,6 +1367,7 @@ def delete_worker(worker_id):
         worker = Employee.query.get(worker_id)
         if worker:
             worker_name = worker.name
+            EmployeePerformance.query.filter_by(employee_id=worker.id).delete()
             db.session.delete(worker)
             db.session.commit()
             log_activity('DELETE_WORKER', f'Deleted worker: {worker_name}')
@@ -777,17 +1380,86 @@ def delete_worker(worker_id):
     
     return redirect(url_for('workers'))
 
+def _commission_rate(value):
+    """Commission % from form input; blank means the default rate"""
+    if value is None or str(value).strip() == '':
+        return None
+    rate = float(value)
+    if not 0 <= rate <= 100:
+        raise ValueError('Commission rate must be between 0 and 100%')
+    return rate
+
+def _performance_months(args):
+    """'YYYY-MM' months from ?start=&end= (months), this month by default"""
+    current = datetime.now().strftime('%Y-%m')
+    start, _ = commissions.month_bounds(args.get('start') or current)
+    end, _ = commissions.month_bounds(args.get('end') or args.get('start') or current)
+    if start > end:
+        raise ValueError('Start month is after the end month')
+    return commissions.months_between(start, end)
+
+@app.route('/workers/performance')
+@login_required
+def worker_performance():
+    try:
+        months = _performance_months(request.args)
+        employee_id = request.args.get('employee_id', type=int)
+        summary = commissions.performance_summary(months, employee_id)
+        monthly = commissions.monthly_rows(months, employee_id) if employee_id else []
+
+        if request.args.get('format') == 'json':
+            return jsonify({'start': months[0], 'end': months[-1], 'employees': summary,
+                            'months': [{'month': row.month, **{name: getattr(row, name) for name in commissions.MEASURES},
+                                        'commission_rate': row.commission_rate} for row in monthly]})
+        if request.args.get('format') == 'xlsx':
+            import pandas as pd  # only exports need pandas/openpyxl
+            output = BytesIO()
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                pd.DataFrame(summary).to_excel(writer, index=False, sheet_name='employees')
+            output.seek(0)
+            return send_file(
+                output,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                as_attachment=True,
+                download_name=f'payroll_{months[0]}_{months[-1]}.xlsx'
+            )
+
+        totals = {name: sum(row[name] for row in summary) for name in commissions.MEASURES + ['total_pay']}
+        return render_template('worker_performance.html', summary=summary, totals=totals, monthly=monthly,
+                               start=months[0], end=months[-1], employee_id=employee_id,
+                               employees=reference_data.employee_options(), format_currency=format_currency)
+    except Exception as e:
+        if request.args.get('format') == 'json':
+            return jsonify({'error': str(e)}), 400
+        flash(f'Error loading performance: {str(e)}', 'danger')
+        return redirect(url_for('workers'))
+
+@app.route('/workers/performance/recompute', methods=['POST'])
+@login_required
+@admin_required
+def recompute_worker_performance():
+    try:
+        months = _performance_months(request.form)
+        rows = commissions.refresh_months(months)
+        log_activity('RECOMPUTE_PERFORMANCE', f'Recomputed employee performance for {months[0]} to {months[-1]}')
+        flash(f'Recomputed {rows} employee-months', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error recomputing performance: {str(e)}', 'danger')
+        return redirect(url_for('worker_performance'))
+    return redirect(url_for('worker_performance', start=months[0], end=months[-1]))
+
 # Tasks Management
 @app.route('/tasks')
 @login_required
 def tasks():
     try:
         tasks_list = WorkerTask.query.all()
-        employees = Employee.query.all()
-        return render_template('tasks.html', tasks=tasks_list, employees=employees)
+        employees = reference_data.employee_options()
+        return render_template('tasks.html', tasks=tasks_list, employees=employees, employee_names=reference_data.names(employees))
     except Exception as e:
         flash(f'Error loading tasks: {str(e)}', 'danger')
-        return render_template('tasks.html', tasks=[], employees=[])
+        return render_template('tasks.html', tasks=[], employees=[], employee_names={})
 
 @app.route('/add_task', methods=['POST'])
 @login_required
@@ -831,6 +1503,10 @@ def update_task_status(task_id, status):
     try:
         task = WorkerTask.query.get(task_id)
         if task:
+            if status == 'completed' and task.status != 'completed':
+                task.completed_date = datetime.now()
+            elif status != 'completed':
+                task.completed_date = None
             task.status = status
             db.session.commit()
             log_activity('UPDATE_TASK_STATUS', f'Updated task {task_id} to {status}')
@@ -866,10 +1542,11 @@ def delete_task(task_id):
 @login_required
 def reports():
     try:
-        stock_status = Item.query.all()
-        payable_report = AccountsPayable.query.all()
-        receivable_report = AccountsReceivable.query.all()
-        sales_report = SalesOrder.query.order_by(SalesOrder.sale_date.desc()).limit(10).all()
+        # The tables are rendered in cached fragments, so these stay lazy queries
+        stock_status = Item.query
+        payable_report = AccountsPayable.query.filter_by(status='pending')
+        receivable_report = AccountsReceivable.query.filter_by(status='pending')
+        sales_report = SalesOrder.query.order_by(SalesOrder.sale_date.desc()).limit(10)
         tasks_report = WorkerTask.query.order_by(WorkerTask.assigned_date.desc()).limit(10).all()
         
         # Calculate totals
@@ -903,10 +1580,135 @@ def reports():
                              total_receivable=0,
                              format_currency=format_currency)
 
+@app.route('/reports/sales_analytics')
+@login_required
+def sales_analytics_report():
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else datetime.now().date()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else end - timedelta(days=365)
+        granularity = request.args.get('granularity', 'month')
+        dimension = request.args.get('dimension', 'item')
+        if granularity not in ('day', 'week', 'month') or dimension not in sales_analytics.DIMENSIONS or start > end:
+            raise ValueError('Invalid report parameters')
+        
+        trend = sales_analytics.sales_trend(start, end, granularity)
+        movers = sales_analytics.period_over_period(start, end, dimension)
+        
+        if request.args.get('format') == 'json':
+            return jsonify({
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'granularity': granularity,
+                'trend': trend.astype(object).where(trend.notna(), None).to_dict(orient='records'),
+                'dimension': dimension,
+                'movers': movers.astype(object).where(movers.notna(), None).to_dict(orient='records')
+            })
+        
+        return render_template('sales_analytics.html', trend=trend.to_dict(orient='records'),
+                               movers=movers.to_dict(orient='records'), start=start, end=end,
+                               granularity=granularity, dimension=dimension, format_currency=format_currency)
+    except Exception as e:
+        if request.args.get('format') == 'json':
+            return jsonify({'error': str(e)}), 400
+        flash(f'Error loading sales analytics: {str(e)}', 'danger')
+        return redirect(url_for('reports'))
+
+@app.route('/reports/valuation')
+@login_required
+def valuation_report():
+    try:
+        method = request.args.get('method', 'fifo')
+        if method not in ('fifo', 'average'):
+            raise ValueError('Invalid valuation method')
+        as_of = None
+        if request.args.get('as_of'):
+            as_of = datetime.strptime(request.args['as_of'], '%Y-%m-%d') + timedelta(days=1, microseconds=-1)
+        
+        report, total_value = inventory_valuation.valuation_report(as_of=as_of, method=method)
+        
+        cogs = []
+        if request.args.get('cogs_start') and request.args.get('cogs_end'):
+            cogs_start = datetime.strptime(request.args['cogs_start'], '%Y-%m-%d')
+            cogs_end = datetime.strptime(request.args['cogs_end'], '%Y-%m-%d') + timedelta(days=1, microseconds=-1)
+            cogs = inventory_valuation.cogs_report(cogs_start, cogs_end)
+        
+        return render_template('valuation.html', report=report, total_value=total_value, method=method,
+                               as_of=request.args.get('as_of', ''), cogs=cogs,
+                               cogs_start=request.args.get('cogs_start', ''), cogs_end=request.args.get('cogs_end', ''),
+                               format_currency=format_currency)
+    except Exception as e:
+        flash(f'Error loading valuation report: {str(e)}', 'danger')
+        return redirect(url_for('reports'))
+
+@app.route('/reports/stock_at')
+@login_required
+def stock_at_report():
+    try:
+        date_str = request.args.get('date') or datetime.now().strftime('%Y-%m-%d')
+        at = datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=1, microseconds=-1)
+        balances = stock_ledger.stock_at(at)
+        items = Item.query.order_by(Item.name).all()
+        
+        return render_template('stock_at.html', items=items, balances=balances, date=date_str)
+    except Exception as e:
+        flash(f'Error loading stock history: {str(e)}', 'danger')
+        return redirect(url_for('reports'))
+
+@app.route('/reports/gstr1')
+@login_required
+def gstr1_report():
+    try:
+        today = datetime.now().date()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else today.replace(day=1)
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else today
+        if start > end:
+            raise ValueError('Start date is after the end date')
+
+        summary = tax.gstr1_summary(start, end)
+
+        if request.args.get('format') == 'json':
+            return jsonify({'start': start.isoformat(), 'end': end.isoformat(), **summary})
+        if request.args.get('format') == 'xlsx':
+            import pandas as pd  # only exports need pandas/openpyxl
+            output = BytesIO()
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                for section in tax.GSTR1_SECTIONS:
+                    pd.DataFrame(summary[section]).to_excel(writer, index=False, sheet_name=section)
+            output.seek(0)
+            return send_file(
+                output,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                as_attachment=True,
+                download_name=f'gstr1_{start.strftime("%Y%m%d")}_{end.strftime("%Y%m%d")}.xlsx'
+            )
+
+        return render_template('gstr1.html', summary=summary, start=start, end=end, b2cl_limit=tax.B2CL_LIMIT,
+                               format_currency=format_currency)
+    except Exception as e:
+        if request.args.get('format') == 'json':
+            return jsonify({'error': str(e)}), 400
+        flash(f'Error loading GSTR-1 summary: {str(e)}', 'danger')
+        return redirect(url_for('reports'))
+
+@app.route('/items/<int:item_id>/movements')
+@login_required
+def item_movements(item_id):
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    movements = StockMovement.query.filter_by(item_id=item_id) \
+        .order_by(StockMovement.created_date.desc()).limit(limit).all()
+    return jsonify([{
+        'date': movement.created_date.isoformat(),
+        'quantity': movement.quantity,
+        'type': movement.movement_type,
+        'reference_type': movement.reference_type,
+        'reference_id': movement.reference_id
+    } for movement in movements])
+
 # Export to Excel
 @app.route('/export_excel/<report_type>')
 @login_required
 def export_excel(report_type):
+    import pandas as pd  # pandas/openpyxl take ~1s to import; only exports need them
     try:
         if report_type == 'stock':
             data = Item.query.all()
@@ -1088,6 +1890,7 @@ def bulk_sync_to_tally():
 @login_required
 def import_items_from_tally():
     """Import items from Tally"""
+    from tally_integration import TallyIntegration
     try:
         tally = TallyIntegration()
         success, message = tally.import_items_from_tally()
@@ -1106,6 +1909,7 @@ def import_items_from_tally():
 @login_required
 def import_suppliers_from_tally():
     """Import suppliers from Tally"""
+    from tally_integration import TallyIntegration
     try:
         tally = TallyIntegration()
         success, message = tally.import_suppliers_from_tally()
@@ -1124,6 +1928,7 @@ def import_suppliers_from_tally():
 @login_required
 def import_customers_from_tally():
     """Import customers from Tally"""
+    from tally_integration import TallyIntegration
     try:
         tally = TallyIntegration()
         customers_data, message = tally.get_parties_from_tally('customer')
@@ -1176,6 +1981,7 @@ def import_customers_from_tally():
 @login_required
 def bulk_import_from_tally():
     """Import all data (items, suppliers, customers) from Tally"""
+    from tally_integration import TallyIntegration
     try:
         tally = TallyIntegration()
         
@@ -1263,7 +2069,7 @@ def admin_add_user():
         
         user = User(
             username=username,
-            password=generate_password_hash(password),
+            password=hash_password(password),
             role=role,
             email=email,
             phone=phone
@@ -1295,9 +2101,10 @@ def admin_edit_user(user_id):
             # Only update password if provided
             new_password = request.form.get('password')
             if new_password:
-                user.password = generate_password_hash(new_password)
+                user.password = hash_password(new_password)
             
             db.session.commit()
+            user_cache.invalidate(user_id)
             log_activity('EDIT_USER', f'Edited user: {user.username}')
             flash('User updated successfully', 'success')
         else:
@@ -1318,6 +2125,7 @@ def admin_delete_user(user_id):
             username = user.username
             db.session.delete(user)
             db.session.commit()
+            user_cache.invalidate(user_id)
             log_activity('DELETE_USER', f'Deleted user: {username}')
             flash('User deleted successfully', 'success')
         elif user.id == current_user.id:
@@ -1340,16 +2148,35 @@ def change_password():
             new_password = request.form.get('new_password')
             confirm_password = request.form.get('confirm_password')
             
-            if not check_password_hash(current_user.password, current_password):
+            # current_user is a cached read-only copy without the password hash
+            user = User.query.get(current_user.id)
+            # Same limits as login, so this form cannot be used to guess the current password
+            refused = login_throttle.check(request.remote_addr or '-', user.username)
+            if refused:
+                flash(refused, 'danger')
+                return render_template('change_password.html'), 429
+            
+            try:
+                with login_throttle.hashing_slot():
+                    valid = bool(current_password) and verify_password(user, current_password)
+                    if valid and new_password == confirm_password:
+                        user.password = hash_password(new_password)
+            except TimeoutError:
+                flash('The server is busy, please try again in a moment', 'warning')
+                return render_template('change_password.html'), 503
+            
+            if not valid:
+                login_throttle.failed(user.username)
                 flash('Current password is incorrect', 'danger')
                 return render_template('change_password.html')
+            login_throttle.succeeded(user.username)
             
             if new_password != confirm_password:
                 flash('New passwords do not match', 'danger')
                 return render_template('change_password.html')
             
-            current_user.password = generate_password_hash(new_password)
             db.session.commit()
+            user_cache.invalidate(user.id)
             log_activity('CHANGE_PASSWORD', 'User changed password')
             flash('Password changed successfully', 'success')
             return redirect(url_for('dashboard'))
@@ -1458,87 +2285,223 @@ def admin_clear_stock_alerts():
     
     return redirect(url_for('admin_maintenance'))
 
+@app.route('/admin/reconcile_balances')
+@login_required
+@admin_required
+def admin_reconcile_balances():
+    try:
+        drift = reconcile_customer_balances(fix=True)
+        for row in drift[:10]:
+            flash(f"{row['name']}: cached {format_currency(row['cached'])}, ledger {format_currency(row['ledger'])}", 'info')
+        
+        log_activity('RECONCILE_BALANCES', f'Reconciled customer balances, {len(drift)} corrected')
+        flash(f'Customer balances reconciled: {len(drift)} balances corrected', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error reconciling balances: {str(e)}', 'danger')
+    
+    return redirect(url_for('admin_maintenance'))
+
+@app.route('/admin/rebuild_sales_rollups')
+@login_required
+@admin_required
+def admin_rebuild_sales_rollups():
+    try:
+        row_count = sales_analytics.rebuild_rollups()
+        log_activity('REBUILD_ROLLUPS', f'Rebuilt sales rollups: {row_count} daily rows')
+        flash(f'Sales rollups rebuilt: {row_count} daily rows', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error rebuilding sales rollups: {str(e)}', 'danger')
+    
+    return redirect(url_for('admin_maintenance'))
+
+@app.route('/admin/seed_cost_layers')
+@login_required
+@admin_required
+def admin_seed_cost_layers():
+    try:
+        created = inventory_valuation.seed_opening_layers()
+        log_activity('SEED_COST_LAYERS', f'Created {created} opening cost layers')
+        flash(f'Created {created} opening cost layers', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error creating cost layers: {str(e)}', 'danger')
+    
+    return redirect(url_for('admin_maintenance'))
+
+@app.route('/admin/stock_ledger/<action>')
+@login_required
+@admin_required
+def admin_stock_ledger(action):
+    try:
+        if action == 'snapshot':
+            count = stock_ledger.take_snapshot()
+            log_activity('STOCK_SNAPSHOT', f'Stock snapshot taken for {count} items')
+            flash(f'Stock snapshot taken for {count} items', 'success')
+        elif action == 'check':
+            mismatches = stock_ledger.check_consistency()
+            for row in mismatches[:10]:
+                flash(f"{row['name']} ({row['sku']}): stock {row['current_stock']}, ledger {row['ledger']}", 'warning')
+            flash(f'Stock ledger check: {len(mismatches)} items out of balance', 'success' if not mismatches else 'danger')
+            located = warehouses.check_consistency()
+            for row in located[:10]:
+                flash(f"{row['name']} ({row['sku']}): stock {row['current_stock']}, across locations {row['located']}", 'warning')
+            flash(f'Location check: {len(located)} items out of balance', 'success' if not located else 'danger')
+        elif action == 'rebuild_locations':
+            warehouses.rebuild_item_stock()
+            log_activity('REBUILD_ITEM_STOCK', 'Rebuilt per-location stock from the ledger')
+            flash('Per-location stock rebuilt from the stock ledger', 'success')
+        elif action == 'expiry':
+            count = stock_alerts.refresh_expiry_alerts()
+            db.session.commit()
+            log_activity('EXPIRY_SCAN', f'Flagged {count} expiring or expired lots')
+            flash(f'Expiry scan: {count} lots expiring within {stock_alerts.EXPIRY_WARNING_DAYS} days or expired',
+                  'success' if not count else 'warning')
+        elif action == 'backfill':
+            count = stock_ledger.backfill_opening_movements()
+            log_activity('STOCK_LEDGER_BACKFILL', f'Posted {count} opening stock movements')
+            flash(f'Posted {count} opening stock movements', 'success')
+        else:
+            flash('Invalid ledger action', 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error running stock ledger action: {str(e)}', 'danger')
+    
+    return redirect(url_for('admin_maintenance'))
+
+@app.route('/admin/cache')
+@login_required
+@admin_required
+def admin_cache():
+    return jsonify({'reference': reference_cache.metrics(), 'fragments': fragment_cache.metrics(),
+                    'users': user_cache.metrics(), 'events': event_bus.metrics(),
+                    'barcodes': barcode_index.metrics(), 'documents': document_cache.metrics()})
+
+@app.route('/admin/clear_cache')
+@login_required
+@admin_required
+def admin_clear_cache():
+    reference_cache.clear()
+    fragment_cache.backend.clear()
+    document_cache.clear()
+    log_activity('CLEAR_CACHE', 'Cleared reference data, template fragment and document caches')
+    flash('Caches cleared', 'success')
+    return redirect(url_for('admin_maintenance'))
+
 # Initialize database
-def init_db():
+def create_schema():
+    """Create missing tables and version triggers; idempotent and cheap enough for every start.
+
+    On a database with migrations pending the version triggers wait for them: they
+    write the version columns that migration 0001 adds, and 0001 installs them itself.
+    """
+    fresh = not db.inspect(db.engine).get_table_names()
+    db.create_all()
+    if fresh or not migrations.pending_migrations(db.engine.url.database):
+        data_versions.install_triggers(lambda sql: db.session.execute(db.text(sql)))
+    if fresh:
+        # Existing databases get the trigger from migration 0004, once stock_movement has warehouse_id
+        warehouses.install_stock_triggers(lambda sql: db.session.execute(db.text(sql)))
+    warehouses.ensure_default_warehouse()
+    db.session.commit()
+    if fresh:
+        # create_all just built the current schema, so no migration has anything to do
+        migrations.stamp(db.engine.url.database)
+
+def seed_database():
+    """Default admin user and employee, plus sample records on an empty database"""
+    # Create default admin user
+    if not User.query.filter_by(username='admin').first():
+        admin = User(
+            username='admin',
+            password=hash_password('admin123'),
+            role='admin',
+            email='admin@inventory.com',
+            phone='+91-9876543210'
+        )
+        db.session.add(admin)
+        print("Admin user created")
+    
+    # Create default employee
+    if not Employee.query.first():
+        employee = Employee(
+            name='Rajesh Kumar',
+            role='Manager',
+            department='Operations',
+            hourly_rate=500.0,
+            phone='+91-9876543211',
+            email='rajesh@company.com',
+            address='Mumbai, Maharashtra'
+        )
+        db.session.add(employee)
+        print("Default employee created")
+    
+    # Create sample data if no items exist
+    if not Item.query.first():
+        print("Creating sample data...")
+        # Sample items
+        items = [
+            Item(name="Laptop Dell Inspiron", sku="LAP001", category="Electronics", current_stock=10, min_stock_level=2, cost_price=45000, selling_price=55000),
+            Item(name="Wireless Mouse", sku="MOU001", category="Electronics", current_stock=50, min_stock_level=10, cost_price=450, selling_price=899),
+            Item(name="Mechanical Keyboard", sku="KEY001", category="Electronics", current_stock=30, min_stock_level=5, cost_price=1200, selling_price=2499),
+            Item(name="27-inch Monitor", sku="MON001", category="Electronics", current_stock=15, min_stock_level=3, cost_price=15000, selling_price=18999),
+        ]
+        for item in items:
+            db.session.add(item)
+        db.session.flush()
+        # Opening stock goes through the ledger, like add_item, so it lands at the default warehouse
+        for item in items:
+            inventory_valuation.adjust_layers(item, item.current_stock, source='opening')
+            stock_ledger.record_movement(item.id, item.current_stock, 'opening', 'Item', item.id)
+
+        # Sample supplier
+        supplier = Supplier(
+            name="Tech Solutions India Pvt. Ltd.", 
+            contact_person="Amit Sharma", 
+            phone="+91-1122334455",
+            email="amit@techsolutions.com",
+            address="Delhi, India",
+            gst_number="07AABCU9603R1ZM"
+        )
+        db.session.add(supplier)
+        
+        # Sample customer
+        customer = Customer(
+            name="ABC Corporation India", 
+            phone="+91-9988776655", 
+            email="purchase@abccorp.in",
+            address="Bangalore, Karnataka",
+            gst_number="29AABCA1234A1Z5",
+            credit_limit=500000
+        )
+        db.session.add(customer)
+
+        # Sample user
+        user = User(
+            username='manager',
+            password=hash_password('manager123'),
+            role='manager',
+            email='manager@inventory.com',
+            phone='+91-9876543212'
+        )
+        db.session.add(user)
+        print("Sample data created")
+    
+    db.session.commit()
+
+def init_db(seed=True):
+    """Create the schema; with seed=False only report whether seeding is still needed"""
     with app.app_context():
         try:
-            # Create all tables
-            db.create_all()
-            
-            # Create default admin user
-            if not User.query.filter_by(username='admin').first():
-                admin = User(
-                    username='admin',
-                    password=generate_password_hash('admin123'),
-                    role='admin',
-                    email='admin@inventory.com',
-                    phone='+91-9876543210'
-                )
-                db.session.add(admin)
-                print("Admin user created")
-            
-            # Create default employee
-            if not Employee.query.first():
-                employee = Employee(
-                    name='Rajesh Kumar',
-                    role='Manager',
-                    department='Operations',
-                    hourly_rate=500.0,
-                    phone='+91-9876543211',
-                    email='rajesh@company.com',
-                    address='Mumbai, Maharashtra'
-                )
-                db.session.add(employee)
-                print("Default employee created")
-            
-            # Create sample data if no items exist
-            if not Item.query.first():
-                print("Creating sample data...")
-                # Sample items
-                items = [
-                    Item(name="Laptop Dell Inspiron", sku="LAP001", category="Electronics", current_stock=10, min_stock_level=2, cost_price=45000, selling_price=55000),
-                    Item(name="Wireless Mouse", sku="MOU001", category="Electronics", current_stock=50, min_stock_level=10, cost_price=450, selling_price=899),
-                    Item(name="Mechanical Keyboard", sku="KEY001", category="Electronics", current_stock=30, min_stock_level=5, cost_price=1200, selling_price=2499),
-                    Item(name="27-inch Monitor", sku="MON001", category="Electronics", current_stock=15, min_stock_level=3, cost_price=15000, selling_price=18999),
-                ]
-                for item in items:
-                    db.session.add(item)
-                
-                # Sample supplier
-                supplier = Supplier(
-                    name="Tech Solutions India Pvt. Ltd.", 
-                    contact_person="Amit Sharma", 
-                    phone="+91-1122334455",
-                    email="amit@techsolutions.com",
-                    address="Delhi, India",
-                    gst_number="07AABCU9603R1ZM"
-                )
-                db.session.add(supplier)
-                
-                # Sample customer
-                customer = Customer(
-                    name="ABC Corporation India", 
-                    phone="+91-9988776655", 
-                    email="purchase@abccorp.in",
-                    address="Bangalore, Karnataka",
-                    gst_number="29AABCA1234A1Z5",
-                    credit_limit=500000
-                )
-                db.session.add(customer)
-
-                # Sample user
-                user = User(
-                    username='manager',
-                    password=generate_password_hash('manager123'),
-                    role='manager',
-                    email='manager@inventory.com',
-                    phone='+91-9876543212'
-                )
-                db.session.add(user)
-                
-                db.session.commit()
-                print("Sample data created")
-            
+            create_schema()
+            if seed:
+                seed_database()
+            elif not User.query.first():
+                print("No users yet - run 'flask --app app seed-db' to create the admin account")
+            pending = migrations.pending_migrations(db.engine.url.database)
+            if pending:
+                print(f"WARNING: {len(pending)} schema migrations pending - run 'flask --app app db-upgrade'")
             print("Database initialized successfully!")
         except Exception as e:
             print(f"Error initializing database: {e}")
@@ -1546,6 +2509,66 @@ def init_db():
             traceback.print_exc()
             db.session.rollback()
 
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables and triggers without seed data"""
+    init_db(seed=False)
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Create missing tables and apply pending schema migrations"""
+    with app.app_context():
+        create_schema()
+        db_file = db.engine.url.database
+        db.engine.dispose()
+    migrations.upgrade(db_file)
+    with app.app_context():
+        create_schema()  # now migrated: triggers for tables the migrations did not cover
+
+@app.cli.command('seed-db')
+def seed_db_command():
+    """Create tables, the default admin account and sample data"""
+    init_db(seed=True)
+
+@app.cli.command('render-invoices')
+@click.option('--month', help='YYYY-MM, defaults to this month')
+@click.option('--format', 'fmt', type=click.Choice(documents.FORMATS), help='pdf when WeasyPrint is installed, else html')
+@click.option('--output', help='ZIP file to write; without it the invoices are only rendered into the cache')
+@click.option('--workers', type=int, help='rendering processes, defaults to CPU count')
+def render_invoices_command(month, fmt, output, workers):
+    """Render a month's invoices ahead of printing, optionally into a ZIP"""
+    fmt = fmt or documents.default_format()
+    try:
+        documents.check_format('invoice', fmt)
+        start, end = _invoice_period({'month': month})
+    except (ValueError, documents.DocumentError) as e:
+        raise click.ClickException(str(e))
+    with app.app_context():
+        sale_ids = _invoice_ids(start, end)
+        rendered = documents.render_batch('invoice', sale_ids, fmt,
+                                          workers=workers or app.config['DOCUMENT_RENDER_WORKERS'])
+        if output:
+            with open(output, 'wb') as handle:
+                for piece in documents.zip_stream(rendered):
+                    handle.write(piece)
+        else:
+            for _ in rendered:
+                pass
+        print(f"Rendered {len(sale_ids)} invoices for {start:%Y-%m}" + (f" into {output}" if output else ''))
+
+@app.cli.command('compute-performance')
+@click.option('--start', help='first month, YYYY-MM; defaults to this month')
+@click.option('--end', help='last month, YYYY-MM; defaults to --start')
+def compute_performance_command(start, end):
+    """Recompute employee commission and productivity for a range of months"""
+    try:
+        months = _performance_months({'start': start, 'end': end})
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    with app.app_context():
+        rows = commissions.refresh_months(months)
+    print(f"Computed {rows} employee-months for {months[0]} to {months[-1]}")
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -0,0 +1,236 @@
+# barcodes.py - Scanner lookups through an in-memory barcode / SKU hash index
+"""Resolves a scanned code to an item with its current price and stock.
+
+Every item_barcode row and every SKU sits in two dicts (code -> item id), loaded once
+per process - before gunicorn forks when the app is preloaded (serve.py), otherwise on
+the first lookup. A lookup is then one dict probe plus a primary-key read of the item
+for the live price and stock, so it never depends on how many codes exist.
+
+The index is kept current three ways:
+
+    this process   ORM writes to item_barcode and Item.sku are applied when they commit
+    other writers  the item_barcode change counter (data_versions) is checked at most
+                   every CHECK_INTERVAL seconds; a change reloads the index in the
+                   background while lookups keep using the old one
+    anything else  a miss, or an SKU hit whose item no longer has that SKU, asks the
+                   database once and indexes the answer (items added by imports)
+
+Item writes are too frequent (every sale changes stock) to reload on, hence the SKU
+check on each hit instead of a counter.
+"""
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+from database import db, Item, ItemBarcode, DataVersion
+
+CHECK_INTERVAL = 2.0
+# Fallbacks for codes the in-memory index does not know yet
+_FIND_BARCODE_SQL = "SELECT item_id FROM item_barcode WHERE barcode = :code"
+_FIND_SKU_SQL = "SELECT id FROM item WHERE sku = :code"
+
+def normalize(code):
+    """Scanners send the code followed by Enter; keyboard wedges may add spaces"""
+    return (code or '').strip()
+
+class BarcodeError(ValueError):
+    """A barcode is malformed or already belongs to another item"""
+
+class BarcodeIndex:
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._barcodes = {}
+        self._skus = {}
+        self._version = None
+        self._checked = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'hits': 0, 'fallbacks': 0, 'misses': 0, 'reloads': 0, 'load_seconds': None}
+
+    @property
+    def loaded(self):
+        return self._version is not None
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('BARCODE_CHECK_INTERVAL', self.check_interval)
+
+    def load(self):
+        """Build the index from the database and swap it in"""
+        started = time.perf_counter()
+        # Counter first: a write landing during the load shows up as a newer version next check
+        version = self._current_version()
+        skus = dict(db.session.execute(db.text("SELECT sku, id FROM item")).all())
+        barcodes = dict(db.session.execute(db.text("SELECT barcode, item_id FROM item_barcode")).all())
+        with self._lock:
+            self._skus, self._barcodes, self._version = skus, barcodes, version
+            self._checked = time.monotonic()
+            self.stats['reloads'] += 1
+            self.stats['load_seconds'] = round(time.perf_counter() - started, 3)
+
+    def _current_version(self):
+        return db.session.query(DataVersion.version).filter(DataVersion.table_name == 'item_barcode').scalar() or 0
+
+    def _ensure_current(self):
+        if not self.loaded:
+            self.load()
+            return
+        now = time.monotonic()
+        if self._reloading or now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        if self._current_version() != self._version:
+            self._reload_in_background()
+
+    def _reload_in_background(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        app = current_app._get_current_object()
+
+        def reload():
+            try:
+                with app.app_context():
+                    self.load()
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=reload, name='barcode-index-reload', daemon=True).start()
+
+    def _find(self, code):
+        """Database lookup for a code the index does not know: (item_id, 'barcode' | 'sku') or None"""
+        item_id = db.session.execute(db.text(_FIND_BARCODE_SQL), {'code': code}).scalar()
+        if item_id is not None:
+            return item_id, 'barcode'
+        item_id = db.session.execute(db.text(_FIND_SKU_SQL), {'code': code}).scalar()
+        return (item_id, 'sku') if item_id is not None else None
+
+    def lookup(self, code, warehouse_id=None):
+        """Item, price and stock for a scanned barcode or SKU, or None if nothing matches"""
+        code = normalize(code)
+        if not code:
+            return None
+        self.stats['lookups'] += 1
+        self._ensure_current()
+
+        match = None
+        if code in self._barcodes:
+            match = self._barcodes[code], 'barcode'
+        elif code in self._skus:
+            match = self._skus[code], 'sku'
+        row = _item_row(match[0]) if match else None
+        if row is None or (match[1] == 'sku' and row.sku != code):
+            # Unknown here, or stale: the database decides, and the index learns the answer
+            self.stats['fallbacks'] += 1
+            self._forget(code)
+            match = self._find(code)
+            row = _item_row(match[0]) if match else None
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            (self._barcodes if match[1] == 'barcode' else self._skus)[code] = row.id
+        else:
+            self.stats['hits'] += 1
+
+        result = {'item_id': row.id, 'name': row.name, 'sku': row.sku, 'selling_price': row.selling_price,
+                  'current_stock': row.current_stock, 'matched': match[1], 'code': code}
+        if warehouse_id is not None:
+            result['warehouse_id'] = warehouse_id
+            result['warehouse_stock'] = db.session.execute(db.text(
+                "SELECT quantity FROM item_stock WHERE item_id = :item_id AND warehouse_id = :warehouse_id"
+            ), {'item_id': row.id, 'warehouse_id': warehouse_id}).scalar() or 0
+        return result
+
+    def _forget(self, code):
+        self._barcodes.pop(code, None)
+        self._skus.pop(code, None)
+
+    def apply(self, changes):
+        """Apply committed (kind, code, item_id) changes; item_id None removes the code"""
+        with self._lock:
+            for kind, code, item_id in changes:
+                index = self._barcodes if kind == 'barcode' else self._skus
+                if item_id is None:
+                    index.pop(code, None)
+                else:
+                    index[code] = item_id
+
+    def metrics(self):
+        lookups = self.stats['lookups']
+        return dict(self.stats, barcodes=len(self._barcodes), skus=len(self._skus), version=self._version,
+                    hit_rate=round(self.stats['hits'] / lookups, 3) if lookups else None)
+
+barcode_index = BarcodeIndex()
+
+def _item_row(item_id):
+    return db.session.execute(db.text(
+        "SELECT id, name, sku, selling_price, current_stock FROM item WHERE id = :id"
+    ), {'id': item_id}).first()
+
+def set_item_barcodes(item, codes):
+    """Replace an item's extra barcodes with `codes` (an iterable of strings). The caller commits."""
+    wanted = []
+    for code in codes:
+        code = normalize(code)
+        if not code:
+            continue
+        if len(code) > 64:
+            raise BarcodeError(f'Barcode {code[:20]}... is longer than 64 characters')
+        if code not in wanted:
+            wanted.append(code)
+    if wanted:
+        taken = db.session.query(ItemBarcode.barcode, Item.name).join(Item, Item.id == ItemBarcode.item_id) \
+            .filter(ItemBarcode.barcode.in_(wanted), ItemBarcode.item_id != item.id).first()
+        if taken:
+            raise BarcodeError(f'Barcode {taken.barcode} already belongs to {taken.name}')
+    current = {barcode.barcode: barcode for barcode in item.barcodes}
+    for code, barcode in current.items():
+        if code not in wanted:
+            item.barcodes.remove(barcode)
+    for code in wanted:
+        if code not in current:
+            item.barcodes.append(ItemBarcode(barcode=code))
+
+def parse_codes(text):
+    """Barcodes typed or scanned into a textarea: one per line, or comma separated"""
+    return [code for line in (text or '').splitlines() for code in line.split(',')]
+
+def _was(obj, attribute):
+    history = attributes.get_history(obj, attribute)
+    return (history.deleted or [None])[0]
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault('barcode_changes', [])
+    for obj in session.new:
+        if isinstance(obj, ItemBarcode):
+            changes.append(('barcode', obj.barcode, obj.item_id))
+        elif isinstance(obj, Item):
+            changes.append(('sku', obj.sku, obj.id))
+    for obj in session.dirty:
+        if isinstance(obj, ItemBarcode):
+            old_code = _was(obj, 'barcode')
+            if old_code is not None:
+                changes.append(('barcode', old_code, None))
+            changes.append(('barcode', obj.barcode, obj.item_id))
+        elif isinstance(obj, Item):
+            old_sku = _was(obj, 'sku')
+            if old_sku is not None and old_sku != obj.sku:
+                changes.append(('sku', old_sku, None))
+                changes.append(('sku', obj.sku, obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, ItemBarcode):
+            changes.append(('barcode', obj.barcode, None))
+        elif isinstance(obj, Item):
+            changes.append(('sku', obj.sku, None))
+
+@event.listens_for(Session, 'after_commit')
+def _apply_on_commit(session):
+    changes = session.info.pop('barcode_changes', None)
+    if changes and barcode_index.loaded:
+        barcode_index.apply(changes)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('barcode_changes', None)
@@ -0,0 +1,139 @@
+# benchmarks/barcode_benchmark.py - Scanner lookup latency and index cost at a million barcodes
+"""Fills a scratch database with items and barcodes, loads the in-memory index and times lookups.
+
+    python benchmarks/barcode_benchmark.py                       # 1M barcodes, 500k items
+    python benchmarks/barcode_benchmark.py --barcodes 5000000 --lookups 200000
+
+Reports the index load time and memory, then p50/p95/p99 latency in microseconds for:
+
+    index probe     the dict lookup alone
+    lookup()        what /api/v1/barcodes/<code> does: probe plus the item's price and stock
+    sql only        the same answer from the unique barcode index in SQLite, for comparison
+
+The database is reused when it already holds enough barcodes; pass --rebuild to start over.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE = os.path.join(tempfile.gettempdir(), 'inventory_barcodes.db')
+CHUNK_SIZE = 20000
+
+def ean13(number):
+    """12 digits plus the EAN-13 check digit"""
+    digits = f"{number:012d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+def fill(db, models, items, barcodes, first_code, rng):
+    import data_versions
+    execute = lambda sql: db.session.execute(db.text(sql))
+    data_versions.drop_triggers(execute)
+    db.session.execute(db.text('PRAGMA synchronous=OFF'))
+    start = (db.session.query(db.func.max(models.Item.id)).scalar() or 0) + 1
+    for offset in range(0, items, CHUNK_SIZE):
+        db.session.execute(models.Item.__table__.insert(), [{
+            'id': start + n, 'name': f"Barcode Item {start + n}", 'sku': f"BC{start + n:09d}",
+            'current_stock': float(rng.randint(0, 500)), 'min_stock_level': 5.0,
+            'cost_price': 100.0, 'selling_price': round(rng.uniform(10, 5000), 2), 'version': 1,
+        } for n in range(offset, min(offset + CHUNK_SIZE, items))])
+        db.session.commit()
+    # Every item gets one barcode, the rest go to random items as extra codes
+    for offset in range(0, barcodes, CHUNK_SIZE):
+        db.session.execute(models.ItemBarcode.__table__.insert(), [{
+            'item_id': start + (n if n < items else rng.randrange(items)),
+            'barcode': ean13(890000000000 + first_code + n),
+        } for n in range(offset, min(offset + CHUNK_SIZE, barcodes))])
+        db.session.commit()
+    data_versions.install_triggers(execute)
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+def percentiles(samples_ns):
+    samples = sorted(samples_ns)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] / 1000
+    return pick(0.5), pick(0.95), pick(0.99), statistics.fmean(samples) / 1000
+
+def timed(fn, codes):
+    samples = []
+    for code in codes:
+        started = time.perf_counter_ns()
+        fn(code)
+        samples.append(time.perf_counter_ns() - started)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark barcode lookups against the in-memory index')
+    parser.add_argument('--database', default=DEFAULT_DATABASE, help=f'SQLite file (default {DEFAULT_DATABASE})')
+    parser.add_argument('--barcodes', type=int, default=1000000)
+    parser.add_argument('--items', type=int, help='items the barcodes belong to (default barcodes / 2)')
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--sku-ratio', type=float, default=0.1, help='share of lookups that scan an SKU')
+    parser.add_argument('--rebuild', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    database = os.path.abspath(args.database)
+    if os.path.basename(database) == 'inventory.db':
+        parser.error('refusing to benchmark against inventory.db')
+    if args.rebuild and os.path.exists(database):
+        os.remove(database)
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    import database as models
+    from barcodes import barcode_index
+    db = models.db
+    rng = random.Random(args.seed)
+
+    with app_module.app.app_context():
+        app_module.create_schema()
+        existing = db.session.query(db.func.count(models.ItemBarcode.id)).scalar()
+        if existing < args.barcodes:
+            started = time.perf_counter()
+            fill(db, models, args.items or max(args.barcodes // 2, 1), args.barcodes - existing, existing, rng)
+            print(f"filled {args.barcodes - existing:,} barcodes in {time.perf_counter() - started:.1f}s")
+
+        tracemalloc.start()
+        barcode_index.load()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        barcode_index.load()
+        metrics = barcode_index.metrics()
+        print(f"index: {metrics['barcodes']:,} barcodes + {metrics['skus']:,} SKUs, "
+              f"load {metrics['load_seconds']:.2f}s, {memory / 2 ** 20:,.0f} MiB "
+              f"({memory / (metrics['barcodes'] + metrics['skus']):.0f} bytes per code)")
+
+        barcode_sample = db.session.execute(db.text(
+            "SELECT barcode FROM item_barcode ORDER BY random() LIMIT :n"), {'n': args.lookups}).scalars().all()
+        sku_sample = db.session.execute(db.text(
+            "SELECT sku FROM item ORDER BY random() LIMIT :n"), {'n': args.lookups}).scalars().all()
+        codes = [rng.choice(sku_sample) if rng.random() < args.sku_ratio else rng.choice(barcode_sample)
+                 for _ in range(args.lookups)]
+
+        probe = lambda code: barcode_index._barcodes.get(code) or barcode_index._skus.get(code)
+        sql = db.text("""
+            SELECT i.id, i.name, i.sku, i.selling_price, i.current_stock
+            FROM item i WHERE i.id = COALESCE((SELECT item_id FROM item_barcode WHERE barcode = :code),
+                                              (SELECT id FROM item WHERE sku = :code))
+        """)
+        sql_only = lambda code: db.session.execute(sql, {'code': code}).first()
+
+        print(f"\n{'path':<14} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'mean us':>9}")
+        for label, fn in (('index probe', probe), ('lookup()', barcode_index.lookup), ('sql only', sql_only)):
+            fn(codes[0])  # warm up
+            p50, p95, p99, mean = percentiles(timed(fn, codes))
+            print(f"{label:<14} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {mean:>9.1f}")
+
+        misses = barcode_index.stats['fallbacks']
+        print(f"\n{args.lookups:,} lookups, {misses:,} database fallbacks")
+
+if __name__ == '__main__':
+    main()
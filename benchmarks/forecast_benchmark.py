@@ -0,0 +1,43 @@
+# benchmarks/forecast_benchmark.py - Time the vectorized forecast on a synthetic demand matrix
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demand_forecast import moving_average, exponential_smoothing, suggest_min_stock
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark demand forecasting over an items x days matrix')
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"Generating {args.items:,} items x {args.days} days demand matrix...")
+    started = time.perf_counter()
+    # Skewed demand: most items sell rarely, a few sell every day
+    rates = rng.gamma(shape=0.5, scale=2.0, size=(args.items, 1)).astype(np.float32)
+    matrix = rng.poisson(rates, size=(args.items, args.days)).astype(np.float32)
+    print(f"  generated in {time.perf_counter() - started:.2f}s ({matrix.nbytes / 1024 / 1024:.0f} MB)")
+
+    results = []
+    for name, func in [
+        ('moving average (28d)', lambda: moving_average(matrix, 28)),
+        ('exponential smoothing', lambda: exponential_smoothing(matrix, 0.1)),
+        ('min stock (SES + safety stock)', lambda: suggest_min_stock(matrix, method='ses')),
+        ('min stock (MA + safety stock)', lambda: suggest_min_stock(matrix, method='ma')),
+    ]:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        results.append((name, elapsed))
+        print(f"  {name:<32} {elapsed:8.3f}s")
+
+    total = sum(elapsed for _, elapsed in results)
+    print(f"Total: {total:.2f}s for {args.items:,} items x {args.days} days")
+
+if __name__ == '__main__':
+    main()
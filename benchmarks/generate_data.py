@@ -0,0 +1,417 @@
+# benchmarks/generate_data.py - Synthetic dataset for load tests and benchmarks
+"""Fills a scratch database with realistic-looking inventory, party and order history.
+
+    python benchmarks/generate_data.py --size medium
+    python benchmarks/generate_data.py --size large --database /data/bench.db
+    python benchmarks/generate_data.py --items 2000000 --sales 5000000
+
+Distributions:
+  item popularity and customer size  Zipf-like (a few items and customers dominate)
+  cost prices                        log-normal around Rs 500, margins 10-60%
+  stock levels                       Pareto, so most items hold little and a few hold a lot
+  sale dates                         spread over --days with weekend peaks and yearly growth
+  lines per sale, quantity per line  geometric (mostly 1-3)
+  GST rates                          mostly 18% and 5%; sales are priced by tax.py like real ones
+
+Rows go in with Core executemany in chunks, one commit per chunk, with the data
+version and item_stock triggers dropped for the load and reinstalled afterwards.
+Stock ledger opening movements, per-location stock, cost layers, sales rollups,
+stock alerts and customer balances are rebuilt at the end so every report sees a
+consistent database. With --warehouses N, part of each item's opening stock is
+transferred out of the default warehouse into N-1 further locations.
+
+Never point this at inventory.db; it appends to whatever database it is given.
+"""
+import argparse
+import bisect
+import itertools
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE = os.path.join(tempfile.gettempdir(), 'inventory_bench.db')
+CHUNK_SIZE = 10000
+# GST slabs items are drawn from, weighted towards the common ones
+GST_RATES = [0, 5, 12, 18, 28]
+GST_RATE_WEIGHTS = [1, 4, 2, 8, 1]
+SALE_LINE_COLUMNS = ('id', 'sales_order_id', 'item_id', 'employee_id', 'quantity', 'unit_price', 'total_price',
+                     'discount', 'gst_rate', 'taxable_value', 'tax_amount')
+
+SIZES = {
+    #          items      customers  suppliers  employees  sales      purchases  tasks    logs
+    'small':  (1000,      200,       20,        10,        10000,     1000,      500,     10000),
+    'medium': (20000,     5000,      200,       50,        200000,    20000,     5000,    200000),
+    'large':  (200000,    50000,     1000,      200,       2000000,   200000,    20000,   2000000),
+    'xlarge': (2000000,   500000,    5000,      1000,      5000000,   500000,    50000,   5000000),
+}
+
+CATEGORIES = [('Electronics', 30), ('Stationery', 20), ('Hardware', 15), ('Grocery', 15),
+              ('Apparel', 10), ('Furniture', 5), ('Pharma', 5)]
+ADJECTIVES = ['Standard', 'Premium', 'Compact', 'Heavy Duty', 'Eco', 'Classic', 'Pro', 'Mini', 'Smart', 'Ultra']
+NOUNS = ['Cable', 'Notebook', 'Drill', 'Rice 5kg', 'Shirt', 'Chair', 'Tablet', 'Charger', 'Pen Set', 'Lamp',
+         'Bottle', 'Toolkit', 'Keyboard', 'Bag', 'Soap']
+CITIES = ['Mumbai, Maharashtra', 'Delhi', 'Bangalore, Karnataka', 'Chennai, Tamil Nadu', 'Pune, Maharashtra',
+          'Hyderabad, Telangana', 'Kolkata, West Bengal', 'Ahmedabad, Gujarat', 'Jaipur, Rajasthan']
+LOG_ACTIONS = ['LOGIN', 'CREATE_SALE', 'COMPLETE_SALE', 'CREATE_PURCHASE', 'RECEIVE_PURCHASE', 'EDIT_ITEM',
+               'ADD_CUSTOMER', 'EXPORT_EXCEL', 'LOGOUT']
+# Relative sales volume Monday..Sunday
+WEEKDAY_WEIGHTS = [0.9, 0.85, 0.9, 1.0, 1.15, 1.5, 1.2]
+
+def zipf_cum_weights(count, exponent=1.07):
+    """Cumulative weights for random.choices where rank r has weight 1 / r**exponent"""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+def geometric(rng, mean, cap):
+    """1, 2, 3... with the given mean, capped"""
+    p = 1 / mean
+    return min(cap, 1 + int(math.log(1 - rng.random()) / math.log(1 - p))) if p < 1 else 1
+
+def chunked(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class Generator:
+    def __init__(self, db, models, seed, days):
+        self.db = db
+        self.m = models
+        self.rng = random.Random(seed)
+        self.now = datetime.now().replace(microsecond=0)
+        self.days = days
+        self.counts = {}
+
+    def _next_id(self, model):
+        return (self.db.session.query(self.db.func.max(model.id)).scalar() or 0) + 1
+
+    def insert(self, model, rows):
+        table = model.__table__
+        for chunk in chunked(rows):
+            self.db.session.execute(table.insert(), chunk)
+            self.db.session.commit()
+            self.counts[table.name] = self.counts.get(table.name, 0) + len(chunk)
+
+    def _phone(self):
+        return f"+91-{self.rng.randint(7000000000, 9999999999)}"
+
+    def _gstin(self):
+        letters = ''.join(self.rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(5))
+        return f"{self.rng.randint(1, 37):02d}{letters}{self.rng.randint(1000, 9999)}A1Z{self.rng.randint(1, 9)}"
+
+    def _random_date(self):
+        # Later dates are more likely (growth), weekends busier; rejection sampling keeps it simple
+        while True:
+            age = self.rng.random() * self.days
+            moment = self.now - timedelta(days=age, seconds=self.rng.randint(0, 86399))
+            growth = 1 - 0.4 * age / max(self.days, 1)
+            if self.rng.random() * 1.5 < WEEKDAY_WEIGHTS[moment.weekday()] * growth:
+                return moment
+
+    def parties(self, customers, suppliers, employees):
+        rng = self.rng
+        start = self._next_id(self.m.Supplier)
+        self.insert(self.m.Supplier, ({
+            'id': start + n, 'name': f"Supplier {start + n} Pvt. Ltd.", 'contact_person': f"Contact {start + n}",
+            'phone': self._phone(), 'email': f"sales{start + n}@supplier.example", 'address': rng.choice(CITIES),
+            'gst_number': self._gstin(), 'tally_synced': False, 'version': 1,
+        } for n in range(suppliers)))
+        self.supplier_ids = range(start, start + suppliers)
+
+        start = self._next_id(self.m.Customer)
+        self.customer_gstins = [self._gstin() if rng.random() < 0.6 else None for _ in range(customers)]
+        self.insert(self.m.Customer, ({
+            'id': start + n, 'name': f"Customer {start + n}", 'phone': self._phone(),
+            'email': f"buyer{start + n}@customer.example", 'address': rng.choice(CITIES),
+            'gst_number': self.customer_gstins[n],
+            # Generous limits so benchmark sales are not refused on credit
+            'credit_limit': rng.choice([0, 10 ** 8]), 'outstanding_balance': 0,
+            'tally_synced': False, 'version': 1,
+        } for n in range(customers)))
+        self.customer_ids = range(start, start + customers)
+        self.customer_weights = zipf_cum_weights(customers, exponent=0.9)
+
+        start = self._next_id(self.m.Employee)
+        self.insert(self.m.Employee, ({
+            'id': start + n, 'name': f"Employee {start + n}", 'role': rng.choice(['Sales', 'Sales', 'Store', 'Manager']),
+            'department': rng.choice(['Sales', 'Operations', 'Warehouse']), 'hourly_rate': rng.choice([250, 400, 600]),
+            'phone': self._phone(), 'email': f"staff{start + n}@company.example", 'address': rng.choice(CITIES),
+            'join_date': self.now - timedelta(days=rng.randint(30, 2000)), 'version': 1,
+        } for n in range(employees)))
+        self.employee_ids = range(start, start + employees)
+
+    def items(self, count):
+        rng = self.rng
+        start = self._next_id(self.m.Item)
+        categories = [c for c, _ in CATEGORIES]
+        category_weights = [w for _, w in CATEGORIES]
+        self.cost_prices = []
+        self.selling_prices = []
+        self.item_taxes = []
+
+        def rows():
+            for n in range(count):
+                cost = round(max(5, rng.lognormvariate(math.log(500), 1.2)), 2)
+                price = round(cost * rng.uniform(1.1, 1.6), 2)
+                hsn_code, gst_rate = f"{rng.randint(1001, 9706)}", rng.choices(GST_RATES, GST_RATE_WEIGHTS)[0]
+                self.cost_prices.append(cost)
+                self.selling_prices.append(price)
+                self.item_taxes.append((hsn_code, gst_rate))
+                yield {
+                    'id': start + n, 'name': f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {start + n}",
+                    'sku': f"SYN{start + n:09d}", 'category': rng.choices(categories, category_weights)[0],
+                    # Large enough that benchmark sales rarely run out
+                    'current_stock': float(int(rng.paretovariate(1.2) * 20)), 'min_stock_level': float(rng.randint(2, 25)),
+                    'cost_price': cost, 'selling_price': price, 'average_cost': cost,
+                    'hsn_code': hsn_code, 'gst_rate': gst_rate,
+                    'preferred_supplier_id': rng.choice(self.supplier_ids) if self.supplier_ids else None,
+                    'created_date': self.now - timedelta(days=rng.randint(0, self.days)),
+                    'tally_synced': False, 'version': 1,
+                }
+
+        self.insert(self.m.Item, rows())
+        self.item_ids = range(start, start + count)
+        # Shuffle which ids are popular so popularity is not correlated with id order
+        ranked = list(self.item_ids)
+        rng.shuffle(ranked)
+        self.item_by_rank = ranked
+        self.item_weights = zipf_cum_weights(count)
+
+    def _pick_items(self, k):
+        ranks = self.rng.choices(range(len(self.item_by_rank)), cum_weights=self.item_weights, k=k)
+        return [self.item_by_rank[rank] for rank in set(ranks)]
+
+    def _price(self, item_id):
+        return self.selling_prices[item_id - self.item_ids.start]
+
+    def _cost(self, item_id):
+        return self.cost_prices[item_id - self.item_ids.start]
+
+    def sales(self, count, pending_ratio=0.02):
+        import tax  # importable once main() has put the app on sys.path
+        rng = self.rng
+        sale_id = self._next_id(self.m.SalesOrder)
+        line_id = self._next_id(self.m.SaleItem)
+        receivable_id = self._next_id(self.m.AccountsReceivable)
+        for chunk_start in range(0, count, CHUNK_SIZE):
+            invoices = []
+            for _ in range(min(CHUNK_SIZE, count - chunk_start)):
+                employee_id = rng.choice(self.employee_ids)
+                invoice_lines = []
+                for item_id in self._pick_items(geometric(rng, 2.5, 20)):
+                    hsn_code, gst_rate = self.item_taxes[item_id - self.item_ids.start]
+                    invoice_lines.append({'id': line_id, 'sales_order_id': sale_id, 'item_id': item_id,
+                                          'employee_id': employee_id, 'quantity': float(geometric(rng, 1.8, 50)),
+                                          'unit_price': self._price(item_id), 'hsn_code': hsn_code,
+                                          'gst_rate': gst_rate})
+                    line_id += 1
+                subtotal = sum(line['quantity'] * line['unit_price'] for line in invoice_lines)
+                customer_index = bisect.bisect_left(self.customer_weights, rng.random() * self.customer_weights[-1])
+                gstin = self.customer_gstins[customer_index]
+                place_of_supply, inter_state = tax.place_of_supply(gstin)
+                invoices.append({
+                    'id': sale_id, 'customer_id': self.customer_ids[customer_index], 'employee_id': employee_id,
+                    'sale_date': self._random_date(), 'lines': invoice_lines,
+                    'discount': round(subtotal * 0.05, 2) if rng.random() < 0.2 else 0,
+                    'customer_gstin': gstin, 'place_of_supply': place_of_supply, 'inter_state': inter_state,
+                    'status': 'pending' if rng.random() < pending_ratio else 'completed'})
+                sale_id += 1
+            # The whole chunk is priced in one pass, as POS batches are
+            tax.compute_invoices(invoices)
+
+            orders, lines, tax_lines, receivables = [], [], [], []
+            for invoice in invoices:
+                order_id, sale_date, customer_id, status = (invoice['id'], invoice['sale_date'],
+                                                            invoice['customer_id'], invoice['status'])
+                total = invoice['total_amount']
+                orders.append({'id': order_id, 'customer_id': customer_id, 'employee_id': invoice['employee_id'],
+                               'invoice_number': f"INV-SYN-{order_id:09d}", 'sale_date': sale_date,
+                               'total_amount': total, 'gst_amount': invoice['gst_amount'],
+                               'discount': invoice['discount'], 'status': status, 'tally_synced': False,
+                               'customer_gstin': invoice['customer_gstin'],
+                               'place_of_supply': invoice['place_of_supply'],
+                               'inter_state': invoice['inter_state'], 'version': 1})
+                lines.extend({name: line[name] for name in SALE_LINE_COLUMNS} for line in invoice['lines'])
+                tax_lines.extend(dict(tax_line, sales_order_id=order_id) for tax_line in invoice['tax_lines'])
+                if status == 'completed':
+                    due = sale_date + timedelta(days=30)
+                    paid = due < self.now and rng.random() < 0.85
+                    receivables.append({'id': receivable_id, 'sales_order_id': order_id, 'customer_id': customer_id,
+                                        'due_date': due, 'amount': total, 'status': 'paid' if paid else 'pending',
+                                        'paid_date': due - timedelta(days=rng.randint(0, 29)) if paid else None,
+                                        'version': 1})
+                    receivable_id += 1
+            self.insert(self.m.SalesOrder, orders)
+            self.insert(self.m.SaleItem, lines)
+            self.insert(self.m.SaleTaxLine, tax_lines)
+            self.insert(self.m.AccountsReceivable, receivables)
+
+    def purchases(self, count, pending_ratio=0.05):
+        rng = self.rng
+        po_id = self._next_id(self.m.PurchaseOrder)
+        line_id = self._next_id(self.m.PurchaseItem)
+        payable_id = self._next_id(self.m.AccountsPayable)
+        for chunk_start in range(0, count, CHUNK_SIZE):
+            orders, lines, payables = [], [], []
+            for _ in range(min(CHUNK_SIZE, count - chunk_start)):
+                order_date = self._random_date()
+                supplier_id = rng.choice(self.supplier_ids)
+                total = 0
+                for item_id in self._pick_items(geometric(rng, 4, 40)):
+                    quantity = float(rng.choice([10, 20, 25, 50, 100, 200]))
+                    unit_cost = self._cost(item_id)
+                    total += quantity * unit_cost
+                    lines.append({'id': line_id, 'purchase_order_id': po_id, 'item_id': item_id,
+                                  'quantity': quantity, 'unit_cost': unit_cost, 'total_cost': quantity * unit_cost})
+                    line_id += 1
+                status = 'pending' if rng.random() < pending_ratio else 'received'
+                orders.append({'id': po_id, 'supplier_id': supplier_id, 'po_number': f"PO-SYN-{po_id:09d}",
+                               'order_date': order_date, 'total_amount': round(total, 2), 'status': status,
+                               'tally_synced': False, 'version': 1})
+                if status == 'received':
+                    due = order_date + timedelta(days=30)
+                    paid = due < self.now and rng.random() < 0.9
+                    payables.append({'id': payable_id, 'purchase_order_id': po_id, 'supplier_id': supplier_id,
+                                     'due_date': due, 'amount': round(total, 2), 'status': 'paid' if paid else 'pending',
+                                     'paid_date': due if paid else None, 'version': 1})
+                    payable_id += 1
+                po_id += 1
+            self.insert(self.m.PurchaseOrder, orders)
+            self.insert(self.m.PurchaseItem, lines)
+            self.insert(self.m.AccountsPayable, payables)
+
+    def warehouses(self, count):
+        """Extra locations, each stocked with a share of items moved out of the default one"""
+        rng = self.rng
+        default_id = self.db.session.query(self.m.Warehouse.id).filter_by(is_default=True).scalar()
+        start = self._next_id(self.m.Warehouse)
+        self.insert(self.m.Warehouse, ({
+            'id': start + n, 'code': f"WH{start + n:03d}", 'name': f"Warehouse {start + n}",
+            'address': rng.choice(CITIES), 'is_default': False, 'active': True, 'created_date': self.now,
+        } for n in range(count - 1)))
+        warehouse_ids = range(start, start + count - 1)
+        if not warehouse_ids:
+            return
+
+        def rows():
+            stock = self.db.session.execute(self.db.text(
+                "SELECT id, current_stock FROM item WHERE current_stock > 1"))
+            for item_id, current_stock in stock.all():
+                for warehouse_id in rng.sample(warehouse_ids, min(len(warehouse_ids), geometric(rng, 3, 10))):
+                    quantity = float(int(current_stock * rng.uniform(0.05, 0.3)))
+                    if quantity <= 0:
+                        continue
+                    current_stock -= quantity
+                    for signed, movement_type, location in ((-quantity, 'transfer_out', default_id),
+                                                            (quantity, 'transfer_in', warehouse_id)):
+                        yield {'item_id': item_id, 'quantity': signed, 'movement_type': movement_type,
+                               'reference_type': 'StockTransfer', 'warehouse_id': location, 'created_date': self.now}
+
+        self.insert(self.m.StockMovement, rows())
+
+    def tasks(self, count):
+        rng = self.rng
+        self.insert(self.m.WorkerTask, ({
+            'employee_id': rng.choice(self.employee_ids),
+            'task_type': rng.choice(['Stock Count', 'Delivery', 'Restock', 'Customer Visit']),
+            'description': 'Synthetic task', 'assigned_date': (assigned := self._random_date()),
+            'due_date': assigned + timedelta(days=rng.randint(1, 14)),
+            'status': (status := rng.choices(['completed', 'pending', 'in_progress'], [80, 15, 5])[0]),
+            'completed_date': assigned + timedelta(days=rng.randint(0, 16)) if status == 'completed' else None,
+            'priority': rng.choices(['low', 'medium', 'high'], [30, 50, 20])[0], 'version': 1,
+        } for _ in range(count)))
+
+    def logs(self, count, user_id):
+        rng = self.rng
+        self.insert(self.m.SystemLog, ({
+            'user_id': user_id, 'action': (action := rng.choice(LOG_ACTIONS)),
+            'description': f"Synthetic {action.lower().replace('_', ' ')}",
+            'ip_address': f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}", 'created_date': self._random_date(),
+        } for _ in range(count)))
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic inventory dataset for benchmarks')
+    parser.add_argument('--database', default=DEFAULT_DATABASE, help=f'SQLite file (default {DEFAULT_DATABASE})')
+    parser.add_argument('--size', choices=list(SIZES), default='small')
+    for name in ('items', 'customers', 'suppliers', 'employees', 'sales', 'purchases', 'tasks', 'logs'):
+        parser.add_argument(f'--{name}', type=int, help=f'override the number of {name}')
+    parser.add_argument('--warehouses', type=int, default=1, help='stock locations, including the default one')
+    parser.add_argument('--days', type=int, default=730, help='history length in days')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    database = os.path.abspath(args.database)
+    if os.path.basename(database) == 'inventory.db':
+        parser.error('refusing to generate into inventory.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    import commissions
+    import database as models
+    import data_versions
+    import inventory_valuation
+    import sales_analytics
+    import stock_ledger
+    import warehouses
+    from credit_control import reconcile_customer_balances
+    from stock_alerts import refresh_stock_alerts
+    db = models.db
+
+    sizes = dict(zip(['items', 'customers', 'suppliers', 'employees', 'sales', 'purchases', 'tasks', 'logs'],
+                     SIZES[args.size]))
+    sizes.update({name: getattr(args, name) for name in sizes if getattr(args, name) is not None})
+
+    with app_module.app.app_context():
+        app_module.create_schema()
+        app_module.seed_database()
+        admin_id = models.User.query.filter_by(username='admin').first().id
+        execute = lambda sql: db.session.execute(db.text(sql))
+        data_versions.drop_triggers(execute)
+        warehouses.drop_stock_triggers(execute)
+        db.session.execute(db.text('PRAGMA synchronous=OFF'))
+        db.session.commit()
+
+        generator = Generator(db, models, args.seed, args.days)
+        steps = [
+            ('parties', lambda: generator.parties(sizes['customers'], sizes['suppliers'], sizes['employees'])),
+            ('items', lambda: generator.items(sizes['items'])),
+            ('sales', lambda: generator.sales(sizes['sales'])),
+            ('purchases', lambda: generator.purchases(sizes['purchases'])),
+            ('tasks', lambda: generator.tasks(sizes['tasks'])),
+            ('logs', lambda: generator.logs(sizes['logs'], admin_id)),
+            ('opening stock movements', stock_ledger.backfill_opening_movements),
+            ('warehouses', lambda: generator.warehouses(args.warehouses)),
+            ('warehouse stock', warehouses.rebuild_item_stock),
+            ('opening cost layers', inventory_valuation.seed_opening_layers),
+            ('sales rollups', sales_analytics.rebuild_rollups),
+            ('employee performance', lambda: commissions.refresh_months(
+                commissions.months_between(generator.now - timedelta(days=args.days), generator.now))),
+            ('stock alerts', lambda: (refresh_stock_alerts(), db.session.commit())),
+            ('customer balances', lambda: (reconcile_customer_balances(fix=True), db.session.commit())),
+        ]
+        started = time.perf_counter()
+        for label, step in steps:
+            step_started = time.perf_counter()
+            step()
+            print(f"{label:<24} {time.perf_counter() - step_started:>8.1f}s")
+
+        data_versions.install_triggers(execute)
+        warehouses.install_stock_triggers(execute)
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    total = sum(generator.counts.values())
+    print(f"\n{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s) -> {database}")
+    for table, count in sorted(generator.counts.items()):
+        print(f"  {table:<22} {count:>12,}")
+
+if __name__ == '__main__':
+    main()
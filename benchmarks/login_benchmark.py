@@ -0,0 +1,43 @@
+# benchmarks/login_benchmark.py - Password checks per second per core under each hashing policy
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from passwords import HASH_POLICIES
+
+def _check_for(stored_hash, seconds):
+    """Run password checks for `seconds` and return how many completed"""
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        check_password_hash(stored_hash, 'correct horse battery staple')
+        count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark login password verification under each hashing policy')
+    parser.add_argument('--seconds', type=float, default=3.0, help='measurement time per policy and mode')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--policy', action='append', help='policy name or Werkzeug method (repeatable)')
+    args = parser.parse_args()
+
+    policies = args.policy or list(HASH_POLICIES)
+    print(f"{'policy':<14} {'method':<24} {'1 core/s':>10} {f'{args.workers} cores/s':>12} {'per core/s':>11} {'ms/login':>9}")
+    for policy in policies:
+        method = HASH_POLICIES.get(policy, policy)
+        stored_hash = generate_password_hash('correct horse battery staple', method=method)
+
+        single = _check_for(stored_hash, args.seconds) / args.seconds
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            counts = list(pool.map(_check_for, [stored_hash] * args.workers, [args.seconds] * args.workers))
+        parallel = sum(counts) / args.seconds
+
+        print(f"{policy:<14} {method:<24} {single:>10.1f} {parallel:>12.1f} {parallel / args.workers:>11.1f} "
+              f"{1000 / single:>9.1f}")
+
+if __name__ == '__main__':
+    main()
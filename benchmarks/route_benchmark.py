@@ -0,0 +1,279 @@
+# benchmarks/route_benchmark.py - Latency, throughput and queries per request for the key routes
+"""Drives the main pages and write paths through Flask's test client at fixed concurrency.
+
+    python benchmarks/generate_data.py --size medium          # once, builds the dataset
+    python benchmarks/route_benchmark.py --concurrency 1 4 8 --requests 200 --label baseline
+    python benchmarks/route_benchmark.py --routes create_sale complete_sale --label after-fix
+
+Each route runs `--requests` requests split across `--concurrency` threads, every
+thread logged in with its own client. For every route and concurrency level it
+records p50/p95/p99 latency, mean and max SQL statements per request (counted on the
+engine) and requests per second. Responses with status >= 400 or a 'danger' flash
+count as errors.
+
+Results are appended to benchmarks/results.jsonl, one JSON object per run with the
+git commit, label and dataset size, so runs before and after a change can be compared
+with --compare.
+
+Write routes change the dataset: complete_sale and receive_purchase use up the pending
+orders created by generate_data.py, and create_sale adds new pending sales. Regenerate
+the database when the pending pools run low. Running in-process means the GIL is
+shared; use serve.py plus an HTTP load tool to measure multi-process throughput.
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from generate_data import DEFAULT_DATABASE
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl')
+
+class PoolExhausted(Exception):
+    pass
+
+class Fixture:
+    """Ids the scenarios draw from, loaded once from the benchmark database"""
+
+    def __init__(self, models):
+        db = models.db
+        self.customer_ids = [row[0] for row in db.session.query(models.Customer.id)]
+        self.employee_ids = [row[0] for row in db.session.query(models.Employee.id)]
+        self.item_ids = [row[0] for row in db.session.query(models.Item.id).filter(models.Item.current_stock >= 10)]
+        self.pending_sales = queue.Queue()
+        for (sale_id,) in db.session.query(models.SalesOrder.id).filter_by(status='pending'):
+            self.pending_sales.put(sale_id)
+        self.pending_purchases = queue.Queue()
+        for (po_id,) in db.session.query(models.PurchaseOrder.id).filter_by(status='pending'):
+            self.pending_purchases.put(po_id)
+        self.dataset = {table: db.session.execute(db.text(f'SELECT COUNT(*) FROM {table}')).scalar()
+                        for table in ('item', 'customer', 'sales_order', 'sale_item', 'purchase_order',
+                                      'accounts_receivable', 'system_log')}
+
+    @staticmethod
+    def take(pool):
+        try:
+            return pool.get_nowait()
+        except queue.Empty:
+            raise PoolExhausted()
+
+def create_sale(client, rng, fixture):
+    lines = rng.sample(fixture.item_ids, min(len(fixture.item_ids), rng.randint(1, 4)))
+    employee_id = rng.choice(fixture.employee_ids)
+    return client.post('/create_sale', data={
+        'customer_id': rng.choice(fixture.customer_ids),
+        'employee_id': employee_id,
+        'item_id[]': lines,
+        'quantity[]': [1] * len(lines),
+        'assigned_employee[]': [employee_id] * len(lines),
+        'discount': 0,
+    })
+
+SCENARIOS = {
+    'dashboard': lambda client, rng, fixture: client.get('/'),
+    'items': lambda client, rng, fixture: client.get('/items'),
+    'reports': lambda client, rng, fixture: client.get('/reports'),
+    'export_excel': lambda client, rng, fixture: client.get('/export_excel/stock'),
+    'create_sale': create_sale,
+    'complete_sale': lambda client, rng, fixture: client.get(
+        f'/complete_sale/{fixture.take(fixture.pending_sales)}'),
+    'receive_purchase': lambda client, rng, fixture: client.get(
+        f'/receive_purchase/{fixture.take(fixture.pending_purchases)}'),
+}
+
+class RequestProbe:
+    """Per-thread SQL statement count and error flashes for the request being measured"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def reset(self):
+        self._local.queries = 0
+        self._local.flash_error = False
+
+    def on_execute(self, *args, **kwargs):
+        self._local.queries = getattr(self._local, 'queries', 0) + 1
+
+    def on_flash(self, sender, message, category, **kwargs):
+        if category == 'danger':
+            self._local.flash_error = True
+
+    @property
+    def queries(self):
+        return self._local.queries
+
+    @property
+    def flash_error(self):
+        return self._local.flash_error
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def logged_in_client(app, username, password):
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': password})
+    if response.status_code >= 400 or '/login' in response.headers.get('Location', '/login'):
+        raise SystemExit(f'Login as {username} failed; run generate_data.py against this database first')
+    return client
+
+def run_route(app, name, fixture, probe, concurrency, requests, warmup, credentials, seed):
+    scenario = SCENARIOS[name]
+    clients = [logged_in_client(app, *credentials) for _ in range(concurrency)]
+    for n in range(warmup):
+        try:
+            scenario(clients[0], random.Random(seed - n - 1), fixture)
+        except PoolExhausted:
+            break
+
+    def worker(index):
+        client = clients[index]
+        rng = random.Random(seed + index)
+        samples = []
+        for _ in range(requests // concurrency + (1 if index < requests % concurrency else 0)):
+            probe.reset()
+            started = time.perf_counter()
+            try:
+                response = scenario(client, rng, fixture)
+            except PoolExhausted:
+                break
+            elapsed = time.perf_counter() - started
+            samples.append((elapsed, probe.queries, response.status_code >= 400 or probe.flash_error))
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [sample for result in pool.map(worker, range(concurrency)) for sample in result]
+    wall = time.perf_counter() - started
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    queries = [sample[1] for sample in samples]
+    return {
+        'route': name,
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[2]),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'mean_queries': statistics.mean(queries) if queries else None,
+        'max_queries': max(queries) if queries else None,
+        'throughput_rps': len(samples) / wall if wall else None,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_header():
+    print(f"{'route':<17} {'conc':>4} {'reqs':>6} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'queries':>8} {'max q':>6} {'req/s':>8}")
+
+def print_row(r):
+    if not r['requests']:
+        print(f"{r['route']:<17} {r['concurrency']:>4} {0:>6}  (no pending orders left)")
+        return
+    print(f"{r['route']:<17} {r['concurrency']:>4} {r['requests']:>6} {r['errors']:>5} {r['p50_ms']:>8.1f} "
+          f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['mean_queries']:>8.1f} {r['max_queries']:>6} "
+          f"{r['throughput_rps']:>8.1f}")
+
+def compare(labels):
+    """Print p95 latency and queries per request for the latest run of each label side by side"""
+    runs = {}
+    with open(RESULTS_FILE) as results_file:
+        for line in results_file:
+            run = json.loads(line)
+            if run['label'] in labels:
+                runs[run['label']] = run
+    missing = [label for label in labels if label not in runs]
+    if missing:
+        raise SystemExit(f"No results for: {', '.join(missing)}")
+    keys = sorted({(r['route'], r['concurrency']) for run in runs.values() for r in run['results']})
+    print(f"{'route':<17} {'conc':>4} " + ' '.join(f"{label[:16]:>16} {'q':>5}" for label in labels))
+    for route, concurrency in keys:
+        cells = []
+        for label in labels:
+            match = [r for r in runs[label]['results'] if (r['route'], r['concurrency']) == (route, concurrency)]
+            if match and match[0]['requests']:
+                cells.append(f"{match[0]['p95_ms']:>13.1f} ms {match[0]['mean_queries']:>5.1f}")
+            else:
+                cells.append(f"{'-':>16} {'-':>5}")
+        print(f"{route:<17} {concurrency:>4} " + ' '.join(cells))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the key routes against a generated dataset')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--routes', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--requests', type=int, default=100, help='measured requests per route and concurrency')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests before each measurement')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--label', default=datetime.now().strftime('run-%Y%m%d-%H%M%S'))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--compare', nargs='+', metavar='LABEL', help='compare saved runs instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare)
+        return
+
+    database = os.path.abspath(args.database)
+    if not os.path.exists(database):
+        raise SystemExit(f'{database} does not exist; run benchmarks/generate_data.py first')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    sys.path.insert(0, ROOT)
+    from flask import message_flashed
+    from sqlalchemy import event
+    import database as models
+    from app import app
+    from passwords import login_throttle
+
+    # Every client logs in from 127.0.0.1
+    app.config['LOGIN_RATE_LIMIT_IP'] = (10 ** 6, 60)
+    login_throttle.init_app(app)
+
+    probe = RequestProbe()
+    message_flashed.connect(probe.on_flash, app)
+    with app.app_context():
+        event.listen(models.db.engine, 'before_cursor_execute', probe.on_execute)
+        fixture = Fixture(models)
+        models.db.session.remove()
+
+    print(f"dataset: {', '.join(f'{table} {count:,}' for table, count in fixture.dataset.items())}\n")
+    print_header()
+    results = []
+    for concurrency in args.concurrency:
+        for route in args.routes:
+            results.append(run_route(app, route, fixture, probe, concurrency, args.requests, args.warmup,
+                                     (args.username, args.password), args.seed))
+            print_row(results[-1])
+
+    with open(RESULTS_FILE, 'a') as results_file:
+        results_file.write(json.dumps({
+            'label': args.label,
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'dataset': fixture.dataset,
+            'results': results,
+        }) + '\n')
+    print(f"\nSaved as '{args.label}' in {RESULTS_FILE}")
+
+if __name__ == '__main__':
+    main()
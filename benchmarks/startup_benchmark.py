@@ -0,0 +1,56 @@
+# benchmarks/startup_benchmark.py - Cold import time and memory of one app worker
+"""Measures what each worker pays to import app.py, in a fresh interpreter per run.
+
+  lazy    import app as it is now; pandas, numpy, openpyxl and requests load on first use
+  eager   import app, then the modules it used to import at the top (the old behaviour)
+
+For each mode it reports the median import time, the peak RSS of the process and which
+of the heavy modules ended up loaded. `python -X importtime -c "import app"` gives the
+per-module breakdown if one import stands out.
+
+    python benchmarks/startup_benchmark.py --runs 7
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'requests']
+
+# Runs in the child interpreter; prints "seconds rss_kb loaded,modules"
+PROBE = '''
+import resource, sys, time
+started = time.perf_counter()
+import app
+for name in {eager!r}:
+    __import__(name)
+elapsed = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss //= 1024  # bytes on macOS, KB on Linux
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, rss, ','.join(loaded))
+'''
+
+def measure(eager):
+    code = PROBE.format(eager=HEAVY_MODULES if eager else [], heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout.split()
+    return float(output[0]), int(output[1]), output[2] if len(output) > 2 else '-'
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold import time and RSS of the app')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'import ms':>10} {'RSS MB':>8}  loaded")
+    for mode in ('lazy', 'eager'):
+        results = [measure(mode == 'eager') for _ in range(args.runs)]
+        seconds = statistics.median(r[0] for r in results)
+        rss_mb = statistics.median(r[1] for r in results) / 1024
+        print(f"{mode:<6} {seconds * 1000:>10.0f} {rss_mb:>8.1f}  {results[-1][2]}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+# cache.py - Read-through cache for reference data, invalidated when writes commit
+import itertools
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+import data_versions
+
+DEFAULT_TTL = 300
+
+class LRUCache:
+    """In-process LRU cache with a TTL per entry"""
+
+    def __init__(self, maxsize=256, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (found, value)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class RedisCache:
+    """Same interface on a Redis-compatible server, so every worker process shares one cache"""
+
+    def __init__(self, url, ttl=DEFAULT_TTL, prefix='inventory:'):
+        import redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=ttl or self.ttl)
+
+    def delete_many(self, keys):
+        if keys:
+            self._client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(self.prefix + '*'))
+
+class ReferenceCache:
+    """Named, read-through cache entries that depend on a set of tables.
+
+    Entries are registered with @reference_cache.register(key, tables) and read with
+    reference_cache.get(key). Each entry is stored with the data_versions counters of
+    its tables and served only while they are unchanged, so a write by any process -
+    another worker, a CLI command, an import - is seen from the next request on. The
+    counters are read once per request, with the fragment cache's. Commits in
+    this process also drop the entries of the tables they touched straight away.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LRUCache()
+        self._loaders = {}
+        self._tables = {}
+        self._generations = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        redis_url = app.config.get('CACHE_REDIS_URL')
+        ttl = app.config.get('CACHE_TTL', DEFAULT_TTL)
+        if redis_url:
+            try:
+                self.backend = RedisCache(redis_url, ttl=ttl)
+                return
+            except ImportError:
+                app.logger.warning('CACHE_REDIS_URL is set but redis is not installed; using in-process cache')
+        self.backend = LRUCache(maxsize=app.config.get('CACHE_MAX_ENTRIES', 256), ttl=ttl)
+
+    def register(self, key, tables, ttl=None):
+        def decorator(loader):
+            self._loaders[key] = (loader, ttl)
+            self._tables[key] = set(tables)
+            self._generations.setdefault(key, 0)
+            self._stats.setdefault(key, {'hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0})
+            return loader
+        return decorator
+
+    def get(self, key):
+        stats = self._stats[key]
+        # Counters as read at the start of the request, so hits cost no query; a write
+        # landing during the load shows up as a newer version next request
+        counters = data_versions.request_versions()
+        versions = tuple(counters.get(table, 0) for table in sorted(self._tables[key]))
+        try:
+            found, entry = self.backend.get(key)
+        except Exception:
+            stats['errors'] += 1
+            found, entry = False, None
+        if found and entry[0] == versions:
+            stats['hits'] += 1
+            return entry[1]
+
+        stats['misses'] += 1
+        loader, ttl = self._loaders[key]
+        generation = self._generations[key]
+        value = loader()
+        # Skip the store if a commit invalidated the key while we were loading
+        if generation == self._generations[key]:
+            try:
+                self.backend.set(key, (versions, value), ttl)
+            except Exception:
+                stats['errors'] += 1
+        return value
+
+    def invalidate_tables(self, tables):
+        keys = [key for key, depends_on in self._tables.items() if depends_on & tables]
+        with self._lock:
+            for key in keys:
+                self._generations[key] += 1
+                self._stats[key]['invalidations'] += 1
+        try:
+            self.backend.delete_many(keys)
+        except Exception:
+            for key in keys:
+                self._stats[key]['errors'] += 1
+        return keys
+
+    def clear(self):
+        self.invalidate_tables(set().union(*self._tables.values()))
+
+    def metrics(self):
+        entries = {}
+        for key, stats in self._stats.items():
+            lookups = stats['hits'] + stats['misses']
+            entries[key] = dict(stats, tables=sorted(self._tables[key]),
+                                hit_rate=round(stats['hits'] / lookups, 3) if lookups else None)
+        return {
+            'backend': type(self.backend).__name__,
+            'size': len(self.backend),
+            'evictions': self.backend.evictions,
+            'entries': entries
+        }
+
+reference_cache = ReferenceCache()
+
+# Called with the set of table names written by each committed transaction
+commit_listeners = [reference_cache.invalidate_tables]
+
+# Table names written by raw SQL (db.text) statements
+_WRITE_SQL = re.compile(r'\b(?:insert\s+(?:or\s+\w+\s+)?into|update|delete\s+from)\s+["`]?(\w+)', re.IGNORECASE)
+
+def _touched(session):
+    return session.info.setdefault('touched_tables', set())
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state here
+    touched = _touched(session)
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            touched.add(table)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_execute(orm_execute_state):
+    # Bulk query.update()/delete(), Core executemany and raw SQL bypass the flush
+    if orm_execute_state.is_select:
+        return
+    statement = orm_execute_state.statement
+    if isinstance(statement, TextClause):
+        tables = _WRITE_SQL.findall(statement.text)
+    else:
+        table = getattr(statement, 'table', None)
+        tables = [table.name] if table is not None and hasattr(table, 'name') else []
+    if tables:
+        _touched(orm_execute_state.session).update(table.lower() for table in tables)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    tables = session.info.pop('touched_tables', None)
+    if tables:
+        for listener in commit_listeners:
+            listener(tables)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('touched_tables', None)
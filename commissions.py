@@ -0,0 +1,157 @@
+# commissions.py - Sales commission, base pay and task productivity per employee per month
+"""Monthly employee performance, computed in SQL and kept in employee_performance.
+
+A month's rows come from one INSERT ... SELECT: completed sales grouped by the
+selling employee on each line (SaleItem.employee_id, not the order's), tasks
+assigned and completed in the month grouped by employee, and every employee on
+the books that month. Revenue is the lines' taxable value - after discounts,
+before GST - with the invoice discount shared by line value on sales from before
+per-item GST. Commission is the employee's commission_rate, or
+Config.COMMISSION_PERCENT, of that revenue; base pay is hourly_rate times
+Config.PAYROLL_MONTHLY_HOURS.
+
+Months are computed the first time a report asks for them. The current month is
+recomputed whenever the sales, task or employee tables have changed since (their
+data_versions counters); past months are a payroll record and only change when
+recomputed on purpose, from the performance page or `flask compute-performance`.
+Reports over a year of several hundred staff then read a few thousand stored rows.
+"""
+from datetime import date, datetime
+from config import Config
+from database import db, Employee, EmployeePerformance
+import data_versions
+
+# Tables a month's figures are computed from
+SOURCE_TABLES = ('sales_order', 'sale_item', 'worker_task', 'employee')
+MEASURES = ['order_count', 'line_count', 'quantity', 'revenue', 'commission', 'hours', 'base_pay',
+            'tasks_assigned', 'tasks_completed', 'tasks_late']
+
+_REFRESH_SQL = """
+    INSERT INTO employee_performance
+        (month, employee_id, order_count, line_count, quantity, revenue, commission_rate, commission,
+         hours, base_pay, tasks_assigned, tasks_completed, tasks_late, source_version, computed_at)
+    WITH sales AS (
+        SELECT si.employee_id,
+               COUNT(DISTINCT si.sales_order_id) AS order_count,
+               COUNT(*) AS line_count,
+               SUM(si.quantity) AS quantity,
+               SUM(COALESCE(si.taxable_value, si.total_price - COALESCE(so.discount, 0) * si.total_price
+                   / (SELECT NULLIF(SUM(g.total_price), 0) FROM sale_item g WHERE g.sales_order_id = so.id))) AS revenue
+        FROM sales_order so
+        JOIN sale_item si ON si.sales_order_id = so.id
+        WHERE so.status = 'completed' AND so.sale_date >= :start AND so.sale_date < :end
+        GROUP BY si.employee_id
+    ), assigned AS (
+        SELECT employee_id, COUNT(*) AS tasks_assigned
+        FROM worker_task
+        WHERE assigned_date >= :start AND assigned_date < :end
+        GROUP BY employee_id
+    ), completed AS (
+        SELECT employee_id, COUNT(*) AS tasks_completed,
+               SUM(CASE WHEN date(completed_date) > date(due_date) THEN 1 ELSE 0 END) AS tasks_late
+        FROM worker_task
+        WHERE completed_date >= :start AND completed_date < :end
+        GROUP BY employee_id
+    )
+    SELECT :month, e.id, COALESCE(s.order_count, 0), COALESCE(s.line_count, 0), COALESCE(s.quantity, 0),
+           ROUND(COALESCE(s.revenue, 0), 2),
+           COALESCE(e.commission_rate, :commission_percent),
+           ROUND(COALESCE(s.revenue, 0) * COALESCE(e.commission_rate, :commission_percent) / 100, 2),
+           :hours, ROUND(COALESCE(e.hourly_rate, 0) * :hours, 2),
+           COALESCE(a.tasks_assigned, 0), COALESCE(c.tasks_completed, 0), COALESCE(c.tasks_late, 0),
+           :source_version, :computed_at
+    FROM employee e
+    LEFT JOIN sales s ON s.employee_id = e.id
+    LEFT JOIN assigned a ON a.employee_id = e.id
+    LEFT JOIN completed c ON c.employee_id = e.id
+    WHERE e.join_date IS NULL OR e.join_date < :end
+       OR s.employee_id IS NOT NULL OR a.employee_id IS NOT NULL OR c.employee_id IS NOT NULL
+"""
+
+def month_bounds(month):
+    """(first moment, first moment of the next month) for 'YYYY-MM'; ValueError when malformed"""
+    start = datetime.strptime(month, '%Y-%m')
+    return start, start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+
+def months_between(start, end):
+    """'YYYY-MM' for every month from the one holding `start` to the one holding `end`"""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f'{year:04d}-{month:02d}')
+        year, month = year + month // 12, month % 12 + 1
+    return months
+
+def _source_version():
+    return data_versions.make_etag(data_versions.table_versions(*SOURCE_TABLES))
+
+def _refresh(month, source_version):
+    start, end = month_bounds(month)
+    db.session.query(EmployeePerformance).filter(EmployeePerformance.month == month).delete()
+    db.session.execute(db.text(_REFRESH_SQL), {
+        'month': month, 'start': start, 'end': end, 'commission_percent': Config.COMMISSION_PERCENT,
+        'hours': Config.PAYROLL_MONTHLY_HOURS, 'source_version': source_version, 'computed_at': datetime.now(),
+    })
+
+def refresh_months(months):
+    """Recompute these months from scratch and commit. Returns the number of rows written."""
+    source_version = _source_version()
+    for month in months:
+        _refresh(month, source_version)
+    db.session.commit()
+    return EmployeePerformance.query.filter(EmployeePerformance.month.in_(months)).count()
+
+def ensure_months(months):
+    """Compute months never computed, and the current month if its sources changed since"""
+    current = date.today().strftime('%Y-%m')
+    source_version = _source_version()
+    stamps = dict(db.session.query(EmployeePerformance.month, db.func.max(EmployeePerformance.source_version))
+                  .filter(EmployeePerformance.month.in_(months)).group_by(EmployeePerformance.month))
+    stale = [month for month in months
+             if month not in stamps or (month >= current and stamps[month] != source_version)]
+    for month in stale:
+        _refresh(month, source_version)
+    if stale:
+        db.session.commit()
+    return stale
+
+def summary_query(months, employee_id=None):
+    """Stored rows summed per employee over the months, highest revenue first"""
+    query = db.session.query(
+        Employee.id, Employee.name, Employee.department, Employee.role,
+        db.func.count(EmployeePerformance.id).label('months'),
+        *[db.func.sum(getattr(EmployeePerformance, name)).label(name) for name in MEASURES]
+    ).join(EmployeePerformance, EmployeePerformance.employee_id == Employee.id) \
+     .filter(EmployeePerformance.month.in_(months))
+    if employee_id:
+        query = query.filter(Employee.id == employee_id)
+    return query.group_by(Employee.id).order_by(db.func.sum(EmployeePerformance.revenue).desc(), Employee.name)
+
+def performance_summary(months, employee_id=None):
+    """Per-employee totals over the months, highest revenue first, as dicts.
+
+    Adds total_pay (base pay plus commission), revenue_per_hour and task_completion_pct
+    (completed against assigned, None when nothing was assigned).
+    """
+    ensure_months(months)
+    rows = []
+    for row in summary_query(months, employee_id):
+        row = dict(row._mapping)
+        row['commission_rate'] = round(row['commission'] / row['revenue'] * 100, 2) if row['revenue'] else None
+        row['total_pay'] = round(row['base_pay'] + row['commission'], 2)
+        row['revenue_per_hour'] = round(row['revenue'] / row['hours'], 2) if row['hours'] else None
+        row['task_completion_pct'] = round(row['tasks_completed'] / row['tasks_assigned'] * 100, 1) \
+            if row['tasks_assigned'] else None
+        rows.append(row)
+    return rows
+
+def monthly_rows_query(months, employee_id):
+    """The query behind monthly_rows, without computing missing months first"""
+    return EmployeePerformance.query.filter(EmployeePerformance.employee_id == employee_id,
+                                            EmployeePerformance.month.in_(months)) \
+        .order_by(EmployeePerformance.month)
+
+def monthly_rows(months, employee_id):
+    """One employee's stored rows for the months, in month order"""
+    ensure_months(months)
+    return monthly_rows_query(months, employee_id).all()
@@ -16,12 +16,22 @@ class Config:
     
     # Currency (Indian Settings)
     CURRENCY = "₹"
-    GST_PERCENT = 18  # Default GST rate
+    GST_PERCENT = 18  # Default GST rate, for items without their own rate
+    COMPANY_GSTIN = ""  # Our GSTIN; its first two digits are our state code
+    COMPANY_STATE_CODE = ""  # Used when COMPANY_GSTIN is blank, e.g. "27" for Maharashtra
+
+    # Payroll: commission on sales revenue (before GST), and paid hours per month for base pay
+    COMMISSION_PERCENT = 1.0  # for employees without their own rate
+    PAYROLL_MONTHLY_HOURS = 208  # 26 working days of 8 hours
+
+    # Printed on invoices and purchase orders
+    COMPANY_NAME = "Your Company Name"
+    COMPANY_ADDRESS = ""
     
 # Update tally_integration.py to use config:
-from config import Config
-
-tally = TallyIntegration(
-    tally_url=Config.TALLY_URL,
-    company=Config.TALLY_COMPANY
-)
\ No newline at end of file
+# from config import Config
+#
+# tally = TallyIntegration(
+#     tally_url=Config.TALLY_URL,
+#     company=Config.TALLY_COMPANY
+# )
\ No newline at end of file
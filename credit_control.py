@@ -0,0 +1,101 @@
+# credit_control.py - Customer credit limits and outstanding balances
+from database import db, Customer, AccountsReceivable, SalesOrder
+
+def apply_receivable(customer_id, amount):
+    """Add a new receivable to the customer's running balance"""
+    Customer.query.filter_by(id=customer_id).update(
+        {Customer.outstanding_balance: Customer.outstanding_balance + amount},
+        synchronize_session='evaluate'
+    )
+
+def settle_receivable(customer_id, amount):
+    """Remove a settled receivable from the customer's running balance"""
+    Customer.query.filter_by(id=customer_id).update(
+        {Customer.outstanding_balance: Customer.outstanding_balance - amount},
+        synchronize_session='evaluate'
+    )
+
+def pending_order_totals(customer_ids):
+    """customer_id -> value of their sales orders not completed yet, one grouped query"""
+    customer_ids = list(customer_ids)
+    if not customer_ids:
+        return {}
+    return dict(db.session.query(SalesOrder.customer_id, db.func.sum(SalesOrder.total_amount))
+                .filter(SalesOrder.customer_id.in_(customer_ids), SalesOrder.status == 'pending')
+                .group_by(SalesOrder.customer_id).all())
+
+def pending_orders_query(customer_id, exclude_order_id=None):
+    """Sum of the customer's pending order totals, optionally leaving one order out"""
+    query = db.session.query(db.func.sum(SalesOrder.total_amount)) \
+        .filter(SalesOrder.customer_id == customer_id, SalesOrder.status == 'pending')
+    if exclude_order_id is not None:
+        query = query.filter(SalesOrder.id != exclude_order_id)
+    return query
+
+def pending_order_total(customer_id, exclude_order_id=None):
+    """Value of the customer's sales orders not completed yet, which become receivables when they are"""
+    return pending_orders_query(customer_id, exclude_order_id).scalar() or 0
+
+def available_credit(credit_limit, exposure):
+    """Credit left on a limit given the exposure (balance plus pending orders); None when there is no limit"""
+    if not credit_limit or credit_limit <= 0:
+        return None
+    return credit_limit - exposure
+
+def check_credit_limit(customer, amount, exclude_order_id=None):
+    """Check whether a new sale of `amount` fits within the customer's credit limit.
+
+    Exposure is the outstanding balance plus pending orders other than
+    `exclude_order_id` (the sale being checked, when it is already flushed).
+    A credit limit of 0 means the customer has no limit. Returns (allowed, available).
+    """
+    if not customer or available_credit(customer.credit_limit, 0) is None:
+        return True, None
+
+    exposure = (customer.outstanding_balance or 0) + pending_order_total(customer.id, exclude_order_id)
+    available = available_credit(customer.credit_limit, exposure)
+    return amount <= available, available
+
+def pending_receivables_query():
+    """customer_id, sum of pending receivables - the ledger side of the outstanding balances"""
+    return db.session.query(AccountsReceivable.customer_id, db.func.sum(AccountsReceivable.amount)) \
+        .filter(AccountsReceivable.status == 'pending') \
+        .group_by(AccountsReceivable.customer_id)
+
+def reconcile_customer_balances(fix=True):
+    """Rebuild outstanding balances from pending receivables and report drift.
+
+    Returns a list of dicts for every customer whose cached balance differed
+    from the ledger. When fix is True the cached balances are corrected.
+    """
+    ledger = dict(pending_receivables_query().all())
+
+    drift = []
+    for customer_id, name, cached in db.session.query(Customer.id, Customer.name, Customer.outstanding_balance):
+        expected = ledger.get(customer_id) or 0
+        cached = cached or 0
+        if abs(expected - cached) > 0.005:
+            drift.append({
+                'customer_id': customer_id,
+                'name': name,
+                'cached': cached,
+                'ledger': expected,
+                'difference': cached - expected
+            })
+
+    if fix and drift:
+        db.session.bulk_update_mappings(Customer, [
+            {'id': row['customer_id'], 'outstanding_balance': row['ledger']} for row in drift
+        ])
+        db.session.commit()
+
+    return drift
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        drift = reconcile_customer_balances(fix=True)
+        for row in drift:
+            print(f"{row['name']} (ID: {row['customer_id']}): cached {row['cached']:.2f}, ledger {row['ledger']:.2f}")
+        print(f"Reconciliation completed: {len(drift)} customer balances corrected")
@@ -0,0 +1,61 @@
+# data_versions.py - Row and table version counters maintained by SQLite triggers
+import hashlib
+from flask import g
+from database import db, DataVersion
+
+# Tables whose rows carry a version column, bumped on every UPDATE
+ROW_VERSIONED_TABLES = [
+    'item', 'supplier', 'customer', 'employee', 'worker_task',
+    'purchase_order', 'sales_order', 'accounts_payable', 'accounts_receivable'
+]
+# Tables with a change counter in data_version, bumped on INSERT, UPDATE and DELETE
+TRACKED_TABLES = ROW_VERSIONED_TABLES + ['purchase_item', 'sale_item', 'item_barcode', 'warehouse']
+
+def _trigger_sql(table):
+    bump_table = f"UPDATE data_version SET version = version + 1 WHERE table_name = '{table}';"
+    bump_row = ''
+    if table in ROW_VERSIONED_TABLES:
+        # recursive_triggers is off, so this inner UPDATE does not fire the trigger again
+        bump_row = (f"UPDATE {table} SET version = OLD.version + 1 "
+                    f"WHERE id = NEW.id AND NEW.version = OLD.version;")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_insert AFTER INSERT ON {table} "
+        f"BEGIN {bump_table} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_update AFTER UPDATE ON {table} "
+        f"BEGIN {bump_row} {bump_table} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_delete AFTER DELETE ON {table} "
+        f"BEGIN {bump_table} END",
+    ]
+
+def install_triggers(execute):
+    """Create the counter rows and triggers; safe to run repeatedly.
+
+    `execute` runs one SQL string, so this works for both a SQLAlchemy session
+    (lambda sql: db.session.execute(db.text(sql))) and a sqlite3 cursor.
+    """
+    for table in TRACKED_TABLES:
+        execute(f"INSERT OR IGNORE INTO data_version (table_name, version) VALUES ('{table}', 0)")
+        for statement in _trigger_sql(table):
+            execute(statement)
+
+def drop_triggers(execute):
+    """Remove the triggers, e.g. around a bulk load; install_triggers puts them back"""
+    for table in TRACKED_TABLES:
+        for action in ('insert', 'update', 'delete'):
+            execute(f"DROP TRIGGER IF EXISTS trg_{table}_version_{action}")
+
+def table_versions(*tables):
+    """Current change counters for the given tables, in the same order"""
+    versions = dict(db.session.query(DataVersion.table_name, DataVersion.version)
+                    .filter(DataVersion.table_name.in_(tables)).all())
+    return tuple(versions.get(table, 0) for table in tables)
+
+def request_versions():
+    """All change counters as a dict, read once per request (kept on flask.g)"""
+    if 'data_versions' not in g:
+        g.data_versions = dict(db.session.query(DataVersion.table_name, DataVersion.version).all())
+    return g.data_versions
+
+def make_etag(*parts):
+    """Stable ETag value for any combination of versions and request parameters"""
+    return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
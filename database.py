@@ -1,15 +1,32 @@
 # database.py
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
 db = SQLAlchemy()
 
+SQLITE_BUSY_TIMEOUT_MS = 30000
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets readers in every worker process run alongside the single writer, and the
+    # busy timeout makes writers wait for the lock instead of failing with "database is locked"
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        # busy_timeout first: switching journal mode needs the lock too
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
+    password = db.Column(db.String(255), nullable=False)  # scrypt hashes exceed 120 characters
     role = db.Column(db.String(20), default='user')
     email = db.Column(db.String(120))
     phone = db.Column(db.String(20))
@@ -31,9 +48,71 @@ class Item(db.Model):
     min_stock_level = db.Column(db.Float, default=5)
     cost_price = db.Column(db.Float, nullable=False)
     selling_price = db.Column(db.Float, nullable=False)
+    average_cost = db.Column(db.Float)
+    hsn_code = db.Column(db.String(8))
+    gst_rate = db.Column(db.Float)  # percent; NULL charges Config.GST_PERCENT
+    preferred_supplier_id = db.Column(db.Integer, db.ForeignKey('supplier.id'))
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     tally_synced = db.Column(db.Boolean, default=False)
     tally_guid = db.Column(db.String(100))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    preferred_supplier = db.relationship('Supplier', foreign_keys=[preferred_supplier_id])
+
+    __table_args__ = (
+        # Covers the item dropdowns (reference_data.item_options) without touching the table
+        db.Index('ix_item_name_options', 'name', 'sku', 'selling_price', 'current_stock'),
+        db.Index('ix_item_tally_synced', 'tally_synced'),
+        db.Index('ix_item_tally_guid', 'tally_guid'),
+    )
+
+# Low-stock scans filter on this expression
+db.Index('ix_item_stock_margin', Item.current_stock - Item.min_stock_level)
+
+class ItemBarcode(db.Model):
+    # Extra codes a scanner may send for an item (EAN/UPC, supplier codes, aliases);
+    # the SKU itself is always scannable as well
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    barcode = db.Column(db.String(64), unique=True, nullable=False)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    item = db.relationship('Item', backref=db.backref('barcodes', cascade='all, delete-orphan',
+                                                      order_by='ItemBarcode.id'))
+
+    __table_args__ = (
+        db.Index('ix_item_barcode_item', 'item_id'),
+    )
+
+class Warehouse(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(20), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    address = db.Column(db.Text)
+    is_default = db.Column(db.Boolean, nullable=False, default=False)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ItemStock(db.Model):
+    # Quantity per item and location, kept in step with stock_movement by the triggers
+    # in warehouses.py; item.current_stock stays the total across locations
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), primary_key=True)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouse.id'), primary_key=True)
+    quantity = db.Column(db.Float, nullable=False, default=0)
+    min_stock_level = db.Column(db.Float)  # per-location reorder level, alerts when set
+
+    item = db.relationship('Item', backref=db.backref('locations', cascade='all, delete-orphan'))
+    warehouse = db.relationship('Warehouse')
+
+    __table_args__ = (
+        # Per-location listings and totals read this index alone
+        db.Index('ix_item_stock_warehouse', 'warehouse_id', 'item_id', 'quantity'),
+        # Location alert refreshes only look at rows that have a reorder level
+        db.Index('ix_item_stock_reorder_level', 'warehouse_id', sqlite_where=db.text('min_stock_level IS NOT NULL')),
+        # Clustered on (item_id, warehouse_id): an item's locations sit together and
+        # GROUP BY item_id needs no sort; no separate rowid b-tree for millions of rows
+        {'sqlite_with_rowid': False},
+    )
 
 class Supplier(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -45,6 +124,13 @@ class Supplier(db.Model):
     gst_number = db.Column(db.String(50))
     tally_synced = db.Column(db.Boolean, default=False)
     tally_guid = db.Column(db.String(100))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __table_args__ = (
+        db.Index('ix_supplier_name', 'name'),
+        db.Index('ix_supplier_tally_synced', 'tally_synced'),
+        db.Index('ix_supplier_tally_guid', 'tally_guid'),
+    )
 
 class Customer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -54,8 +140,16 @@ class Customer(db.Model):
     address = db.Column(db.Text)
     gst_number = db.Column(db.String(50))
     credit_limit = db.Column(db.Float, default=0)
+    outstanding_balance = db.Column(db.Float, nullable=False, default=0)
     tally_synced = db.Column(db.Boolean, default=False)
     tally_guid = db.Column(db.String(100))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __table_args__ = (
+        db.Index('ix_customer_name', 'name'),
+        db.Index('ix_customer_tally_synced', 'tally_synced'),
+        db.Index('ix_customer_tally_guid', 'tally_guid'),
+    )
 
 class Employee(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -63,10 +157,16 @@ class Employee(db.Model):
     role = db.Column(db.String(50))
     department = db.Column(db.String(50))
     hourly_rate = db.Column(db.Float, default=0)
+    commission_rate = db.Column(db.Float)  # % of sales revenue, NULL = Config.COMMISSION_PERCENT
     phone = db.Column(db.String(20))
     email = db.Column(db.String(100))
     address = db.Column(db.Text)
     join_date = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __table_args__ = (
+        db.Index('ix_employee_name', 'name'),
+    )
 
 class PurchaseOrder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -77,10 +177,19 @@ class PurchaseOrder(db.Model):
     status = db.Column(db.String(20), default='pending')
     tally_synced = db.Column(db.Boolean, default=False)
     tally_voucher_no = db.Column(db.String(100))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouse.id'))  # receiving location, NULL = default
     
     supplier = db.relationship('Supplier', backref='purchase_orders')
+    warehouse = db.relationship('Warehouse')
     items = db.relationship('PurchaseItem', backref='purchase_order', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_purchase_order_status_date', 'status', 'order_date'),
+        db.Index('ix_purchase_order_supplier', 'supplier_id'),
+        db.Index('ix_purchase_order_tally_synced', 'tally_synced'),
+    )
+
 class PurchaseItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     purchase_order_id = db.Column(db.Integer, db.ForeignKey('purchase_order.id'), nullable=False)
@@ -88,9 +197,16 @@ class PurchaseItem(db.Model):
     quantity = db.Column(db.Float, nullable=False)
     unit_cost = db.Column(db.Float, nullable=False)
     total_cost = db.Column(db.Float, nullable=False)
+    lot_number = db.Column(db.String(50))  # supplier batch, becomes a StockLot on receipt
+    expiry_date = db.Column(db.Date)
     
     item = db.relationship('Item', backref='purchase_items')
 
+    __table_args__ = (
+        db.Index('ix_purchase_item_purchase_order', 'purchase_order_id'),
+        db.Index('ix_purchase_item_item', 'item_id'),
+    )
+
 class SalesOrder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
@@ -103,10 +219,28 @@ class SalesOrder(db.Model):
     status = db.Column(db.String(20), default='pending')
     tally_synced = db.Column(db.Boolean, default=False)
     tally_voucher_no = db.Column(db.String(100))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    idempotency_key = db.Column(db.String(100))  # client key for batch-posted POS sales
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouse.id'))  # shipping location, NULL = default
+    # Tax facts as invoiced: the buyer's GSTIN and state then, not whatever the customer record says now
+    customer_gstin = db.Column(db.String(15))
+    place_of_supply = db.Column(db.String(2))  # state code
+    inter_state = db.Column(db.Boolean)  # IGST rather than CGST + SGST
     
     customer = db.relationship('Customer', backref='sales_orders')
+    warehouse = db.relationship('Warehouse')
     employee = db.relationship('Employee', backref='sales')
     items = db.relationship('SaleItem', backref='sales_order', cascade='all, delete-orphan')
+    tax_lines = db.relationship('SaleTaxLine', backref='sales_order', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ux_sales_order_idempotency_key', 'idempotency_key', unique=True),
+        db.Index('ix_sales_order_status_date', 'status', 'sale_date'),
+        db.Index('ix_sales_order_date', 'sale_date'),
+        db.Index('ix_sales_order_customer', 'customer_id'),
+        db.Index('ix_sales_order_employee', 'employee_id'),
+        db.Index('ix_sales_order_tally_synced', 'tally_synced'),
+    )
 
 class SaleItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -116,9 +250,37 @@ class SaleItem(db.Model):
     quantity = db.Column(db.Float, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
+    # Set by tax.py; NULL on sales made before per-item GST
+    discount = db.Column(db.Float)  # the line's own discount plus its share of the invoice discount
+    gst_rate = db.Column(db.Float)
+    taxable_value = db.Column(db.Float)
+    tax_amount = db.Column(db.Float)
     
     item = db.relationship('Item', backref='sale_items')
     employee = db.relationship('Employee', backref='sale_items')
+    lot_allocations = db.relationship('SaleLotAllocation', backref='sale_item', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_sale_item_sales_order', 'sales_order_id'),
+        db.Index('ix_sale_item_item', 'item_id'),
+        db.Index('ix_sale_item_employee', 'employee_id'),
+    )
+
+class SaleTaxLine(db.Model):
+    # An invoice's GST per HSN code and rate, written with the sale; GSTR-1 summaries add these up
+    id = db.Column(db.Integer, primary_key=True)
+    sales_order_id = db.Column(db.Integer, db.ForeignKey('sales_order.id'), nullable=False)
+    hsn_code = db.Column(db.String(8))
+    gst_rate = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Float, nullable=False, default=0)
+    taxable_value = db.Column(db.Float, nullable=False, default=0)
+    cgst_amount = db.Column(db.Float, nullable=False, default=0)
+    sgst_amount = db.Column(db.Float, nullable=False, default=0)
+    igst_amount = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_sale_tax_line_sales_order', 'sales_order_id'),
+    )
 
 class AccountsPayable(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -128,10 +290,17 @@ class AccountsPayable(db.Model):
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='pending')
     paid_date = db.Column(db.DateTime)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     purchase_order = db.relationship('PurchaseOrder', backref='payable_entry')
     supplier = db.relationship('Supplier', backref='payables')
 
+    __table_args__ = (
+        db.Index('ix_accounts_payable_purchase_order', 'purchase_order_id'),
+        db.Index('ix_accounts_payable_supplier', 'supplier_id'),
+        db.Index('ix_accounts_payable_status_due', 'status', 'due_date'),
+    )
+
 class AccountsReceivable(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     sales_order_id = db.Column(db.Integer, db.ForeignKey('sales_order.id'), nullable=False)
@@ -140,10 +309,17 @@ class AccountsReceivable(db.Model):
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='pending')
     paid_date = db.Column(db.DateTime)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     sales_order = db.relationship('SalesOrder', backref='receivable_entry')
     customer = db.relationship('Customer', backref='receivables')
 
+    __table_args__ = (
+        db.Index('ix_accounts_receivable_sales_order', 'sales_order_id'),
+        db.Index('ix_accounts_receivable_customer_status', 'customer_id', 'status'),
+        db.Index('ix_accounts_receivable_status_due', 'status', 'due_date'),
+    )
+
 class WorkerTask(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
@@ -153,9 +329,18 @@ class WorkerTask(db.Model):
     due_date = db.Column(db.DateTime)
     status = db.Column(db.String(20), default='pending')
     priority = db.Column(db.String(20), default='medium')
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    completed_date = db.Column(db.DateTime)  # set when the status becomes 'completed'
     
     employee = db.relationship('Employee', backref='tasks')
 
+    __table_args__ = (
+        db.Index('ix_worker_task_status_due', 'status', 'due_date'),
+        db.Index('ix_worker_task_employee', 'employee_id'),
+        db.Index('ix_worker_task_assigned', 'assigned_date'),
+        db.Index('ix_worker_task_completed', 'completed_date'),
+    )
+
 class StockAlert(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
@@ -163,8 +348,18 @@ class StockAlert(db.Model):
     message = db.Column(db.Text)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     resolved = db.Column(db.Boolean, default=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouse.id'))  # NULL = total stock across locations
+    lot_id = db.Column(db.Integer, db.ForeignKey('stock_lot.id'))  # expiring / expired alerts only
     
     item = db.relationship('Item', backref='alerts')
+    warehouse = db.relationship('Warehouse')
+    lot = db.relationship('StockLot')
+
+    __table_args__ = (
+        db.Index('ix_stock_alert_item_resolved', 'item_id', 'resolved'),
+        db.Index('ix_stock_alert_resolved_date', 'resolved', 'created_date'),
+        db.Index('ix_stock_alert_lot', 'lot_id', 'alert_type', sqlite_where=db.text('lot_id IS NOT NULL')),
+    )
 
 class TallySyncLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -176,6 +371,10 @@ class TallySyncLog(db.Model):
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     synced_date = db.Column(db.DateTime)
 
+    __table_args__ = (
+        db.Index('ix_tally_sync_log_date', 'created_date'),
+    )
+
 class SystemLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -186,10 +385,238 @@ class SystemLog(db.Model):
     
     user = db.relationship('User', backref='logs')
 
+    __table_args__ = (
+        db.Index('ix_system_log_date', 'created_date'),
+    )
+
 class BackupLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(200))
     backup_type = db.Column(db.String(50))
     size = db.Column(db.String(50))
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='completed')
\ No newline at end of file
+    status = db.Column(db.String(20), default='completed')
+
+class SalesDailyRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    sale_date = db.Column(db.Date, nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    quantity = db.Column(db.Float, default=0)
+    revenue = db.Column(db.Float, default=0)
+    gst_amount = db.Column(db.Float, default=0)
+    discount = db.Column(db.Float, default=0)
+    line_count = db.Column(db.Integer, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('sale_date', 'item_id', 'customer_id', 'employee_id', name='uq_sales_daily_rollup'),
+    )
+
+class SalesMonthlyRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    quantity = db.Column(db.Float, default=0)
+    revenue = db.Column(db.Float, default=0)
+    gst_amount = db.Column(db.Float, default=0)
+    discount = db.Column(db.Float, default=0)
+    line_count = db.Column(db.Integer, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('month', 'item_id', 'customer_id', 'employee_id', name='uq_sales_monthly_rollup'),
+    )
+
+class EmployeePerformance(db.Model):
+    # One row per employee per month, written by commissions.py; payroll reports read only this
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    order_count = db.Column(db.Integer, default=0)
+    line_count = db.Column(db.Integer, default=0)
+    quantity = db.Column(db.Float, default=0)
+    revenue = db.Column(db.Float, default=0)  # taxable value of the employee's completed sale lines
+    commission_rate = db.Column(db.Float, default=0)  # as applied
+    commission = db.Column(db.Float, default=0)
+    hours = db.Column(db.Float, default=0)
+    base_pay = db.Column(db.Float, default=0)
+    tasks_assigned = db.Column(db.Integer, default=0)
+    tasks_completed = db.Column(db.Integer, default=0)
+    tasks_late = db.Column(db.Integer, default=0)  # completed after their due date
+    source_version = db.Column(db.String(32))  # data_versions stamp of the tables it was computed from
+    computed_at = db.Column(db.DateTime, default=datetime.now)
+
+    employee = db.relationship('Employee')
+
+    __table_args__ = (
+        db.UniqueConstraint('month', 'employee_id', name='uq_employee_performance'),
+        db.Index('ix_employee_performance_employee', 'employee_id', 'month'),
+    )
+
+class CostLayer(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    purchase_item_id = db.Column(db.Integer, db.ForeignKey('purchase_item.id'))
+    source = db.Column(db.String(20), default='purchase')  # purchase, opening, adjustment
+    received_date = db.Column(db.DateTime, default=datetime.utcnow)
+    quantity = db.Column(db.Float, nullable=False)
+    remaining_quantity = db.Column(db.Float, nullable=False)
+    unit_cost = db.Column(db.Float, nullable=False)
+
+    item = db.relationship('Item', backref=db.backref('cost_layers', cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.Index('ix_cost_layer_item_received', 'item_id', 'received_date', 'id'),
+    )
+
+class CostConsumption(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    cost_layer_id = db.Column(db.Integer, db.ForeignKey('cost_layer.id'))  # NULL when stock had no layer
+    sale_item_id = db.Column(db.Integer, db.ForeignKey('sale_item.id'))  # NULL for stock adjustments
+    quantity = db.Column(db.Float, nullable=False)
+    unit_cost = db.Column(db.Float, nullable=False)
+    consumed_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_cost_consumption_layer_date', 'cost_layer_id', 'consumed_date', 'quantity'),
+        db.Index('ix_cost_consumption_date', 'consumed_date'),
+    )
+
+class StockMovement(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)  # positive in, negative out
+    movement_type = db.Column(db.String(20), nullable=False)  # opening, purchase, sale, adjustment, tally_import, transfer_out, transfer_in
+    reference_type = db.Column(db.String(50))
+    reference_id = db.Column(db.Integer)
+    created_date = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouse.id'))
+
+    item = db.relationship('Item', backref=db.backref('stock_movements', cascade='all, delete-orphan'))
+    warehouse = db.relationship('Warehouse')
+
+    __table_args__ = (
+        db.Index('ix_stock_movement_item_date', 'item_id', 'created_date', 'quantity'),
+        db.Index('ix_stock_movement_date', 'created_date'),
+        db.Index('ix_stock_movement_warehouse_date', 'warehouse_id', 'created_date'),
+    )
+
+class StockTransfer(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    transfer_number = db.Column(db.String(100), unique=True, nullable=False)
+    from_warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouse.id'), nullable=False)
+    to_warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouse.id'), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, completed, cancelled
+    notes = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_date = db.Column(db.DateTime)
+
+    from_warehouse = db.relationship('Warehouse', foreign_keys=[from_warehouse_id])
+    to_warehouse = db.relationship('Warehouse', foreign_keys=[to_warehouse_id])
+    items = db.relationship('StockTransferItem', backref='transfer', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_stock_transfer_date', 'created_date'),
+    )
+
+class StockTransferItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    transfer_id = db.Column(db.Integer, db.ForeignKey('stock_transfer.id'), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+
+    item = db.relationship('Item')
+
+    __table_args__ = (
+        db.Index('ix_stock_transfer_item_transfer', 'transfer_id'),
+    )
+
+class StockLot(db.Model):
+    # Stock received under a lot number and/or expiry date, drawn down first-expiry-first-out
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouse.id'), nullable=False)
+    lot_number = db.Column(db.String(50))
+    expiry_date = db.Column(db.Date)
+    received_date = db.Column(db.DateTime, default=datetime.utcnow)
+    quantity = db.Column(db.Float, nullable=False)
+    remaining_quantity = db.Column(db.Float, nullable=False)
+    purchase_item_id = db.Column(db.Integer, db.ForeignKey('purchase_item.id'))
+    source_lot_id = db.Column(db.Integer, db.ForeignKey('stock_lot.id'))  # lot this was transferred from
+
+    item = db.relationship('Item', backref=db.backref('lots', cascade='all, delete-orphan'))
+    warehouse = db.relationship('Warehouse')
+
+    __table_args__ = (
+        # Partial on open lots: depleted ones, the bulk of a long history, stay out of
+        # the indexes picking and the expiry scan read
+        db.Index('ix_stock_lot_item_expiry', 'item_id', 'expiry_date', sqlite_where=db.text('remaining_quantity > 0')),
+        db.Index('ix_stock_lot_expiry', 'expiry_date', sqlite_where=db.text('remaining_quantity > 0')),
+        db.Index('ix_stock_lot_purchase_item', 'purchase_item_id'),
+    )
+
+class SaleLotAllocation(db.Model):
+    # Which lots a sale line was picked from
+    id = db.Column(db.Integer, primary_key=True)
+    sale_item_id = db.Column(db.Integer, db.ForeignKey('sale_item.id'), nullable=False)
+    lot_id = db.Column(db.Integer, db.ForeignKey('stock_lot.id'), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+
+    lot = db.relationship('StockLot')
+
+    __table_args__ = (
+        db.Index('ix_sale_lot_allocation_sale_item', 'sale_item_id'),
+        db.Index('ix_sale_lot_allocation_lot', 'lot_id'),
+    )
+
+class StockSnapshot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    snapshot_date = db.Column(db.DateTime, nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('item_id', 'snapshot_date', name='uq_stock_snapshot_item_date'),
+        db.Index('ix_stock_snapshot_date', 'snapshot_date'),
+    )
+
+class ItemImportBatch(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(200))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    status = db.Column(db.String(20), default='pending')  # pending, staging, validating, importing, completed, failed
+    total_rows = db.Column(db.Integer, default=0)
+    processed_rows = db.Column(db.Integer, default=0)
+    created_count = db.Column(db.Integer, default=0)
+    updated_count = db.Column(db.Integer, default=0)
+    error_count = db.Column(db.Integer, default=0)
+    message = db.Column(db.Text)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_date = db.Column(db.DateTime)
+
+class ItemImportRow(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('item_import_batch.id'), nullable=False)
+    row_number = db.Column(db.Integer, nullable=False)
+    sku = db.Column(db.String(50))
+    name = db.Column(db.String(100))
+    category = db.Column(db.String(50))
+    current_stock = db.Column(db.Float)
+    min_stock_level = db.Column(db.Float)
+    cost_price = db.Column(db.Float)
+    selling_price = db.Column(db.Float)
+    error = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_item_import_row_batch_sku', 'batch_id', 'sku'),
+        db.Index('ix_item_import_row_batch_row', 'batch_id', 'row_number'),
+    )
+
+class DataVersion(db.Model):
+    # Per-table change counters, bumped by the triggers in data_versions.py
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,106 @@
+# demand_forecast.py - Vectorized demand forecasts and suggested minimum stock levels
+from datetime import datetime, timedelta
+import numpy as np
+from database import db, Item, SalesOrder, SaleItem
+import stock_alerts
+
+# One-sided z-scores for common service levels
+SERVICE_LEVEL_Z = {0.90: 1.2816, 0.95: 1.6449, 0.98: 2.0537, 0.99: 2.3263}
+# Simple exponential smoothing, moving average
+FORECAST_METHODS = ('ses', 'ma')
+
+def load_demand_matrix(history_days=365, end=None, dtype=np.float32):
+    """Daily units sold per item as an (items x days) matrix, loaded with one grouped query.
+
+    Returns (item_ids, matrix) where matrix[i, d] is the quantity of item_ids[i]
+    sold on day d, oldest day first.
+    """
+    end = (end or datetime.now()).date()
+    start = end - timedelta(days=history_days - 1)
+
+    item_ids = np.array([row[0] for row in db.session.query(Item.id).order_by(Item.id)], dtype=np.int64)
+    matrix = np.zeros((len(item_ids), history_days), dtype=dtype)
+    if not len(item_ids):
+        return item_ids, matrix
+
+    day = db.func.date(SalesOrder.sale_date)
+    rows = db.session.query(SaleItem.item_id, day, db.func.sum(SaleItem.quantity)) \
+        .join(SalesOrder, SalesOrder.id == SaleItem.sales_order_id) \
+        .filter(SalesOrder.status == 'completed',
+                SalesOrder.sale_date >= datetime.combine(start, datetime.min.time())) \
+        .group_by(SaleItem.item_id, day).all()
+    if not rows:
+        return item_ids, matrix
+
+    sold_item_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    day_index = np.fromiter(((datetime.strptime(row[1], '%Y-%m-%d').date() - start).days for row in rows),
+                            dtype=np.int64, count=len(rows))
+    quantities = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+    rows_index = np.searchsorted(item_ids, sold_item_ids)
+    valid = (day_index >= 0) & (day_index < history_days) & (rows_index < len(item_ids))
+    valid &= item_ids[np.minimum(rows_index, len(item_ids) - 1)] == sold_item_ids
+    np.add.at(matrix, (rows_index[valid], day_index[valid]), quantities[valid])
+    return item_ids, matrix
+
+def moving_average(matrix, window=28):
+    """Mean daily demand over the last `window` days, for every item at once"""
+    window = min(window, matrix.shape[1])
+    return matrix[:, -window:].mean(axis=1)
+
+def exponential_smoothing(matrix, alpha=0.1):
+    """Simple exponential smoothing level for every item, as one weighted matrix product.
+
+    The oldest observation seeds the level, so after n days the newest observation
+    has weight alpha, the one before alpha * (1 - alpha), and the oldest (1 - alpha)^(n-1).
+    """
+    days = matrix.shape[1]
+    if days == 0:
+        return np.zeros(matrix.shape[0])
+    ages = np.arange(days - 1, -1, -1, dtype=np.float64)  # age of each column, newest = 0
+    weights = alpha * (1 - alpha) ** ages
+    weights[0] = (1 - alpha) ** (days - 1)
+    return matrix @ weights.astype(matrix.dtype)
+
+def suggest_min_stock(matrix, lead_time_days=7, service_level=0.95, method='ses', alpha=0.1, window=28):
+    """Suggested minimum stock: expected demand over the lead time plus safety stock"""
+    if method not in FORECAST_METHODS:
+        raise ValueError(f'Unknown forecast method: {method}')
+    z = SERVICE_LEVEL_Z.get(service_level, 1.6449)
+    if method == 'ma':
+        daily = moving_average(matrix, window)
+    else:
+        daily = exponential_smoothing(matrix, alpha)
+
+    # Safety stock from the demand variability over the recent window
+    recent = matrix[:, -max(window, 2):]
+    sigma = recent.std(axis=1, ddof=1) if recent.shape[1] > 1 else np.zeros(matrix.shape[0])
+    safety_stock = z * sigma * np.sqrt(lead_time_days)
+
+    return np.ceil(daily * lead_time_days + safety_stock), daily
+
+def apply_forecast(history_days=365, lead_time_days=7, service_level=0.95, method='ses',
+                   alpha=0.1, window=28, dry_run=False, chunk_size=5000):
+    """Forecast all items and write suggested min_stock_level values back.
+
+    Items with no sales history keep their current level. Stock alerts of the updated
+    items are refreshed in the same transaction. Returns the number of items updated
+    (or that would be updated when dry_run is True).
+    """
+    item_ids, matrix = load_demand_matrix(history_days)
+    suggested, _ = suggest_min_stock(matrix, lead_time_days, service_level, method, alpha, window)
+
+    has_history = matrix.any(axis=1)
+    updates = [{'item_id': int(item_id), 'level': float(level)}
+               for item_id, level in zip(item_ids[has_history], suggested[has_history])]
+
+    if not dry_run:
+        statement = Item.__table__.update() \
+            .where(Item.__table__.c.id == db.bindparam('item_id')) \
+            .values(min_stock_level=db.bindparam('level'))
+        for start in range(0, len(updates), chunk_size):
+            db.session.execute(statement, updates[start:start + chunk_size])
+        stock_alerts.refresh_stock_alerts([update['item_id'] for update in updates])
+        db.session.commit()
+
+    return len(updates)
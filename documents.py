@@ -0,0 +1,315 @@
+# documents.py - Printable invoices and purchase orders, as PDF or HTML, cached on disk
+"""Invoices for sales orders and printable purchase orders.
+
+Documents are rendered from plain dicts with their own Jinja environment (the
+templates are standalone pages, not base.html), so process-pool workers can render
+them without an app or a database. PDF output needs WeasyPrint; without it HTML,
+which prints from any browser, is all there is.
+
+Rendered documents are kept as files under DOCUMENT_CACHE_DIR, named by order id
+and the order's row version, which the data_versions triggers bump on every update -
+so a changed order renders afresh and an unchanged one never renders twice. The
+party's version is left out on purpose: every sale and payment bumps the customer's
+(its outstanding balance), and a reprint should not change because the party's
+record did. Company details come from Config; clear the cache (Admin > Clear cache)
+to reprint with changed details.
+
+render_batch() serves month-end runs: cached documents straight from disk, the rest
+loaded a chunk at a time and rendered across a process pool, in order, as they finish.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.orm import joinedload, selectinload
+from config import Config
+from database import db, SalesOrder, SaleItem, PurchaseOrder, PurchaseItem
+
+KINDS = ('invoice', 'purchase_order')
+FORMATS = ('pdf', 'html')
+MIMETYPES = {'pdf': 'application/pdf', 'html': 'text/html'}
+TEMPLATES = {'invoice': 'invoice_document.html', 'purchase_order': 'purchase_order_document.html'}
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+NO_PDF = 'PDF output needs WeasyPrint (pip install weasyprint); use the printable HTML instead'
+RENDER_CHUNK = 25  # documents per pool task; batches no bigger than this render in-process
+
+class DocumentError(Exception):
+    """A document that cannot be produced, e.g. PDF without WeasyPrint"""
+
+def format_currency(amount):
+    return f"₹{amount or 0:,.2f}"
+
+_environment = None
+
+def _template(kind):
+    global _environment
+    if _environment is None:
+        _environment = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']))
+        _environment.globals['format_currency'] = format_currency
+    return _environment.get_template(TEMPLATES[kind])
+
+_pdf_available = None
+
+def pdf_available():
+    global _pdf_available
+    if _pdf_available is None:
+        try:
+            import weasyprint  # noqa: F401
+            _pdf_available = True
+        except (ImportError, OSError):  # OSError: installed without its Pango libraries
+            _pdf_available = False
+    return _pdf_available
+
+def default_format():
+    return 'pdf' if pdf_available() else 'html'
+
+def render(kind, context, fmt):
+    """Bytes of one document from its context"""
+    html = _template(kind).render(**context)
+    if fmt == 'html':
+        return html.encode('utf-8')
+    if not pdf_available():
+        raise DocumentError(NO_PDF)
+    from weasyprint import HTML
+    return HTML(string=html).write_pdf()
+
+def _render_chunk(kind, fmt, contexts):
+    # Process pool task: plain dicts in, bytes out
+    return [render(kind, context, fmt) for context in contexts]
+
+class DocumentCache:
+    """Rendered documents on disk, one file per order at its current versions"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._stats = {'hits': 0, 'misses': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = app.config.get('DOCUMENT_CACHE_DIR') or os.path.join(app.instance_path, 'documents')
+
+    def _path(self, kind, order_id, key, fmt):
+        return os.path.join(self.directory, f"{kind}-{order_id}-v{'-'.join(map(str, key))}.{fmt}")
+
+    def get(self, kind, order_id, key, fmt):
+        try:
+            with open(self._path(kind, order_id, key, fmt), 'rb') as handle:
+                content = handle.read()
+        except OSError:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return content
+
+    def set(self, kind, order_id, key, fmt, content):
+        path = self._path(kind, order_id, key, fmt)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write then rename, so a concurrent reader never sees half a file
+            handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(handle, 'wb') as out:
+                out.write(content)
+            os.replace(temp_path, path)
+            for stale in glob.glob(os.path.join(self.directory, f"{kind}-{order_id}-v*.{fmt}")):
+                if stale != path:
+                    os.remove(stale)
+        except OSError:
+            self._count('errors')  # the document is still served, just not kept
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory or '', '*-v*.*')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def metrics(self):
+        files = glob.glob(os.path.join(self.directory or '', '*-v*.*'))
+        lookups = self._stats['hits'] + self._stats['misses']
+        return dict(self._stats, directory=self.directory, files=len(files),
+                    hit_rate=round(self._stats['hits'] / lookups, 3) if lookups else None)
+
+document_cache = DocumentCache()
+
+def _index(kind, order_ids):
+    """{order id: (document number, cache key)} for the orders that exist"""
+    model = SalesOrder if kind == 'invoice' else PurchaseOrder
+    number = SalesOrder.invoice_number if kind == 'invoice' else PurchaseOrder.po_number
+    query = db.session.query(model.id, number, model.version).filter(model.id.in_(order_ids))
+    return {order_id: (number, (version,)) for order_id, number, version in query}
+
+def _company():
+    return {'name': Config.COMPANY_NAME, 'address': Config.COMPANY_ADDRESS, 'gstin': Config.COMPANY_GSTIN}
+
+def _party(record):
+    if record is None:
+        return {'name': 'N/A', 'address': None, 'phone': None, 'email': None}
+    return {'name': record.name, 'address': record.address, 'phone': record.phone, 'email': record.email}
+
+def _invoice_context(sale):
+    lines = [{
+        'name': line.item.name if line.item else '', 'sku': line.item.sku if line.item else '',
+        'hsn_code': line.item.hsn_code if line.item else None, 'quantity': line.quantity,
+        'unit_price': line.unit_price, 'amount': line.total_price, 'discount': line.discount,
+        'gst_rate': line.gst_rate, 'taxable_value': line.taxable_value, 'tax_amount': line.tax_amount,
+    } for line in sale.items]
+    tax_lines = [{
+        'hsn_code': tax_line.hsn_code, 'gst_rate': tax_line.gst_rate, 'taxable_value': tax_line.taxable_value,
+        'cgst_amount': tax_line.cgst_amount, 'sgst_amount': tax_line.sgst_amount, 'igst_amount': tax_line.igst_amount,
+    } for tax_line in sorted(sale.tax_lines, key=lambda tax_line: (tax_line.gst_rate, tax_line.hsn_code or ''))]
+    return {
+        'company': _company(), 'party': _party(sale.customer), 'number': sale.invoice_number,
+        'date': sale.sale_date, 'status': sale.status, 'customer_gstin': sale.customer_gstin,
+        'place_of_supply': sale.place_of_supply, 'inter_state': bool(sale.inter_state),
+        'lines': lines, 'tax_lines': tax_lines,
+        'subtotal': sum(line['amount'] or 0 for line in lines), 'discount': sale.discount or 0,
+        'taxable_value': (sale.total_amount or 0) - (sale.gst_amount or 0),
+        'cgst_amount': sum(tax_line['cgst_amount'] for tax_line in tax_lines),
+        'sgst_amount': sum(tax_line['sgst_amount'] for tax_line in tax_lines),
+        'igst_amount': sum(tax_line['igst_amount'] for tax_line in tax_lines),
+        'gst_amount': sale.gst_amount or 0, 'total_amount': sale.total_amount or 0,
+    }
+
+def _purchase_order_context(po):
+    return {
+        'company': _company(), 'party': _party(po.supplier), 'number': po.po_number,
+        'date': po.order_date, 'status': po.status,
+        'supplier_gstin': po.supplier.gst_number if po.supplier else None,
+        'warehouse': po.warehouse.name if po.warehouse else None,
+        'lines': [{
+            'name': line.item.name if line.item else '', 'sku': line.item.sku if line.item else '',
+            'quantity': line.quantity, 'unit_cost': line.unit_cost, 'amount': line.total_cost,
+            'lot_number': line.lot_number, 'expiry_date': line.expiry_date,
+        } for line in po.items],
+        'total_amount': po.total_amount or 0,
+    }
+
+def load_contexts(kind, order_ids):
+    """{order id: template context} for the orders that exist, in a few queries"""
+    if kind == 'invoice':
+        orders = SalesOrder.query.options(
+            joinedload(SalesOrder.customer),
+            selectinload(SalesOrder.items).joinedload(SaleItem.item),
+            selectinload(SalesOrder.tax_lines),
+        ).filter(SalesOrder.id.in_(order_ids))
+        return {sale.id: _invoice_context(sale) for sale in orders}
+    orders = PurchaseOrder.query.options(
+        joinedload(PurchaseOrder.supplier), joinedload(PurchaseOrder.warehouse),
+        selectinload(PurchaseOrder.items).joinedload(PurchaseItem.item),
+    ).filter(PurchaseOrder.id.in_(order_ids))
+    return {po.id: _purchase_order_context(po) for po in orders}
+
+def check_format(kind, fmt):
+    """Raise DocumentError unless this kind of document can be produced in this format"""
+    if kind not in KINDS:
+        raise DocumentError(f'Unknown document type {kind}')
+    if fmt not in FORMATS:
+        raise DocumentError(f"Format must be one of {', '.join(FORMATS)}")
+    if fmt == 'pdf' and not pdf_available():
+        raise DocumentError(NO_PDF)
+
+def render_document(kind, order_id, fmt):
+    """(file name, bytes) of one document, or None when there is no such order"""
+    check_format(kind, fmt)
+    entry = _index(kind, [order_id]).get(order_id)
+    if entry is None:
+        return None
+    number, key = entry
+    content = document_cache.get(kind, order_id, key, fmt)
+    if content is None:
+        context = load_contexts(kind, [order_id])[order_id]
+        content = render(kind, context, fmt)
+        document_cache.set(kind, order_id, key, fmt, content)
+    return f'{number}.{fmt}', content
+
+def render_batch(kind, order_ids, fmt, workers=None):
+    """Yield (file name, bytes) for each order, cached documents first.
+
+    Uncached documents render RENDER_CHUNK at a time across a spawn-started process
+    pool - spawn as on Windows, and safe in a web process with threads running -
+    with at most two chunks per worker in flight, so memory stays flat however long
+    the run. Workers default to the CPU count.
+    """
+    check_format(kind, fmt)
+    order_ids = list(order_ids)
+    misses = []
+    for start in range(0, len(order_ids), 500):
+        index = _index(kind, order_ids[start:start + 500])
+        for order_id in order_ids[start:start + 500]:
+            if order_id not in index:
+                continue
+            number, key = index[order_id]
+            content = document_cache.get(kind, order_id, key, fmt)
+            if content is None:
+                misses.append((order_id, number, key))
+            else:
+                yield f'{number}.{fmt}', content
+
+    chunks = [misses[start:start + RENDER_CHUNK] for start in range(0, len(misses), RENDER_CHUNK)]
+    if len(chunks) <= 1:
+        for chunk in chunks:
+            yield from _store(kind, fmt, chunk, _render_chunk(kind, fmt, _contexts(kind, chunk)))
+        return
+
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(_render_chunk, kind, fmt, _contexts(kind, chunk))))
+            if len(pending) >= workers * 2:
+                chunk, future = pending.popleft()
+                yield from _store(kind, fmt, chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from _store(kind, fmt, chunk, future.result())
+    finally:
+        # Also reached when a download is abandoned: drop the chunks not yet started
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _contexts(kind, chunk):
+    contexts = load_contexts(kind, [order_id for order_id, _, _ in chunk])
+    db.session.expunge_all()  # long runs: keep the identity map from growing with every chunk
+    return [contexts[order_id] for order_id, _, _ in chunk]
+
+def _store(kind, fmt, chunk, contents):
+    for (order_id, number, key), content in zip(chunk, contents):
+        document_cache.set(kind, order_id, key, fmt, content)
+        yield f'{number}.{fmt}', content
+
+class _ZipOutput:
+    # Write-only and unseekable, so ZipFile streams each member with a data descriptor
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def zip_stream(documents):
+    """Yield a ZIP archive of (file name, bytes) pairs piece by piece, one member at a time"""
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, 'w') as archive:
+        for name, content in documents:
+            # PDFs are compressed already; HTML shrinks several times over
+            compression = zipfile.ZIP_STORED if name.endswith('.pdf') else zipfile.ZIP_DEFLATED
+            archive.writestr(name, content, compress_type=compression)
+            yield output.take()
+    yield output.take()
@@ -0,0 +1,208 @@
+# events.py - In-process pub/sub for live updates, fed by commit hooks
+"""Publishes what changed to browsers connected to /events/stream (Server-Sent Events).
+
+Events are collected while a transaction runs and published only after it commits,
+so a rolled-back sale never reaches a browser:
+
+    alert_created, alert_resolved      StockAlert rows added or resolved through the ORM
+    sale_completed, purchase_received  orders moving to completed / received
+    changed                            any commit that wrote a watched table, including
+                                       bulk SQL (alert refreshes, POS batches) that the
+                                       row-level events cannot see
+
+Code that writes with Core or raw SQL can add row-level events with queue_event().
+Each process keeps its own subscribers; set EVENTS_REDIS_URL (or CACHE_REDIS_URL) to
+relay events between gunicorn workers through Redis pub/sub.
+"""
+import json
+import queue
+import threading
+import time
+from collections import deque
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+from cache import commit_listeners
+from database import StockAlert, SalesOrder, PurchaseOrder
+
+# Tables whose writes change what the dashboard and alerts page show
+WATCHED_TABLES = {'stock_alert', 'item', 'item_stock', 'sales_order', 'purchase_order', 'accounts_payable',
+                  'accounts_receivable', 'worker_task'}
+
+REDIS_CHANNEL = 'inventory:events'
+
+class Subscription:
+    """One connected client; events beyond `maxsize` push out the oldest ones"""
+
+    def __init__(self, bus, maxsize):
+        self.bus = bus
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        """Next (id, name, data) or None after `timeout` seconds without events"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+class EventBus:
+    """Fans published events out to every subscriber in this process"""
+
+    def __init__(self, history=200, queue_size=100):
+        self.queue_size = queue_size
+        self.published = 0
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._redis = None
+        self._relay = None
+
+    def init_app(self, app):
+        self.queue_size = app.config.get('EVENTS_QUEUE_SIZE', self.queue_size)
+        redis_url = app.config.get('EVENTS_REDIS_URL') or app.config.get('CACHE_REDIS_URL')
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url)
+            except ImportError:
+                app.logger.warning('EVENTS_REDIS_URL is set but redis is not installed; events stay in-process')
+
+    def _next_id(self):
+        # Wall-clock based so ids from different worker processes still sort in order
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return self._last_id
+
+    def publish(self, name, data=None):
+        if self._redis is not None:
+            try:
+                self._redis.publish(REDIS_CHANNEL, json.dumps({'name': name, 'data': data or {}}, default=str))
+                return
+            except Exception:
+                pass  # Redis unavailable: at least reach this process's clients
+        self._deliver(name, data or {})
+
+    def _deliver(self, name, data):
+        with self._lock:
+            item = (self._next_id(), name, data)
+            self._history.append(item)
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            subscription.put(item)
+
+    def subscribe(self, last_event_id=None):
+        """Register a client; events after `last_event_id` still in the history are replayed"""
+        if self._redis is not None:
+            self._start_relay()
+        subscription = Subscription(self, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if last_event_id is not None:
+                for item in self._history:
+                    if item[0] > last_event_id:
+                        subscription.put(item)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _start_relay(self):
+        # Started on first subscribe, after gunicorn has forked the worker
+        with self._lock:
+            if self._relay is not None and self._relay.is_alive():
+                return
+            self._relay = threading.Thread(target=self._relay_loop, name='event-relay', daemon=True)
+            self._relay.start()
+
+    def _relay_loop(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIS_CHANNEL)
+                for message in pubsub.listen():
+                    payload = json.loads(message['data'])
+                    self._deliver(payload['name'], payload['data'])
+            except Exception:
+                time.sleep(1)
+
+    def metrics(self):
+        return {
+            'subscribers': self.subscriber_count(),
+            'published': self.published,
+            'relay': 'redis' if self._redis is not None else None
+        }
+
+event_bus = EventBus()
+
+def format_sse(item):
+    event_id, name, data = item
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def queue_event(session, name, data):
+    """Publish `name` once the session's current transaction commits"""
+    session.info.setdefault('pending_events', []).append((name, data))
+
+def _became(obj, attribute, value):
+    history = attributes.get_history(obj, attribute)
+    return value in history.added and value not in history.deleted
+
+@event.listens_for(Session, 'after_flush')
+def _collect_events(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, StockAlert) and not obj.resolved:
+            queue_event(session, 'alert_created', {
+                'id': obj.id, 'item_id': obj.item_id, 'warehouse_id': obj.warehouse_id,
+                'alert_type': obj.alert_type, 'message': obj.message
+            })
+        elif isinstance(obj, SalesOrder) and obj.status == 'completed':
+            queue_event(session, 'sale_completed', _sale_data(obj))
+    for obj in session.dirty:
+        if isinstance(obj, StockAlert) and _became(obj, 'resolved', True):
+            queue_event(session, 'alert_resolved', {'id': obj.id, 'item_id': obj.item_id})
+        elif isinstance(obj, SalesOrder) and _became(obj, 'status', 'completed'):
+            queue_event(session, 'sale_completed', _sale_data(obj))
+        elif isinstance(obj, PurchaseOrder) and _became(obj, 'status', 'received'):
+            queue_event(session, 'purchase_received', {
+                'id': obj.id, 'po_number': obj.po_number, 'supplier_id': obj.supplier_id,
+                'total_amount': obj.total_amount
+            })
+
+def _sale_data(sale):
+    return {'id': sale.id, 'invoice_number': sale.invoice_number, 'customer_id': sale.customer_id,
+            'total_amount': sale.total_amount}
+
+@event.listens_for(Session, 'after_commit')
+def _publish_on_commit(session):
+    for name, data in session.info.pop('pending_events', ()):
+        event_bus.publish(name, data)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('pending_events', None)
+
+def _publish_changed(tables):
+    watched = tables & WATCHED_TABLES
+    if watched:
+        event_bus.publish('changed', {'tables': sorted(watched)})
+
+commit_listeners.append(_publish_changed)
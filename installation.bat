@@ -18,12 +18,12 @@ if not exist "backups" mkdir backups
 if not exist "static" mkdir static
 
 echo.
-echo Running database setup...
-python migrate_database.py
+echo Running database migrations...
+python -m migrations
 
 echo.
-echo Running schema migration...
-python migration_add_tally_guid.py
+echo Creating default users and sample data...
+flask --app app seed-db
 
 echo.
 echo Installation complete!
@@ -0,0 +1,207 @@
+# inventory_valuation.py - Cost layers, FIFO / moving-average valuation and COGS
+from datetime import datetime
+from database import db, Item, CostLayer, CostConsumption
+
+def record_purchase_layer(item, purchase_item, received_date=None):
+    """Record a received purchase line as a cost layer and update the moving average.
+
+    Must be called before item.current_stock is increased.
+    """
+    on_hand = max(item.current_stock or 0, 0)
+    previous_cost = item.average_cost if item.average_cost is not None else item.cost_price
+    total_quantity = on_hand + purchase_item.quantity
+    if total_quantity > 0:
+        item.average_cost = (on_hand * previous_cost + purchase_item.quantity * purchase_item.unit_cost) / total_quantity
+
+    db.session.add(CostLayer(
+        item_id=item.id,
+        purchase_item_id=purchase_item.id,
+        source='purchase',
+        received_date=received_date or datetime.now(),
+        quantity=purchase_item.quantity,
+        remaining_quantity=purchase_item.quantity,
+        unit_cost=purchase_item.unit_cost
+    ))
+
+def _open_layers(item_ids):
+    """Open layers for the given items in FIFO order, grouped per item"""
+    layers = {}
+    query = CostLayer.query.filter(CostLayer.item_id.in_(item_ids), CostLayer.remaining_quantity > 0) \
+        .order_by(CostLayer.item_id, CostLayer.received_date, CostLayer.id)
+    for layer in query:
+        layers.setdefault(layer.item_id, []).append(layer)
+    return layers
+
+def _consume(item, quantity, layers, sale_item_id=None, consumed_date=None):
+    """Consume quantity from the item's open layers oldest first. Returns the COGS."""
+    consumed_date = consumed_date or datetime.now()
+    cost = 0
+    while quantity > 1e-9 and layers:
+        layer = layers[0]
+        used = min(layer.remaining_quantity, quantity)
+        layer.remaining_quantity -= used
+        quantity -= used
+        cost += used * layer.unit_cost
+        db.session.add(CostConsumption(
+            item_id=item.id, cost_layer_id=layer.id, sale_item_id=sale_item_id,
+            quantity=used, unit_cost=layer.unit_cost, consumed_date=consumed_date
+        ))
+        if layer.remaining_quantity <= 1e-9:
+            layers.pop(0)
+
+    if quantity > 1e-9:
+        # Stock sold without a layer behind it (e.g. negative stock) is costed at the average
+        unit_cost = item.average_cost if item.average_cost is not None else item.cost_price
+        cost += quantity * unit_cost
+        db.session.add(CostConsumption(
+            item_id=item.id, cost_layer_id=None, sale_item_id=sale_item_id,
+            quantity=quantity, unit_cost=unit_cost, consumed_date=consumed_date
+        ))
+    return cost
+
+def consume_sales_layers(sales):
+    """Consume cost layers FIFO for every line of the given completed sales, in order.
+
+    Items and open layers are loaded once for the whole set. Returns the total COGS.
+    """
+    item_ids = {int(line.item_id) for sale in sales for line in sale.items}
+    if not item_ids:
+        return 0
+
+    items = {item.id: item for item in Item.query.filter(Item.id.in_(item_ids))}
+    layers = _open_layers(item_ids)
+    cogs = 0
+    for sale in sales:
+        for line in sale.items:
+            item = items.get(int(line.item_id))
+            if item:
+                cogs += _consume(item, line.quantity, layers.setdefault(item.id, []), sale_item_id=line.id)
+    return cogs
+
+def consume_sale_layers(sale):
+    """Consume cost layers FIFO for every line of a completed sale. Returns the sale COGS."""
+    return consume_sales_layers([sale])
+
+def adjust_layers(item, delta, unit_cost=None, source='adjustment'):
+    """Keep layers in step with a manual stock change (new items, edits and imports)"""
+    if delta > 0:
+        db.session.add(CostLayer(
+            item_id=item.id, source=source, received_date=datetime.now(),
+            quantity=delta, remaining_quantity=delta,
+            unit_cost=unit_cost if unit_cost is not None else item.cost_price
+        ))
+    elif delta < 0:
+        _consume(item, -delta, _open_layers([item.id]).get(item.id, []))
+
+def seed_opening_layers():
+    """Create opening layers at cost price for stock that has no layers behind it"""
+    result = db.session.execute(db.text("""
+        INSERT INTO cost_layer (item_id, source, received_date, quantity, remaining_quantity, unit_cost)
+        SELECT i.id, 'opening', :now, i.current_stock - COALESCE(l.remaining, 0),
+               i.current_stock - COALESCE(l.remaining, 0), i.cost_price
+        FROM item i
+        LEFT JOIN (
+            SELECT item_id, SUM(remaining_quantity) AS remaining FROM cost_layer GROUP BY item_id
+        ) l ON l.item_id = i.id
+        WHERE i.current_stock - COALESCE(l.remaining, 0) > 0
+    """), {'now': datetime.now()})
+    db.session.commit()
+    return result.rowcount
+
+def item_stock_value(item):
+    """Current FIFO value of an item's stock, falling back to stock x cost price"""
+    value = db.session.query(db.func.sum(CostLayer.remaining_quantity * CostLayer.unit_cost)) \
+        .filter(CostLayer.item_id == item.id, CostLayer.remaining_quantity > 0).scalar()
+    if value is None:
+        return (item.current_stock or 0) * item.cost_price
+    return value
+
+def valuation_report(as_of=None, method='fifo'):
+    """Inventory valuation per item, either current or at a past point in time.
+
+    method is 'fifo' (value of the remaining layers) or 'average'. For the current
+    date 'average' uses the moving average cost; for a past date it uses the
+    weighted average cost of all layers received up to that date.
+    """
+    params = {'as_of': as_of or datetime.now()}
+    if as_of is None:
+        layer_sql = """
+            SELECT item_id,
+                   SUM(remaining_quantity) AS quantity,
+                   SUM(remaining_quantity * unit_cost) AS fifo_value,
+                   SUM(quantity * unit_cost) / NULLIF(SUM(quantity), 0) AS weighted_cost
+            FROM cost_layer
+            GROUP BY item_id
+        """
+    else:
+        layer_sql = """
+            SELECT l.item_id,
+                   SUM(l.quantity - COALESCE(c.used, 0)) AS quantity,
+                   SUM((l.quantity - COALESCE(c.used, 0)) * l.unit_cost) AS fifo_value,
+                   SUM(l.quantity * l.unit_cost) / NULLIF(SUM(l.quantity), 0) AS weighted_cost
+            FROM cost_layer l
+            LEFT JOIN (
+                SELECT cost_layer_id, SUM(quantity) AS used
+                FROM cost_consumption
+                WHERE cost_layer_id IS NOT NULL AND consumed_date <= :as_of
+                GROUP BY cost_layer_id
+            ) c ON c.cost_layer_id = l.id
+            WHERE l.received_date <= :as_of
+            GROUP BY l.item_id
+        """
+
+    rows = db.session.execute(db.text(f"""
+        SELECT i.id, i.name, i.sku, i.category, i.current_stock, i.cost_price, i.average_cost,
+               v.quantity, v.fifo_value, v.weighted_cost
+        FROM item i
+        LEFT JOIN ({layer_sql}) v ON v.item_id = i.id
+        ORDER BY i.name
+    """), params).all()
+
+    report = []
+    total_value = 0
+    for row in rows:
+        if as_of is None and row.quantity is None:
+            # Items without layers are valued at stock x cost price
+            quantity = row.current_stock or 0
+            fifo_value = quantity * row.cost_price
+        else:
+            quantity = row.quantity or 0
+            fifo_value = row.fifo_value or 0
+
+        if method == 'average':
+            if as_of is None:
+                unit_cost = row.average_cost if row.average_cost is not None else row.cost_price
+                quantity = row.current_stock or 0
+            else:
+                unit_cost = row.weighted_cost if row.weighted_cost is not None else row.cost_price
+            value = quantity * unit_cost
+        else:
+            value = fifo_value
+            unit_cost = value / quantity if quantity else 0
+
+        if as_of is not None and abs(quantity) < 1e-9:
+            continue
+        total_value += value
+        report.append({
+            'id': row.id, 'name': row.name, 'sku': row.sku, 'category': row.category,
+            'quantity': quantity, 'unit_cost': unit_cost, 'value': value
+        })
+
+    return report, total_value
+
+def cogs_report(start, end):
+    """Cost of goods sold per item for sales consumed between start and end"""
+    rows = db.session.query(
+        Item.id, Item.name, Item.sku,
+        db.func.sum(CostConsumption.quantity),
+        db.func.sum(CostConsumption.quantity * CostConsumption.unit_cost)
+    ).join(Item, Item.id == CostConsumption.item_id) \
+     .filter(CostConsumption.sale_item_id.isnot(None),
+             CostConsumption.consumed_date >= start, CostConsumption.consumed_date <= end) \
+     .group_by(Item.id, Item.name, Item.sku).all()
+
+    return [
+        {'id': row[0], 'name': row[1], 'sku': row[2], 'quantity': row[3], 'cogs': row[4]}
+        for row in rows
+    ]
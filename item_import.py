@@ -0,0 +1,277 @@
+# item_import.py - Bulk CSV/XLSX item import through a staging table
+import csv
+import os
+from datetime import datetime
+from database import db, Item, CostLayer, ItemImportBatch, ItemImportRow
+import inventory_valuation
+import stock_ledger
+import stock_alerts
+
+STAGING_CHUNK = 2000
+UPSERT_CHUNK = 1000
+
+TEXT_FIELDS = {'sku': 50, 'name': 100, 'category': 50}
+NUMERIC_FIELDS = ['current_stock', 'min_stock_level', 'cost_price', 'selling_price']
+HEADER_ALIASES = {
+    'item': 'name',
+    'item_name': 'name',
+    'stock': 'current_stock',
+    'quantity': 'current_stock',
+    'qty': 'current_stock',
+    'min_stock': 'min_stock_level',
+    'reorder_level': 'min_stock_level',
+    'cost': 'cost_price',
+    'price': 'selling_price',
+    'sale_price': 'selling_price',
+}
+
+class ImportStopped(Exception):
+    """A chunk failed to import; the chunks before it stay committed"""
+
+def _normalise_header(value):
+    key = str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return HEADER_ALIASES.get(key, key)
+
+def _is_blank(value):
+    return value is None or str(value).strip() == ''
+
+def read_rows(path):
+    """Yield (row_number, dict) from a CSV or XLSX file without loading it into memory"""
+    if path.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = [_normalise_header(value) for value in next(rows, ())]
+            for number, values in enumerate(rows, start=2):
+                if values and not all(_is_blank(value) for value in values):
+                    yield number, dict(zip(headers, values))
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            reader = csv.reader(handle)
+            headers = [_normalise_header(value) for value in next(reader, [])]
+            for number, values in enumerate(reader, start=2):
+                if values and not all(_is_blank(value) for value in values):
+                    yield number, dict(zip(headers, values))
+
+def parse_row(batch_id, number, raw):
+    """Convert a raw file row into a staging row, recording field errors"""
+    row = {'batch_id': batch_id, 'row_number': number}
+    errors = []
+
+    for field, max_length in TEXT_FIELDS.items():
+        value = raw.get(field)
+        value = str(value).strip() if not _is_blank(value) else None
+        if value and len(value) > max_length:
+            errors.append(f'{field} is longer than {max_length} characters')
+            value = value[:max_length]
+        row[field] = value
+    if not row['sku']:
+        errors.append('SKU is required')
+
+    for field in NUMERIC_FIELDS:
+        value = raw.get(field)
+        if _is_blank(value):
+            row[field] = None
+            continue
+        try:
+            row[field] = float(str(value).replace(',', '').replace('₹', '').strip())
+        except ValueError:
+            errors.append(f'{field} must be a number')
+            row[field] = None
+            continue
+        if row[field] < 0 and field != 'current_stock':
+            errors.append(f'{field} cannot be negative')
+
+    row['error'] = '; '.join(errors) or None
+    return row
+
+def stage_file(batch, path):
+    """Stream the file into the staging table in chunks"""
+    batch.status = 'staging'
+    db.session.commit()
+
+    chunk = []
+    for number, raw in read_rows(path):
+        chunk.append(parse_row(batch.id, number, raw))
+        if len(chunk) >= STAGING_CHUNK:
+            db.session.execute(ItemImportRow.__table__.insert(), chunk)
+            batch.total_rows += len(chunk)
+            db.session.commit()
+            chunk = []
+    if chunk:
+        db.session.execute(ItemImportRow.__table__.insert(), chunk)
+        batch.total_rows += len(chunk)
+        db.session.commit()
+
+def validate_batch(batch):
+    """Set-based checks across the whole staged file"""
+    batch.status = 'validating'
+    db.session.commit()
+
+    params = {'batch_id': batch.id}
+    db.session.execute(db.text("""
+        UPDATE item_import_row SET error = 'Duplicate SKU in file'
+        WHERE batch_id = :batch_id AND error IS NULL
+        AND row_number > (
+            SELECT MIN(r.row_number) FROM item_import_row r
+            WHERE r.batch_id = :batch_id AND r.sku = item_import_row.sku
+        )
+    """), params)
+    db.session.execute(db.text("""
+        UPDATE item_import_row SET error = 'New items need a name, cost price and selling price'
+        WHERE batch_id = :batch_id AND error IS NULL
+        AND (name IS NULL OR cost_price IS NULL OR selling_price IS NULL)
+        AND NOT EXISTS (SELECT 1 FROM item WHERE item.sku = item_import_row.sku)
+    """), params)
+
+    batch.error_count = ItemImportRow.query.filter(ItemImportRow.batch_id == batch.id,
+                                                   ItemImportRow.error.isnot(None)).count()
+    db.session.commit()
+
+def _upsert_chunk(batch, rows, touched):
+    skus = [row['sku'] for row in rows]
+    existing = {sku: (item_id, stock, cost) for item_id, sku, stock, cost in
+                db.session.query(Item.id, Item.sku, Item.current_stock, Item.cost_price).filter(Item.sku.in_(skus))}
+
+    # (item_id, quantity, unit cost, movement type): stock on new items is their opening stock,
+    # changed stock on existing items an adjustment, as when adding or editing an item by hand
+    inserts, updates, stock_changes = [], [], []
+    for row in rows:
+        if row['sku'] in existing:
+            item_id, old_stock, old_cost = existing[row['sku']]
+            updates.append({'item_id': item_id, **{field: row[field] for field in
+                            ['name', 'category', 'current_stock', 'min_stock_level', 'cost_price', 'selling_price']}})
+            if row['current_stock'] is not None and row['current_stock'] != (old_stock or 0):
+                stock_changes.append((item_id, row['current_stock'] - (old_stock or 0), row['cost_price'] or old_cost,
+                                      'adjustment'))
+            touched.add(item_id)
+        else:
+            inserts.append({
+                'sku': row['sku'], 'name': row['name'], 'category': row['category'],
+                'current_stock': row['current_stock'] or 0,
+                'min_stock_level': row['min_stock_level'] if row['min_stock_level'] is not None else 5,
+                'cost_price': row['cost_price'], 'selling_price': row['selling_price'],
+                'average_cost': row['cost_price']
+            })
+
+    if inserts:
+        db.session.execute(Item.__table__.insert(), inserts)
+        new_ids = dict(db.session.query(Item.sku, Item.id).filter(Item.sku.in_([row['sku'] for row in inserts])))
+        for row in inserts:
+            touched.add(new_ids[row['sku']])
+            if row['current_stock']:
+                stock_changes.append((new_ids[row['sku']], row['current_stock'], row['cost_price'], 'opening'))
+
+    if updates:
+        db.session.execute(db.text("""
+            UPDATE item SET
+                name = COALESCE(:name, name),
+                category = COALESCE(:category, category),
+                current_stock = COALESCE(:current_stock, current_stock),
+                min_stock_level = COALESCE(:min_stock_level, min_stock_level),
+                cost_price = COALESCE(:cost_price, cost_price),
+                selling_price = COALESCE(:selling_price, selling_price)
+            WHERE id = :item_id
+        """), updates)
+
+    # Keep the stock ledger and cost layers in step with the imported quantities
+    now = datetime.now()
+    stock_ledger.record_movements([
+        {'item_id': item_id, 'quantity': delta, 'movement_type': movement_type,
+         'reference_type': 'ItemImportBatch', 'reference_id': batch.id}
+        for item_id, delta, _, movement_type in stock_changes
+    ])
+    layers = [{'item_id': item_id, 'source': movement_type, 'received_date': now, 'quantity': delta,
+               'remaining_quantity': delta, 'unit_cost': unit_cost}
+              for item_id, delta, unit_cost, movement_type in stock_changes if delta > 0]
+    if layers:
+        db.session.execute(CostLayer.__table__.insert(), layers)
+    for item_id, delta, _, _ in stock_changes:
+        if delta < 0:
+            inventory_valuation.adjust_layers(Item.query.get(item_id), delta)
+
+    batch.created_count += len(inserts)
+    batch.updated_count += len(updates)
+    batch.processed_rows += len(rows)
+
+def upsert_batch(batch):
+    """Insert or update items from valid staging rows, one transaction per chunk.
+
+    Chunks keep the write lock short, so the import is not all-or-nothing: when a
+    chunk fails, the chunks before it stay imported (with their stock alerts
+    refreshed) and ImportStopped names the file rows from which nothing was.
+    """
+    batch.status = 'importing'
+    db.session.commit()
+
+    table = ItemImportRow.__table__
+    touched = set()
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(table).where(table.c.batch_id == batch.id, table.c.error.is_(None), table.c.id > last_id)
+            .order_by(table.c.id).limit(UPSERT_CHUNK)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        chunk_touched = set()
+        try:
+            _upsert_chunk(batch, rows, chunk_touched)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            stock_alerts.refresh_stock_alerts(touched)
+            db.session.commit()
+            raise ImportStopped(f'stopped at file row {rows[0]["row_number"]} ({str(e)}); '
+                                f'the {batch.processed_rows} valid rows before it were imported, '
+                                f'none from row {rows[0]["row_number"]} on') from e
+        touched |= chunk_touched
+
+    stock_alerts.refresh_stock_alerts(touched)
+    db.session.commit()
+
+def run_import(app, batch_id, path):
+    """Full pipeline for one uploaded file; runs in a background thread"""
+    with app.app_context():
+        batch = ItemImportBatch.query.get(batch_id)
+        try:
+            stage_file(batch, path)
+            validate_batch(batch)
+            upsert_batch(batch)
+            batch.status = 'completed'
+            batch.message = (f'{batch.created_count} items created, {batch.updated_count} updated, '
+                             f'{batch.error_count} rows with errors')
+        except Exception as e:
+            db.session.rollback()
+            batch.status = 'failed'
+            batch.message = f'Import failed: {str(e)}'
+        finally:
+            batch.completed_date = datetime.utcnow()
+            db.session.commit()
+            if os.path.exists(path):
+                os.remove(path)
+
+def batch_progress(batch):
+    valid_rows = max(batch.total_rows - batch.error_count, 0)
+    if batch.status in ('completed', 'failed'):
+        percent = 100
+    elif batch.status == 'importing' and valid_rows:
+        percent = int(batch.processed_rows * 100 / valid_rows)
+    else:
+        percent = 0
+    return {
+        'id': batch.id,
+        'filename': batch.filename,
+        'status': batch.status,
+        'total_rows': batch.total_rows,
+        'processed_rows': batch.processed_rows,
+        'created_count': batch.created_count,
+        'updated_count': batch.updated_count,
+        'error_count': batch.error_count,
+        'percent': percent,
+        'message': batch.message
+    }
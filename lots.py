@@ -0,0 +1,134 @@
+# lots.py - Lot / expiry tracking and first-expiry-first-out (FEFO) picking
+"""Purchase lines received with a lot number or expiry date become stock_lot rows at
+the receiving warehouse. Completing a sale picks from the item's open lots at the
+sale's warehouse in expiry order (undated lots after dated ones) and records the
+picks in sale_lot_allocation; transfers move lots between locations the same way.
+Expired lots are drawn last: stock that sells once every good lot is used up can
+only have come from them, and drawing them down keeps the lots' remaining quantities
+within item.current_stock.
+
+Lots only cover the stock that was received under one. Opening stock and purchases
+without lot details stay untracked, and a sale larger than its open lots leaves the
+rest unallocated rather than failing - item.current_stock remains the authority on
+what can be sold.
+
+stock_lot grows by a row per received line forever, so picking and the expiry scan
+only read open lots, through the partial indexes on remaining_quantity > 0; every
+query on open lots here carries that condition so SQLite can use them.
+"""
+from datetime import date, datetime
+from database import db, StockLot, SaleLotAllocation
+import reference_data
+
+EPSILON = 1e-9
+CHUNK_SIZE = 500
+
+def receive_lot(purchase_item, warehouse_id=None, received_date=None):
+    """Open a lot for a received purchase line that carries lot details. Returns the lot or None."""
+    if not purchase_item.lot_number and not purchase_item.expiry_date:
+        return None
+    lot = StockLot(
+        item_id=purchase_item.item_id,
+        warehouse_id=warehouse_id or reference_data.default_warehouse_id(),
+        lot_number=purchase_item.lot_number,
+        expiry_date=purchase_item.expiry_date,
+        received_date=received_date or datetime.now(),
+        quantity=purchase_item.quantity,
+        remaining_quantity=purchase_item.quantity,
+        purchase_item_id=purchase_item.id
+    )
+    db.session.add(lot)
+    return lot
+
+def _expired(lot, as_of):
+    return lot.expiry_date is not None and lot.expiry_date < as_of
+
+def _fefo_key(lot, as_of):
+    return (_expired(lot, as_of), lot.expiry_date is None, lot.expiry_date or date.max, lot.id)
+
+def open_lots_query(item_ids, warehouse_id):
+    """The items' open lots at the location, unordered: picking order is _fefo_key, applied in Python"""
+    return StockLot.query.filter(
+        StockLot.item_id.in_(item_ids),
+        StockLot.remaining_quantity > 0,
+        StockLot.warehouse_id == warehouse_id
+    )
+
+def open_lots(item_ids, warehouse_id, as_of=None):
+    """item_id -> open lots at the location in picking order, lots expired before `as_of` last"""
+    item_ids = sorted({int(item_id) for item_id in item_ids})
+    as_of = as_of or date.today()
+    lots = {}
+    for start in range(0, len(item_ids), CHUNK_SIZE):
+        for lot in open_lots_query(item_ids[start:start + CHUNK_SIZE], warehouse_id):
+            lots.setdefault(lot.item_id, []).append(lot)
+    for item_lots in lots.values():
+        item_lots.sort(key=lambda lot: _fefo_key(lot, as_of))
+    return lots
+
+def _pick(lots, quantity):
+    """Draw `quantity` from lots in order. Returns [(lot, quantity)] and the unallocated rest."""
+    picks = []
+    while quantity > EPSILON and lots:
+        lot = lots[0]
+        used = min(lot.remaining_quantity, quantity)
+        lot.remaining_quantity -= used
+        quantity -= used
+        picks.append((lot, used))
+        if lot.remaining_quantity <= EPSILON:
+            lots.pop(0)
+    return picks, max(quantity, 0)
+
+def allocate_sales(sales):
+    """Pick lots FEFO for every line of the given completed sales, in order.
+
+    Open lots are loaded once per warehouse for the whole set. Returns the quantity
+    that could not be allocated to a lot. The caller commits.
+    """
+    by_warehouse = {}
+    for sale in sales:
+        warehouse_id = sale.warehouse_id or reference_data.default_warehouse_id()
+        by_warehouse.setdefault(warehouse_id, []).append(sale)
+
+    unallocated = 0
+    for warehouse_id, warehouse_sales in by_warehouse.items():
+        item_ids = {line.item_id for sale in warehouse_sales for line in sale.items}
+        as_of = min((sale.sale_date or datetime.now()).date() for sale in warehouse_sales)
+        lots = open_lots(item_ids, warehouse_id, as_of)
+        for sale in warehouse_sales:
+            sale_day = (sale.sale_date or datetime.now()).date()
+            for line in sale.items:
+                item_lots = lots.get(int(line.item_id), [])
+                # Lots can expire between the earliest and the latest sale in a batch; good
+                # lots are in expiry order, so the first one expiring means the order is stale
+                if item_lots and _expired(item_lots[0], sale_day):
+                    item_lots.sort(key=lambda lot: _fefo_key(lot, sale_day))
+                picks, rest = _pick(item_lots, line.quantity)
+                for lot, quantity in picks:
+                    db.session.add(SaleLotAllocation(sale_item_id=line.id, lot_id=lot.id, quantity=quantity))
+                unallocated += rest
+    return unallocated
+
+def allocate_sale(sale):
+    """Pick lots FEFO for a completed sale. Returns the unallocated quantity."""
+    return allocate_sales([sale])
+
+def transfer_lots(item_id, quantity, from_warehouse_id, to_warehouse_id):
+    """Move `quantity` of an item's lots FEFO to another location, splitting lots as needed"""
+    picks, _ = _pick(open_lots([item_id], from_warehouse_id).get(int(item_id), []), quantity)
+    for lot, moved in picks:
+        db.session.add(StockLot(
+            item_id=lot.item_id, warehouse_id=to_warehouse_id, lot_number=lot.lot_number,
+            expiry_date=lot.expiry_date, received_date=lot.received_date, quantity=moved,
+            remaining_quantity=moved, purchase_item_id=lot.purchase_item_id, source_lot_id=lot.id
+        ))
+
+if __name__ == '__main__':
+    # Run daily (cron / Task Scheduler) so lots crossing the warning window get flagged
+    from app import app
+    from stock_alerts import refresh_expiry_alerts
+
+    with app.app_context():
+        count = refresh_expiry_alerts()
+        db.session.commit()
+        print(f"{count} expiring or expired lots flagged")
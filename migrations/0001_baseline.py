@@ -0,0 +1,48 @@
+# migrations/0001_baseline.py
+"""Bring databases created before versioned migrations up to the current baseline.
+
+Folds in the former migration_add_*.py scripts. Every step checks for what is
+already there, so it is safe on any database created by an earlier release.
+"""
+from data_versions import ROW_VERSIONED_TABLES, install_triggers
+from migrations.operations import add_column, create_index
+
+def upgrade(conn):
+    print("1. Tally and user columns...")
+    for table in ('item', 'supplier', 'customer'):
+        add_column(conn, table, "tally_guid VARCHAR(100)")
+    add_column(conn, 'user', "email VARCHAR(120)")
+    add_column(conn, 'user', "phone VARCHAR(20)")
+
+    print("2. Average cost...")
+    if add_column(conn, 'item', "average_cost FLOAT"):
+        conn.execute("UPDATE item SET average_cost = cost_price WHERE average_cost IS NULL")
+
+    print("3. Customer outstanding balance...")
+    if add_column(conn, 'customer', "outstanding_balance FLOAT NOT NULL DEFAULT 0"):
+        conn.execute("""
+            UPDATE customer SET outstanding_balance = COALESCE((
+                SELECT SUM(amount) FROM accounts_receivable
+                WHERE accounts_receivable.customer_id = customer.id
+                AND accounts_receivable.status = 'pending'
+            ), 0)
+        """)
+
+    print("4. Reorder fields...")
+    add_column(conn, 'item', "preferred_supplier_id INTEGER REFERENCES supplier (id)")
+    create_index(conn, 'ix_item_stock_margin', 'item', 'current_stock - min_stock_level')
+
+    print("5. Row versions and change counters...")
+    for table in ROW_VERSIONED_TABLES:
+        add_column(conn, table, "version INTEGER NOT NULL DEFAULT 1")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            table_name VARCHAR(50) NOT NULL PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    install_triggers(conn.execute)
+
+    print("6. Sale idempotency keys...")
+    add_column(conn, 'sales_order', "idempotency_key VARCHAR(100)")
+    create_index(conn, 'ux_sales_order_idempotency_key', 'sales_order', 'idempotency_key', unique=True)
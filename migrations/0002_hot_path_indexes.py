@@ -0,0 +1,32 @@
+# migrations/0002_hot_path_indexes.py
+"""Foreign-key, status and date indexes for order lines, payables and receivables.
+
+Without them every order page, receipt and completion scans sale_item or
+purchase_item to find an order's lines, and the dashboard and reports scan the
+ledgers to filter on status. Built one index per statement so the write lock is
+released between builds.
+"""
+from migrations.operations import create_index
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ('ix_sale_item_sales_order', 'sale_item', 'sales_order_id'),
+    ('ix_sale_item_item', 'sale_item', 'item_id'),
+    ('ix_purchase_item_purchase_order', 'purchase_item', 'purchase_order_id'),
+    ('ix_purchase_item_item', 'purchase_item', 'item_id'),
+    ('ix_accounts_payable_purchase_order', 'accounts_payable', 'purchase_order_id'),
+    ('ix_accounts_payable_supplier', 'accounts_payable', 'supplier_id'),
+    ('ix_accounts_payable_status_due', 'accounts_payable', 'status, due_date'),
+    ('ix_accounts_receivable_sales_order', 'accounts_receivable', 'sales_order_id'),
+    ('ix_accounts_receivable_customer_status', 'accounts_receivable', 'customer_id, status'),
+    ('ix_accounts_receivable_status_due', 'accounts_receivable', 'status, due_date'),
+    ('ix_sales_order_status_date', 'sales_order', 'status, sale_date'),
+    ('ix_sales_order_date', 'sales_order', 'sale_date'),
+    ('ix_purchase_order_status_date', 'purchase_order', 'status, order_date'),
+]
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, columns)
+    conn.execute("ANALYZE")
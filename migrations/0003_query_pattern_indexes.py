@@ -0,0 +1,42 @@
+# migrations/0003_query_pattern_indexes.py
+"""Indexes for the remaining filters, sorts and lookups in app.py and the services.
+
+Stock alerts by item and by resolved state, tasks by status and employee, the
+name-ordered dropdowns (the item one covering), Tally sync flags and GUID
+lookups, and the log tables ordered by date. tests/test_query_plans.py checks
+that the hot queries keep using them.
+"""
+from migrations.operations import create_index
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ('ix_item_name_options', 'item', 'name, sku, selling_price, current_stock'),
+    ('ix_item_tally_synced', 'item', 'tally_synced'),
+    ('ix_item_tally_guid', 'item', 'tally_guid'),
+    ('ix_supplier_name', 'supplier', 'name'),
+    ('ix_supplier_tally_synced', 'supplier', 'tally_synced'),
+    ('ix_supplier_tally_guid', 'supplier', 'tally_guid'),
+    ('ix_customer_name', 'customer', 'name'),
+    ('ix_customer_tally_synced', 'customer', 'tally_synced'),
+    ('ix_customer_tally_guid', 'customer', 'tally_guid'),
+    ('ix_employee_name', 'employee', 'name'),
+    ('ix_purchase_order_supplier', 'purchase_order', 'supplier_id'),
+    ('ix_purchase_order_tally_synced', 'purchase_order', 'tally_synced'),
+    ('ix_sales_order_customer', 'sales_order', 'customer_id'),
+    ('ix_sales_order_employee', 'sales_order', 'employee_id'),
+    ('ix_sales_order_tally_synced', 'sales_order', 'tally_synced'),
+    ('ix_sale_item_employee', 'sale_item', 'employee_id'),
+    ('ix_worker_task_status_due', 'worker_task', 'status, due_date'),
+    ('ix_worker_task_employee', 'worker_task', 'employee_id'),
+    ('ix_worker_task_assigned', 'worker_task', 'assigned_date'),
+    ('ix_stock_alert_item_resolved', 'stock_alert', 'item_id, resolved'),
+    ('ix_stock_alert_resolved_date', 'stock_alert', 'resolved, created_date'),
+    ('ix_tally_sync_log_date', 'tally_sync_log', 'created_date'),
+    ('ix_system_log_date', 'system_log', 'created_date'),
+]
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, columns)
+    conn.execute("ANALYZE")
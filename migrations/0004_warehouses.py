@@ -0,0 +1,56 @@
+# migrations/0004_warehouses.py
+"""Stock locations: warehouse columns on orders, alerts and the stock ledger.
+
+The warehouse, item_stock and stock_transfer tables come from create_all. Existing
+stock all sits in the default warehouse: item_stock is seeded from the ledger, the
+ledger trigger installed, and stock the ledger does not explain yet posted as
+opening movements through it - all in one write transaction, so no movement can
+slip in between and stock_ledger.backfill_opening_movements has nothing left to add. The ledger's warehouse_id is then backfilled in
+batches; rows still NULL meanwhile are counted at the default location by the trigger.
+"""
+from migrations.operations import add_column, batched_update, create_index
+from warehouses import install_stock_triggers
+
+TRANSACTIONAL = False
+
+def upgrade(conn):
+    print("1. Warehouse columns...")
+    for table in ('stock_movement', 'purchase_order', 'sales_order', 'stock_alert'):
+        add_column(conn, table, "warehouse_id INTEGER REFERENCES warehouse (id)")
+
+    print("2. Default warehouse and per-location stock...")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("""
+            INSERT INTO warehouse (code, name, is_default, active, created_date)
+            SELECT 'MAIN', 'Main Warehouse', 1, 1, datetime('now')
+            WHERE NOT EXISTS (SELECT 1 FROM warehouse WHERE is_default = 1)
+        """)
+        default_id = conn.execute("SELECT id FROM warehouse WHERE is_default = 1 ORDER BY id LIMIT 1").fetchone()[0]
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+                            "AND name = 'trg_stock_movement_item_stock'").fetchone():
+            conn.execute("DELETE FROM item_stock")
+            conn.execute("""
+                INSERT INTO item_stock (item_id, warehouse_id, quantity)
+                SELECT item_id, ?, SUM(quantity) FROM stock_movement GROUP BY item_id
+            """, (default_id,))
+            install_stock_triggers(conn.execute)
+            conn.execute("""
+                INSERT INTO stock_movement (item_id, quantity, movement_type, warehouse_id, created_date)
+                SELECT i.id, COALESCE(i.current_stock, 0) - COALESCE(m.total, 0), 'opening', ?, datetime('now', 'localtime')
+                FROM item i
+                LEFT JOIN (
+                    SELECT item_id, SUM(quantity) AS total FROM stock_movement GROUP BY item_id
+                ) m ON m.item_id = i.id
+                WHERE ABS(COALESCE(i.current_stock, 0) - COALESCE(m.total, 0)) > 0.000001
+            """, (default_id,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    print(f"   ✓ Stock assigned to warehouse {default_id}")
+
+    print("3. Ledger locations...")
+    batched_update(conn, 'stock_movement', f'warehouse_id = {int(default_id)}', 'warehouse_id IS NULL')
+    create_index(conn, 'ix_stock_movement_warehouse_date', 'stock_movement', 'warehouse_id, created_date')
+    conn.execute("ANALYZE")
@@ -0,0 +1,19 @@
+# migrations/0005_stock_lots.py
+"""Lot numbers and expiry dates on purchase lines, and lot links on stock alerts.
+
+stock_lot and sale_lot_allocation, with their indexes, come from create_all. Both
+new columns are nullable with no default, so adding them rewrites nothing; existing
+stock simply has no lots. The alert index is partial, covering lot alerts only.
+"""
+from migrations.operations import add_column, create_index
+
+TRANSACTIONAL = False
+
+def upgrade(conn):
+    print("1. Lot columns...")
+    add_column(conn, 'purchase_item', "lot_number VARCHAR(50)")
+    add_column(conn, 'purchase_item', "expiry_date DATE")
+    add_column(conn, 'stock_alert', "lot_id INTEGER REFERENCES stock_lot (id)")
+
+    print("2. Lot alert index...")
+    create_index(conn, 'ix_stock_alert_lot', 'stock_alert', 'lot_id, alert_type', where='lot_id IS NOT NULL')
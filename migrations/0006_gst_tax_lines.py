@@ -0,0 +1,59 @@
+# migrations/0006_gst_tax_lines.py
+"""Per-item GST: HSN code and rate on items, tax amounts on sale lines, place of supply on sales.
+
+sale_tax_line comes from create_all. Sales made before this charged Config.GST_PERCENT
+on the whole invoice, so each gets a single tax line at that rate for what it actually
+charged, split by its buyer's state, so GSTR-1 summaries cover the old months too.
+Their lines keep NULL tax columns (sales analytics allocates those by line value as
+before). The buyer's GSTIN is taken from the customer record as it is now - the best
+there is. Everything runs in id batches and is safe to repeat.
+"""
+from config import Config
+from migrations.operations import add_column, batched_update
+import tax
+
+TRANSACTIONAL = False
+BATCH_SIZE = 5000
+
+def upgrade(conn):
+    print("1. Tax columns...")
+    add_column(conn, 'item', "hsn_code VARCHAR(8)")
+    add_column(conn, 'item', "gst_rate FLOAT")
+    for column in ("discount FLOAT", "gst_rate FLOAT", "taxable_value FLOAT", "tax_amount FLOAT"):
+        add_column(conn, 'sale_item', column)
+    for column in ("customer_gstin VARCHAR(15)", "place_of_supply VARCHAR(2)", "inter_state BOOLEAN"):
+        add_column(conn, 'sales_order', column)
+
+    print("2. Place of supply for existing sales...")
+    # batched_update binds the id range first, so the state code goes in as a literal
+    ours = tax.company_state()
+    ours = f"'{ours}'" if ours and ours.isdigit() and len(ours) == 2 else 'NULL'
+    batched_update(conn, 'sales_order', """
+        customer_gstin = (SELECT UPPER(TRIM(c.gst_number)) FROM customer c
+                          WHERE c.id = sales_order.customer_id AND LENGTH(TRIM(c.gst_number)) = 15)
+    """, 'inter_state IS NULL', batch_size=BATCH_SIZE)
+    batched_update(conn, 'sales_order', f"""
+        place_of_supply = COALESCE(SUBSTR(customer_gstin, 1, 2), {ours}),
+        inter_state = CASE WHEN SUBSTR(customer_gstin, 1, 2) <> {ours} THEN 1 ELSE 0 END
+    """, 'inter_state IS NULL', batch_size=BATCH_SIZE)
+
+    print("3. Tax lines for existing sales...")
+    low, high = conn.execute("SELECT MIN(id), MAX(id) FROM sales_order").fetchone()
+    added = 0
+    for start in range(low or 0, (high or -1) + 1, BATCH_SIZE):
+        added += conn.execute(f"""
+            INSERT INTO sale_tax_line
+                (sales_order_id, hsn_code, gst_rate, quantity, taxable_value, cgst_amount, sgst_amount, igst_amount)
+            SELECT so.id, NULL, {float(Config.GST_PERCENT)},
+                   (SELECT COALESCE(SUM(si.quantity), 0) FROM sale_item si WHERE si.sales_order_id = so.id),
+                   ROUND(COALESCE(so.total_amount, 0) - COALESCE(so.gst_amount, 0), 2),
+                   CASE WHEN so.inter_state = 1 THEN 0 ELSE ROUND(COALESCE(so.gst_amount, 0) / 2, 2) END,
+                   CASE WHEN so.inter_state = 1 THEN 0
+                        ELSE ROUND(COALESCE(so.gst_amount, 0) - ROUND(COALESCE(so.gst_amount, 0) / 2, 2), 2) END,
+                   CASE WHEN so.inter_state = 1 THEN ROUND(COALESCE(so.gst_amount, 0), 2) ELSE 0 END
+            FROM sales_order so
+            WHERE so.id >= ? AND so.id < ?
+              AND NOT EXISTS (SELECT 1 FROM sale_tax_line t WHERE t.sales_order_id = so.id)
+        """, (start, start + BATCH_SIZE)).rowcount
+    print(f"   ✓ Added {added} tax lines")
+    conn.execute("ANALYZE")
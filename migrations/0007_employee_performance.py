@@ -0,0 +1,23 @@
+# migrations/0007_employee_performance.py
+"""Commission rates on employees and completion dates on tasks.
+
+employee_performance comes from create_all and fills itself the first time a
+report asks for a month. Tasks completed before this have no completion date; they
+are taken as completed on their due date (or the day they were assigned), the best
+there is, so past months' productivity counts them. Safe to repeat.
+"""
+from migrations.operations import add_column, batched_update, create_index
+
+TRANSACTIONAL = False
+
+def upgrade(conn):
+    print("1. Commission and completion columns...")
+    add_column(conn, 'employee', "commission_rate FLOAT")
+    add_column(conn, 'worker_task', "completed_date DATETIME")
+
+    print("2. Completion dates for completed tasks...")
+    batched_update(conn, 'worker_task', "completed_date = COALESCE(due_date, assigned_date)",
+                   "status = 'completed' AND completed_date IS NULL")
+
+    print("3. Task completion index...")
+    create_index(conn, 'ix_worker_task_completed', 'worker_task', 'completed_date')
@@ -0,0 +1,157 @@
+# migrations/__init__.py - Versioned schema migrations for the SQLite database
+"""Ordered migration scripts plus a schema_migrations table recording which have run.
+
+Every module in this package named NNNN_description.py is one migration. It defines
+upgrade(conn), taking a sqlite3 connection in autocommit mode, and may set
+TRANSACTIONAL = False to manage its own transactions (index builds and batched
+rewrites, see operations.py). Transactional migrations run inside BEGIN IMMEDIATE
+... COMMIT together with their schema_migrations row, so a failure leaves nothing
+half-applied.
+
+    python -m migrations                 # create missing tables, apply pending migrations
+    python -m migrations --status        # list applied and pending migrations
+    flask --app app db-upgrade           # same as the first form
+
+Tables themselves come from the models (db.create_all); migrations change tables
+that already exist. A database created from scratch by create_schema() is stamped
+as fully migrated, since create_all already built the current schema.
+"""
+import importlib
+import os
+import pkgutil
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime
+
+MIGRATION_MODULE = re.compile(r'^(\d{4})_(\w+)$')
+
+Migration = namedtuple('Migration', 'version name module')
+
+def discover():
+    """All migrations in this package, ordered by version"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = MIGRATION_MODULE.match(module_info.name)
+        if match:
+            module = importlib.import_module(f'{__name__}.{module_info.name}')
+            migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f'Duplicate migration versions in {__path__[0]}')
+    return migrations
+
+def connect(db_file):
+    # Autocommit; transactions are opened explicitly around each migration
+    conn = sqlite3.connect(db_file, isolation_level=None, timeout=30)
+    conn.execute('PRAGMA busy_timeout=30000')
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+def ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER NOT NULL PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_date DATETIME NOT NULL,
+            duration_ms INTEGER
+        )
+    """)
+
+def applied_versions(conn):
+    ensure_version_table(conn)
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+def pending_migrations(db_file):
+    conn = connect(db_file)
+    try:
+        done = applied_versions(conn)
+    finally:
+        conn.close()
+    return [migration for migration in discover() if migration.version not in done]
+
+def _record(conn, migration, duration_ms):
+    conn.execute('INSERT INTO schema_migrations (version, name, applied_date, duration_ms) VALUES (?, ?, ?, ?)',
+                 (migration.version, migration.name, datetime.now().isoformat(sep=' ', timespec='seconds'),
+                  duration_ms))
+
+def stamp(db_file):
+    """Mark every migration as applied without running it (for freshly created databases)"""
+    conn = connect(db_file)
+    try:
+        done = applied_versions(conn)
+        conn.execute('BEGIN IMMEDIATE')
+        for migration in discover():
+            if migration.version not in done:
+                _record(conn, migration, None)
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+
+def backup(db_file):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_name = os.path.join(os.path.dirname(db_file), f"inventory_backup_{timestamp}.db")
+    source = sqlite3.connect(db_file)
+    target = sqlite3.connect(backup_name)
+    try:
+        # Online backup API: consistent even with the app running, unlike copying the file in WAL mode
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return backup_name
+
+def upgrade(db_file, target=None, make_backup=True):
+    """Apply pending migrations up to `target` (all when None). Returns the versions applied."""
+    pending = [migration for migration in pending_migrations(db_file)
+               if target is None or migration.version <= target]
+    if not pending:
+        print("✓ Database schema is up to date")
+        return []
+
+    if make_backup and os.path.exists(db_file):
+        print(f"Backup created: {backup(db_file)}")
+
+    conn = connect(db_file)
+    applied = []
+    try:
+        for migration in pending:
+            print(f"Applying {migration.version:04d}_{migration.name}...")
+            started = time.perf_counter()
+            if getattr(migration.module, 'TRANSACTIONAL', True):
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    migration.module.upgrade(conn)
+                    _record(conn, migration, int((time.perf_counter() - started) * 1000))
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+            else:
+                # Must be safe to re-run: it may have stopped part way through
+                migration.module.upgrade(conn)
+                _record(conn, migration, int((time.perf_counter() - started) * 1000))
+            applied.append(migration.version)
+            print(f"   ✓ {migration.version:04d}_{migration.name} ({time.perf_counter() - started:.1f}s)")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+    print("\n✅ Database migration completed successfully!")
+    return applied
+
+def status(db_file):
+    conn = connect(db_file)
+    try:
+        ensure_version_table(conn)
+        rows = {row[0]: row for row in conn.execute(
+            'SELECT version, name, applied_date, duration_ms FROM schema_migrations')}
+    finally:
+        conn.close()
+    for migration in discover():
+        row = rows.get(migration.version)
+        state = f"applied {row[2]}" if row else "pending"
+        print(f"  {migration.version:04d}_{migration.name:<40} {state}")
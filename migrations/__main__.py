@@ -0,0 +1,32 @@
+# migrations/__main__.py - python -m migrations [--status] [--target N] [--database FILE]
+import argparse
+import os
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('--database', help='SQLite file (default: the database configured in app.py)')
+    parser.add_argument('--status', action='store_true', help='list applied and pending migrations')
+    parser.add_argument('--target', type=int, help='stop after this migration version')
+    parser.add_argument('--no-backup', action='store_true', help='skip the backup copy before migrating')
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.database)}'
+    from app import app, create_schema
+    from database import db
+    from migrations import upgrade, status
+
+    with app.app_context():
+        db_file = db.engine.url.database
+        if args.status:
+            print(f"Migrations for {db_file}:")
+            status(db_file)
+            return
+        create_schema()
+        db.engine.dispose()
+    upgrade(db_file, target=args.target, make_backup=not args.no_backup)
+    with app.app_context():
+        create_schema()  # now migrated: triggers for tables the migrations did not cover
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# migrations/operations.py - Building blocks for migration scripts
+"""Idempotent schema operations for sqlite3 connections.
+
+SQLite has no CREATE INDEX CONCURRENTLY: building an index holds the write lock
+until it finishes, while readers carry on (WAL). Non-transactional migrations
+therefore build one index per statement, so writers queue behind a single index
+build rather than behind the whole migration. Large rewrites go in primary-key
+batches, each its own short transaction.
+"""
+import sqlite3
+import time
+
+def add_column(conn, table, column_ddl):
+    """ALTER TABLE ... ADD COLUMN; returns False when the column already exists"""
+    try:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column_ddl}")
+        print(f"   ✓ Added {column_ddl.split()[0]} to {table}")
+        return True
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" in str(e):
+            print(f"   ✓ {column_ddl.split()[0]} already exists in {table}")
+            return False
+        raise
+
+def index_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone() is not None
+
+def create_index(conn, name, table, columns, unique=False, where=None):
+    """CREATE INDEX IF NOT EXISTS, reporting how long the build held the write lock"""
+    if index_exists(conn, name):
+        print(f"   ✓ {name} already exists")
+        return False
+    started = time.perf_counter()
+    conn.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+                 + (f" WHERE {where}" if where else ''))
+    print(f"   ✓ Created {name} ({time.perf_counter() - started:.2f}s)")
+    return True
+
+def _id_range(conn, table):
+    return conn.execute(f"SELECT MIN(id), MAX(id) FROM {table}").fetchone()
+
+def batched_update(conn, table, set_sql, where_sql='1', params=(), batch_size=5000, pause=0.0):
+    """UPDATE a large table in id ranges; returns the number of rows changed.
+
+    Outside a transaction each batch commits on its own, so other writers get the
+    lock between batches. `pause` seconds of sleep between batches throttles the
+    rewrite further on a busy system. Must be safe to repeat, since a failure can
+    leave earlier batches applied.
+    """
+    low, high = _id_range(conn, table)
+    if low is None:
+        return 0
+    changed = 0
+    for start in range(low, high + 1, batch_size):
+        cursor = conn.execute(f"UPDATE {table} SET {set_sql} WHERE id >= ? AND id < ? AND ({where_sql})",
+                              (start, start + batch_size, *params))
+        changed += cursor.rowcount
+        if pause:
+            time.sleep(pause)
+    print(f"   ✓ Updated {changed} rows in {table}")
+    return changed
+
+def rebuild_table(conn, table, create_sql, columns, batch_size=5000, pause=0.0):
+    """Rewrite `table` with a new definition (type changes, constraints) while it stays in use.
+
+    create_sql creates the new table under the name {table}__new. Rows are copied in
+    id batches; meanwhile triggers mirror every insert, update and delete on the old
+    table (from any process) into the new one, so nothing written during the copy is lost.
+    The final swap (drop, rename, recreate indexes and triggers) is one short
+    transaction. `columns` lists the columns copied, present in both tables.
+    Requires an autocommit connection (a non-transactional migration).
+    """
+    if conn.in_transaction:
+        raise RuntimeError('rebuild_table must run outside a transaction')
+    shadow = f"{table}__new"
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f"NEW.{column}" for column in columns)
+    mirrors = [f"trg_{table}_mirror_{action}" for action in ('insert', 'update', 'delete')]
+    # Indexes and triggers on the old table disappear with it; keep their SQL to recreate them
+    dependents = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,))]
+
+    conn.execute(f"DROP TABLE IF EXISTS {shadow}")
+    conn.execute(create_sql)
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute(f"CREATE TRIGGER {mirrors[0]} AFTER INSERT ON {table} BEGIN "
+                 f"INSERT OR REPLACE INTO {shadow} ({column_list}) VALUES ({new_values}); END")
+    conn.execute(f"CREATE TRIGGER {mirrors[1]} AFTER UPDATE ON {table} BEGIN "
+                 f"INSERT OR REPLACE INTO {shadow} ({column_list}) VALUES ({new_values}); END")
+    conn.execute(f"CREATE TRIGGER {mirrors[2]} AFTER DELETE ON {table} BEGIN "
+                 f"DELETE FROM {shadow} WHERE id = OLD.id; END")
+    conn.execute('COMMIT')
+
+    try:
+        low, high = _id_range(conn, table)
+        copied = 0
+        if low is not None:
+            for start in range(low, high + 1, batch_size):
+                # Rows the triggers already mirrored are newer than this copy; keep them
+                cursor = conn.execute(f"INSERT OR IGNORE INTO {shadow} ({column_list}) "
+                                      f"SELECT {column_list} FROM {table} WHERE id >= ? AND id < ?",
+                                      (start, start + batch_size))
+                copied += cursor.rowcount
+                if pause:
+                    time.sleep(pause)
+
+        conn.execute('BEGIN IMMEDIATE')
+        for trigger in mirrors:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+        for sql in dependents:
+            conn.execute(sql)
+        conn.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        for trigger in mirrors:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        raise
+    print(f"   ✓ Rebuilt {table} ({copied} rows copied)")
@@ -0,0 +1,137 @@
+# passwords.py - Password hashing policy, rehash-on-login and login throttling
+import os
+import threading
+import time
+from collections import deque
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Named policies for PASSWORD_HASH_METHOD; any Werkzeug method string also works
+HASH_POLICIES = {
+    'scrypt': 'scrypt:32768:8:1',
+    'pbkdf2': 'pbkdf2:sha256:600000',
+    'pbkdf2-fast': 'pbkdf2:sha256:150000',
+}
+DEFAULT_POLICY = 'pbkdf2'
+
+_method_prefixes = {}
+
+def hash_method():
+    method = current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_POLICY)
+    return HASH_POLICIES.get(method, method)
+
+def _method_prefix(method):
+    # Werkzeug expands short methods ("pbkdf2") to full ones, so learn the stored prefix once
+    if method not in _method_prefixes:
+        _method_prefixes[method] = generate_password_hash('probe', method=method).split('$', 1)[0]
+    return _method_prefixes[method]
+
+def hash_password(password):
+    """Hash a password with the configured policy"""
+    return generate_password_hash(password, method=hash_method())
+
+def needs_rehash(stored_hash):
+    return stored_hash.split('$', 1)[0] != _method_prefix(hash_method())
+
+def verify_password(user, password):
+    """Check a login password; on success upgrade the stored hash if the policy changed.
+
+    Returns True when the password matches. The caller commits the session.
+    """
+    if not check_password_hash(user.password, password):
+        return False
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+    return True
+
+class SlidingWindowLimiter:
+    """At most `limit` events per key within `window` seconds"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, events, now):
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def allowed(self, key):
+        with self._lock:
+            events = self._events.get(key)
+            if not events:
+                return True
+            self._prune(events, time.monotonic())
+            if not events:
+                del self._events[key]
+                return True
+            return len(events) < self.limit
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            events = self._events.setdefault(key, deque())
+            self._prune(events, now)
+            events.append(now)
+            # Keep memory bounded under a flood of distinct keys
+            if len(self._events) > 10000:
+                for stale in [k for k, v in self._events.items() if not v or v[-1] <= now - self.window]:
+                    del self._events[stale]
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+class LoginThrottle:
+    """Rate limits per client IP and per username, plus a cap on concurrent hash checks.
+
+    Attempts are counted per IP before any hashing happens; failures are counted per
+    username. The semaphore keeps password hashing from occupying more workers than
+    there are cores, so a burst of logins queues briefly instead of starving other
+    requests.
+    """
+
+    def __init__(self, ip_limit=(20, 60), user_limit=(5, 300), concurrency=None, wait_seconds=5):
+        self.ip_limiter = SlidingWindowLimiter(*ip_limit)
+        self.user_limiter = SlidingWindowLimiter(*user_limit)
+        self.wait_seconds = wait_seconds
+        self._slots = threading.BoundedSemaphore(concurrency or os.cpu_count() or 2)
+
+    def init_app(self, app):
+        self.ip_limiter = SlidingWindowLimiter(*app.config.get('LOGIN_RATE_LIMIT_IP', (20, 60)))
+        self.user_limiter = SlidingWindowLimiter(*app.config.get('LOGIN_RATE_LIMIT_USER', (5, 300)))
+        self._slots = threading.BoundedSemaphore(app.config.get('LOGIN_HASH_CONCURRENCY') or os.cpu_count() or 2)
+
+    def check(self, ip, username):
+        """Record an attempt; returns an error message when it must be refused"""
+        if not self.ip_limiter.allowed(ip):
+            return 'Too many login attempts from this address. Please wait a minute and try again.'
+        self.ip_limiter.hit(ip)
+        if not self.user_limiter.allowed(username.lower()):
+            return 'Too many failed attempts for this account. Please wait a few minutes and try again.'
+        return None
+
+    def failed(self, username):
+        self.user_limiter.hit(username.lower())
+
+    def succeeded(self, username):
+        self.user_limiter.reset(username.lower())
+
+    def hashing_slot(self):
+        """Context manager for one password check; raises TimeoutError when the server is saturated"""
+        throttle = self
+
+        class _Slot:
+            def __enter__(self):
+                if not throttle._slots.acquire(timeout=throttle.wait_seconds):
+                    raise TimeoutError('Login service is busy')
+                return self
+
+            def __exit__(self, *exc):
+                throttle._slots.release()
+                return False
+
+        return _Slot()
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,286 @@
+# pos_sales.py - Batch posting of completed sales captured offline by POS terminals
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy.orm import selectinload
+from database import db, Item, Customer, Employee, SalesOrder, SaleItem, SaleTaxLine, AccountsReceivable
+from credit_control import apply_receivable, available_credit, pending_order_totals
+from events import queue_event
+import inventory_valuation
+import sales_analytics
+import stock_alerts
+import lots
+import stock_ledger
+import reference_data
+import tax
+import warehouses
+
+RECEIVABLE_DAYS = 30
+# Keeps every IN (...) list below SQLite's bound-parameter limit
+MAX_BATCH_SIZE = 500
+
+class SaleRejected(Exception):
+    """A single sale in the batch failed validation"""
+
+class StockConflict(Exception):
+    """Stock changed between validation and posting; the whole batch should be retried"""
+
+def invoice_number_for(idempotency_key, sale_date):
+    # Derived from the key so a batch needs no extra lookups to stay unique
+    digest = hashlib.sha1(idempotency_key.encode('utf-8')).hexdigest()[:10].upper()
+    return f"INV{sale_date.strftime('%Y%m%d')}{digest}"
+
+def _parse_sale(raw):
+    if not isinstance(raw, dict):
+        raise SaleRejected('Sale must be an object')
+    key = str(raw.get('idempotency_key') or '').strip()
+    if not key or len(key) > 100:
+        raise SaleRejected('idempotency_key is required (max 100 characters)')
+
+    try:
+        sale = {
+            'key': key,
+            'customer_id': int(raw['customer_id']),
+            'employee_id': int(raw['employee_id']),
+            'discount': float(raw.get('discount') or 0),
+            'sale_date': datetime.fromisoformat(raw['sale_date']) if raw.get('sale_date') else datetime.now(),
+            'warehouse_id': int(raw['warehouse_id']) if raw.get('warehouse_id') else reference_data.default_warehouse_id(),
+        }
+        lines = raw.get('items') or []
+        sale['lines'] = [{
+            'item_id': int(line['item_id']),
+            'quantity': float(line['quantity']),
+            'employee_id': int(line.get('employee_id') or sale['employee_id']),
+            'discount': float(line.get('discount') or 0),
+        } for line in lines]
+    except (KeyError, TypeError, ValueError) as e:
+        raise SaleRejected(f'Invalid sale: {str(e)}')
+
+    if not sale['lines']:
+        raise SaleRejected('Sale has no items')
+    if any(line['quantity'] <= 0 for line in sale['lines']):
+        raise SaleRejected('Quantities must be positive')
+    if sale['discount'] < 0 or any(line['discount'] < 0 for line in sale['lines']):
+        raise SaleRejected('Discount cannot be negative')
+    return sale
+
+def _price_batch(sales, items, customers):
+    """Price every sale whose customer and items are known, all in one tax.compute_invoices pass.
+
+    Same pricing as create_sale: discounts off each line, then GST at each item's rate.
+    Sales left unpriced are rejected by _price_sale.
+    """
+    priced = []
+    for sale in sales:
+        customer = customers.get(sale['customer_id'])
+        if not customer or any(line['item_id'] not in items for line in sale['lines']):
+            continue
+        sale['customer_gstin'] = tax.normalize_gstin(customer['gst_number'])
+        sale['place_of_supply'], sale['inter_state'] = tax.place_of_supply(customer['gst_number'])
+        for line in sale['lines']:
+            item = items[line['item_id']]
+            line.update(unit_price=item['selling_price'], gst_rate=item['gst_rate'], hsn_code=item['hsn_code'])
+        priced.append(sale)
+    tax.compute_invoices(priced)
+
+def _price_sale(sale, items, customers, employees, stock, exposure):
+    """Check one sale, priced by _price_batch, against the running batch state"""
+    customer = customers.get(sale['customer_id'])
+    if not customer:
+        raise SaleRejected(f"Unknown customer {sale['customer_id']}")
+    unknown_employees = {sale['employee_id']} | {line['employee_id'] for line in sale['lines']}
+    unknown_employees -= employees
+    if unknown_employees:
+        raise SaleRejected(f"Unknown employee {sorted(unknown_employees)[0]}")
+
+    needed = {}
+    for line in sale['lines']:
+        if line['item_id'] not in items:
+            raise SaleRejected(f"Unknown item {line['item_id']}")
+        needed[line['item_id']] = needed.get(line['item_id'], 0) + line['quantity']
+    warehouse_id = sale['warehouse_id']
+    if warehouse_id not in stock:
+        raise SaleRejected(f"Unknown warehouse {warehouse_id}")
+    for item_id, quantity in needed.items():
+        on_hand = stock[warehouse_id].get(item_id, 0)
+        if on_hand < quantity:
+            raise SaleRejected(f"Insufficient stock for {items[item_id]['name']}. Available: {on_hand}")
+
+    if sale['error']:
+        raise SaleRejected(sale['error'])
+
+    # Same exposure as create_sale: outstanding balance plus pending orders, plus this batch so far
+    available = available_credit(customer['credit_limit'], exposure[sale['customer_id']])
+    if available is not None and sale['total_amount'] > available:
+        raise SaleRejected(f"Credit limit exceeded for {customer['name']}. Available credit: {available:.2f}")
+
+    for item_id, quantity in needed.items():
+        stock[warehouse_id][item_id] = stock[warehouse_id].get(item_id, 0) - quantity
+    exposure[sale['customer_id']] += sale['total_amount']
+
+def post_sales(raw_sales):
+    """Validate and post a batch of completed sales in one transaction.
+
+    Returns one result dict per input sale, in order. A sale whose idempotency key
+    was already posted is reported as a duplicate of the original order, so a
+    retried upload never posts twice. Commits on success.
+    """
+    results = [None] * len(raw_sales)
+    parsed = []
+    for index, raw in enumerate(raw_sales):
+        try:
+            parsed.append((index, _parse_sale(raw)))
+        except SaleRejected as e:
+            key = raw.get('idempotency_key') if isinstance(raw, dict) else None
+            results[index] = {'idempotency_key': key, 'status': 'rejected', 'error': str(e)}
+
+    keys = {sale['key'] for _, sale in parsed}
+    item_ids = {line['item_id'] for _, sale in parsed for line in sale['lines']}
+    customer_ids = {sale['customer_id'] for _, sale in parsed}
+
+    # Reference data for the whole batch, one query each
+    posted = {key: {'sales_order_id': order_id, 'invoice_number': invoice}
+              for key, order_id, invoice in db.session.query(
+                  SalesOrder.idempotency_key, SalesOrder.id, SalesOrder.invoice_number
+              ).filter(SalesOrder.idempotency_key.in_(keys))}
+    items = {item_id: {'name': name, 'selling_price': price, 'current_stock': current_stock or 0,
+                       'gst_rate': gst_rate, 'hsn_code': hsn_code}
+             for item_id, name, price, current_stock, gst_rate, hsn_code in db.session.query(
+                 Item.id, Item.name, Item.selling_price, Item.current_stock, Item.gst_rate, Item.hsn_code
+             ).filter(Item.id.in_(item_ids))}
+    customers = {customer_id: {'name': name, 'credit_limit': credit_limit, 'outstanding_balance': balance or 0,
+                               'gst_number': gst_number}
+                 for customer_id, name, credit_limit, balance, gst_number in db.session.query(
+                     Customer.id, Customer.name, Customer.credit_limit, Customer.outstanding_balance,
+                     Customer.gst_number
+                 ).filter(Customer.id.in_(customer_ids))}
+    employees = {row[0] for row in db.session.query(Employee.id)}
+
+    # Stock at each location the batch ships from: warehouse_id -> item_id -> quantity
+    active_warehouses = {option.id for option in reference_data.warehouse_options()}
+    stock = {warehouse_id: warehouses.available(item_ids, warehouse_id)
+             for warehouse_id in {sale['warehouse_id'] for _, sale in parsed} & active_warehouses}
+    pending = pending_order_totals(customers)
+    exposure = {customer_id: customer['outstanding_balance'] + (pending.get(customer_id) or 0)
+                for customer_id, customer in customers.items()}
+    _price_batch([sale for _, sale in parsed if sale['key'] not in posted], items, customers)
+    accepted, repeats = {}, []
+    for index, sale in parsed:
+        key = sale['key']
+        if key in posted:
+            results[index] = {'idempotency_key': key, 'status': 'duplicate', **posted[key]}
+        elif key in accepted:
+            repeats.append((index, key))
+        else:
+            try:
+                _price_sale(sale, items, customers, employees, stock, exposure)
+                accepted[key] = (index, sale)
+            except SaleRejected as e:
+                results[index] = {'idempotency_key': key, 'status': 'rejected', 'error': str(e)}
+
+    if accepted:
+        _insert_sales(list(accepted.values()), results)
+
+    for index, key in repeats:
+        results[index] = dict(results[accepted[key][0]], status='duplicate')
+    return results
+
+def _insert_sales(accepted, results):
+    now = datetime.now()
+    db.session.execute(SalesOrder.__table__.insert(), [{
+        'customer_id': sale['customer_id'],
+        'employee_id': sale['employee_id'],
+        'invoice_number': invoice_number_for(sale['key'], sale['sale_date']),
+        'sale_date': sale['sale_date'],
+        'total_amount': sale['total_amount'],
+        'gst_amount': sale['gst_amount'],
+        'discount': sale['discount'],
+        'status': 'completed',
+        'idempotency_key': sale['key'],
+        'warehouse_id': sale['warehouse_id'],
+        'customer_gstin': sale['customer_gstin'],
+        'place_of_supply': sale['place_of_supply'],
+        'inter_state': sale['inter_state']
+    } for _, sale in accepted])
+
+    order_ids = dict(db.session.query(SalesOrder.idempotency_key, SalesOrder.id)
+                     .filter(SalesOrder.idempotency_key.in_([sale['key'] for _, sale in accepted])))
+
+    db.session.execute(SaleItem.__table__.insert(), [{
+        'sales_order_id': order_ids[sale['key']],
+        'item_id': line['item_id'],
+        'employee_id': line['employee_id'],
+        'quantity': line['quantity'],
+        'unit_price': line['unit_price'],
+        'total_price': line['total_price'],
+        'discount': line['discount'],
+        'gst_rate': line['gst_rate'],
+        'taxable_value': line['taxable_value'],
+        'tax_amount': line['tax_amount']
+    } for _, sale in accepted for line in sale['lines']])
+
+    db.session.execute(SaleTaxLine.__table__.insert(), [
+        dict(tax_line, sales_order_id=order_ids[sale['key']])
+        for _, sale in accepted for tax_line in sale['tax_lines']
+    ])
+
+    db.session.execute(AccountsReceivable.__table__.insert(), [{
+        'sales_order_id': order_ids[sale['key']],
+        'customer_id': sale['customer_id'],
+        'due_date': now + timedelta(days=RECEIVABLE_DAYS),
+        'amount': sale['total_amount'],
+        'status': 'pending'
+    } for _, sale in accepted])
+
+    # Stock is decremented once per item; the guard catches sales posted concurrently
+    sold = {}
+    for _, sale in accepted:
+        for line in sale['lines']:
+            sold[line['item_id']] = sold.get(line['item_id'], 0) + line['quantity']
+    result = db.session.execute(db.text("""
+        UPDATE item SET current_stock = current_stock - :quantity
+        WHERE id = :item_id AND current_stock >= :quantity
+    """), [{'item_id': item_id, 'quantity': quantity} for item_id, quantity in sold.items()])
+    if result.rowcount != len(sold):
+        raise StockConflict('Stock changed while the batch was being posted')
+
+    stock_ledger.record_movements([
+        {'item_id': line['item_id'], 'quantity': -line['quantity'], 'movement_type': 'sale',
+         'reference_type': 'SalesOrder', 'reference_id': order_ids[sale['key']], 'warehouse_id': sale['warehouse_id']}
+        for _, sale in accepted for line in sale['lines']
+    ])
+    # The ledger trigger has just moved the per-location quantities; none may go below zero
+    sold_at = {}
+    for _, sale in accepted:
+        sold_at.setdefault(sale['warehouse_id'], set()).update(line['item_id'] for line in sale['lines'])
+    if any(warehouses.oversold(warehouse_id, item_ids) for warehouse_id, item_ids in sold_at.items()):
+        raise StockConflict('Stock at a location changed while the batch was being posted')
+
+    owed = {}
+    for _, sale in accepted:
+        owed[sale['customer_id']] = owed.get(sale['customer_id'], 0) + sale['total_amount']
+    for customer_id, amount in owed.items():
+        apply_receivable(customer_id, amount)
+
+    sales = SalesOrder.query.options(selectinload(SalesOrder.items)) \
+        .filter(SalesOrder.id.in_(order_ids.values())).order_by(SalesOrder.sale_date, SalesOrder.id).all()
+    inventory_valuation.consume_sales_layers(sales)
+    lots.allocate_sales(sales)
+    sales_analytics.record_sales(sales)
+    stock_alerts.refresh_stock_alerts(sold.keys())
+    stock_alerts.refresh_expiry_alerts(sold.keys())
+    # Core inserts skip the ORM flush hooks, so announce the sales explicitly
+    for sale in sales:
+        queue_event(db.session, 'sale_completed', {
+            'id': sale.id, 'invoice_number': sale.invoice_number, 'customer_id': sale.customer_id,
+            'total_amount': sale.total_amount
+        })
+    db.session.commit()
+
+    for index, sale in accepted:
+        results[index] = {
+            'idempotency_key': sale['key'],
+            'status': 'posted',
+            'sales_order_id': order_ids[sale['key']],
+            'invoice_number': invoice_number_for(sale['key'], sale['sale_date']),
+            'total_amount': sale['total_amount']
+        }
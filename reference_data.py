@@ -0,0 +1,65 @@
+# reference_data.py - Cached dropdown lists and id -> name lookups
+from collections import namedtuple
+from database import db, Item, Supplier, Customer, Employee, Warehouse
+from cache import reference_cache
+
+Option = namedtuple('Option', ['id', 'name'])
+ItemOption = namedtuple('ItemOption', ['id', 'name', 'sku', 'selling_price', 'current_stock'])
+WarehouseOption = namedtuple('WarehouseOption', ['id', 'name', 'code', 'is_default'])
+
+def options_query(model):
+    """id, name of every row by name - the query behind the customer, supplier and employee lists"""
+    return db.session.query(model.id, model.name).order_by(model.name)
+
+def item_options_query():
+    return db.session.query(Item.id, Item.name, Item.sku, Item.selling_price, Item.current_stock).order_by(Item.name)
+
+def _options(model):
+    return [Option(*row) for row in options_query(model)]
+
+@reference_cache.register('customer_options', tables={'customer'})
+def _load_customer_options():
+    return _options(Customer)
+
+@reference_cache.register('supplier_options', tables={'supplier'})
+def _load_supplier_options():
+    return _options(Supplier)
+
+@reference_cache.register('employee_options', tables={'employee'})
+def _load_employee_options():
+    return _options(Employee)
+
+@reference_cache.register('item_options', tables={'item'})
+def _load_item_options():
+    return [ItemOption(*row) for row in item_options_query()]
+
+@reference_cache.register('warehouse_options', tables={'warehouse'})
+def _load_warehouse_options():
+    # Default location first, so it is preselected in forms
+    return [WarehouseOption(*row) for row in db.session.query(
+        Warehouse.id, Warehouse.name, Warehouse.code, Warehouse.is_default)
+        .filter(Warehouse.active == True).order_by(Warehouse.is_default.desc(), Warehouse.name)]  # noqa: E712
+
+def customer_options():
+    return reference_cache.get('customer_options')
+
+def supplier_options():
+    return reference_cache.get('supplier_options')
+
+def employee_options():
+    return reference_cache.get('employee_options')
+
+def item_options():
+    return reference_cache.get('item_options')
+
+def warehouse_options():
+    return reference_cache.get('warehouse_options')
+
+def default_warehouse_id():
+    """Location used when a form, import or API call does not name one"""
+    options = warehouse_options()
+    return options[0].id if options and options[0].is_default else None
+
+def names(options):
+    """id -> name map for rendering related names without a lazy load per row"""
+    return {option.id: option.name for option in options}
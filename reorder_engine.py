@@ -0,0 +1,126 @@
+# reorder_engine.py - Draft purchase orders for items at or below their minimum stock
+import math
+from datetime import datetime, timedelta
+from database import db, Item, PurchaseOrder, PurchaseItem, SalesOrder, SaleItem
+
+OPEN_PO_STATUSES = ('draft', 'pending')
+CHUNK_SIZE = 5000
+
+def _low_stock_filter():
+    # Matches the ix_item_stock_margin expression index
+    return (Item.current_stock - Item.min_stock_level) <= 0
+
+def reorder_quantity(current_stock, min_stock_level, daily_velocity, cover_days):
+    """Order enough to cover `cover_days` of sales on top of the minimum level"""
+    target = max((min_stock_level or 0) * 2, (min_stock_level or 0) + daily_velocity * cover_days)
+    return max(math.ceil(target - (current_stock or 0)), 1)
+
+def on_order_query():
+    """Low-stock items already on an open purchase order, one row per item"""
+    return db.session.query(PurchaseItem.item_id) \
+        .join(PurchaseOrder, PurchaseOrder.id == PurchaseItem.purchase_order_id) \
+        .join(Item, Item.id == PurchaseItem.item_id) \
+        .filter(PurchaseOrder.status.in_(OPEN_PO_STATUSES), _low_stock_filter()) \
+        .distinct()
+
+def units_sold_query(since):
+    """item_id, units sold on completed orders since `since`, for low-stock items"""
+    return db.session.query(SaleItem.item_id, db.func.sum(SaleItem.quantity)) \
+        .join(SalesOrder, SalesOrder.id == SaleItem.sales_order_id) \
+        .join(Item, Item.id == SaleItem.item_id) \
+        .filter(SalesOrder.status == 'completed', SalesOrder.sale_date >= since, _low_stock_filter()) \
+        .group_by(SaleItem.item_id)
+
+def plan_reorders(lookback_days=90, cover_days=30):
+    """Work out reorder lines for all low-stock items, grouped by supplier.
+
+    Returns (plan, skipped) where plan maps supplier_id to a list of line dicts and
+    skipped lists items that have no preferred or previous supplier.
+    """
+    since = datetime.now() - timedelta(days=lookback_days)
+
+    low_items = db.session.query(
+        Item.id, Item.name, Item.current_stock, Item.min_stock_level, Item.cost_price, Item.preferred_supplier_id
+    ).filter(_low_stock_filter()).all()
+    if not low_items:
+        return {}, []
+
+    # Items already on an open purchase order are not ordered again
+    on_order = {row[0] for row in on_order_query()}
+
+    # Units sold per low-stock item over the lookback window
+    sold = dict(units_sold_query(since).all())
+
+    # Supplier of the most recent purchase order, for items without a preferred supplier
+    latest_po = db.session.query(PurchaseItem.item_id, db.func.max(PurchaseItem.purchase_order_id).label('po_id')) \
+        .join(Item, Item.id == PurchaseItem.item_id) \
+        .filter(_low_stock_filter()) \
+        .group_by(PurchaseItem.item_id).subquery()
+    last_supplier = dict(db.session.query(latest_po.c.item_id, PurchaseOrder.supplier_id)
+                         .join(PurchaseOrder, PurchaseOrder.id == latest_po.c.po_id).all())
+
+    plan = {}
+    skipped = []
+    for item_id, name, current_stock, min_stock_level, cost_price, preferred_supplier_id in low_items:
+        if item_id in on_order:
+            continue
+        supplier_id = preferred_supplier_id or last_supplier.get(item_id)
+        if not supplier_id:
+            skipped.append({'id': item_id, 'name': name})
+            continue
+
+        quantity = reorder_quantity(current_stock, min_stock_level, (sold.get(item_id) or 0) / lookback_days, cover_days)
+        plan.setdefault(supplier_id, []).append({
+            'item_id': item_id,
+            'quantity': quantity,
+            'unit_cost': cost_price,
+            'total_cost': quantity * cost_price
+        })
+
+    return plan, skipped
+
+def generate_draft_orders(lookback_days=90, cover_days=30):
+    """Create one draft purchase order per supplier for all low-stock items.
+
+    Returns a summary dict with the created orders, line count and skipped items.
+    """
+    plan, skipped = plan_reorders(lookback_days, cover_days)
+    if not plan:
+        return {'orders': [], 'lines': 0, 'skipped': skipped}
+
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    # A second run within the same second numbers its orders after those already holding the stamp
+    earlier = PurchaseOrder.query.filter(PurchaseOrder.po_number.like(f'PO{stamp}R%')).count()
+    suffix = f'-{earlier}' if earlier else ''
+    orders = {}
+    for supplier_id, lines in plan.items():
+        orders[supplier_id] = PurchaseOrder(
+            supplier_id=supplier_id,
+            po_number=f"PO{stamp}R{supplier_id}{suffix}",
+            status='draft',
+            total_amount=sum(line['total_cost'] for line in lines)
+        )
+    db.session.add_all(orders.values())
+    db.session.flush()
+
+    rows = [dict(line, purchase_order_id=orders[supplier_id].id)
+            for supplier_id, lines in plan.items() for line in lines]
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(PurchaseItem.__table__.insert(), rows[start:start + CHUNK_SIZE])
+
+    db.session.commit()
+    return {
+        'orders': [order.po_number for order in orders.values()],
+        'lines': len(rows),
+        'skipped': skipped
+    }
+
+if __name__ == '__main__':
+    # Run from cron / Task Scheduler for unattended reordering
+    from app import app
+
+    with app.app_context():
+        result = generate_draft_orders()
+        print(f"Created {len(result['orders'])} draft purchase orders with {result['lines']} lines")
+        if result['skipped']:
+            print(f"Skipped {len(result['skipped'])} items without a supplier")
@@ -0,0 +1,190 @@
+# sales_analytics.py - Daily and monthly sales rollups with period comparisons
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import db, Item, Customer, Employee, SalesDailyRollup, SalesMonthlyRollup
+
+MEASURES = ['quantity', 'revenue', 'gst_amount', 'discount', 'line_count']
+
+DIMENSIONS = {
+    'item': ('item_id', Item),
+    'customer': ('customer_id', Customer),
+    'employee': ('employee_id', Employee),
+}
+
+def _sale_rollup_rows(sale):
+    """Split a completed sale into rollup rows from its lines' own tax and discount.
+
+    Sales from before per-item GST have neither; their GST and discount are allocated by line value.
+    """
+    gross = sum(line.total_price for line in sale.items)
+    rows = {}
+    for line in sale.items:
+        share = line.total_price / gross if gross else 0
+        key = (int(line.item_id), int(sale.customer_id), int(line.employee_id))
+        row = rows.setdefault(key, dict.fromkeys(MEASURES, 0))
+        row['quantity'] += line.quantity
+        if line.tax_amount is not None:
+            row['revenue'] += line.taxable_value
+            row['gst_amount'] += line.tax_amount
+            row['discount'] += line.discount or 0
+        else:
+            row['revenue'] += line.total_price - (sale.discount or 0) * share
+            row['gst_amount'] += (sale.gst_amount or 0) * share
+            row['discount'] += (sale.discount or 0) * share
+        row['line_count'] += 1
+    return rows
+
+def _upsert(model, period_column, rows):
+    """rows maps (period, item_id, customer_id, employee_id) to measures; one executemany"""
+    if not rows:
+        return
+    table = model.__table__
+    keys = [period_column, 'item_id', 'customer_id', 'employee_id']
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: table.c[name] + stmt.excluded[name] for name in MEASURES}
+    )
+    db.session.execute(stmt, [dict(zip(keys, key), **measures) for key, measures in rows.items()])
+
+def record_sales(sales):
+    """Add completed sales to the daily and monthly rollups (same transaction as the sales)"""
+    daily, monthly = {}, {}
+    for sale in sales:
+        sale_date = (sale.sale_date or datetime.now()).date()
+        for key, measures in _sale_rollup_rows(sale).items():
+            for rows, period in ((daily, sale_date), (monthly, sale_date.strftime('%Y-%m'))):
+                row = rows.setdefault((period,) + key, dict.fromkeys(MEASURES, 0))
+                for name in MEASURES:
+                    row[name] += measures[name]
+
+    _upsert(SalesDailyRollup, 'sale_date', daily)
+    _upsert(SalesMonthlyRollup, 'month', monthly)
+
+def record_sale(sale):
+    """Add a completed sale to the daily and monthly rollups (same transaction as the sale)"""
+    record_sales([sale])
+
+def rebuild_rollups():
+    """Rebuild both rollup tables from completed sales. Returns the number of daily rows."""
+    db.session.query(SalesMonthlyRollup).delete()
+    db.session.query(SalesDailyRollup).delete()
+
+    db.session.execute(db.text("""
+        INSERT INTO sales_daily_rollup
+            (sale_date, item_id, customer_id, employee_id, quantity, revenue, gst_amount, discount, line_count)
+        SELECT date(so.sale_date), si.item_id, so.customer_id, si.employee_id,
+               SUM(si.quantity),
+               SUM(COALESCE(si.taxable_value, si.total_price - COALESCE(so.discount, 0) * g.share)),
+               SUM(COALESCE(si.tax_amount, COALESCE(so.gst_amount, 0) * g.share)),
+               SUM(COALESCE(si.discount, COALESCE(so.discount, 0) * g.share)),
+               COUNT(*)
+        FROM sale_item si
+        JOIN sales_order so ON so.id = si.sales_order_id
+        JOIN (
+            SELECT s.id AS sale_item_id,
+                   CASE WHEN t.gross > 0 THEN s.total_price / t.gross ELSE 0 END AS share
+            FROM sale_item s
+            JOIN (SELECT sales_order_id, SUM(total_price) AS gross FROM sale_item GROUP BY sales_order_id) t
+              ON t.sales_order_id = s.sales_order_id
+        ) g ON g.sale_item_id = si.id
+        WHERE so.status = 'completed'
+        GROUP BY date(so.sale_date), si.item_id, so.customer_id, si.employee_id
+    """))
+
+    db.session.execute(db.text("""
+        INSERT INTO sales_monthly_rollup
+            (month, item_id, customer_id, employee_id, quantity, revenue, gst_amount, discount, line_count)
+        SELECT strftime('%Y-%m', sale_date), item_id, customer_id, employee_id,
+               SUM(quantity), SUM(revenue), SUM(gst_amount), SUM(discount), SUM(line_count)
+        FROM sales_daily_rollup
+        GROUP BY strftime('%Y-%m', sale_date), item_id, customer_id, employee_id
+    """))
+
+    db.session.commit()
+    return SalesDailyRollup.query.count()
+
+def sales_trend(start, end, granularity='month'):
+    """Sales totals per day, week or month between start and end (inclusive dates).
+
+    Adds period-over-period and, for months, year-over-year revenue change.
+    """
+    # Imported here so the POS and rollup paths don't pay for pandas at startup
+    import numpy as np
+    import pandas as pd
+
+    if granularity == 'month':
+        period = SalesMonthlyRollup.month
+        rows = db.session.query(period, *[db.func.sum(getattr(SalesMonthlyRollup, m)) for m in MEASURES]) \
+            .filter(period >= start.strftime('%Y-%m'), period <= end.strftime('%Y-%m')) \
+            .group_by(period).all()
+    else:
+        period = SalesDailyRollup.sale_date
+        rows = db.session.query(period, *[db.func.sum(getattr(SalesDailyRollup, m)) for m in MEASURES]) \
+            .filter(period >= start, period <= end) \
+            .group_by(period).all()
+
+    df = pd.DataFrame(rows, columns=['period'] + MEASURES)
+    if df.empty:
+        return df
+
+    if granularity == 'month':
+        df['period'] = pd.PeriodIndex(df['period'], freq='M')
+        full_range = pd.period_range(start, end, freq='M')
+    else:
+        df['period'] = pd.to_datetime(df['period'])
+        if granularity == 'week':
+            df['period'] = df['period'].dt.to_period('W').dt.start_time
+            df = df.groupby('period', as_index=False)[MEASURES].sum()
+            full_range = pd.date_range(pd.Timestamp(start).to_period('W').start_time,
+                                       pd.Timestamp(end).to_period('W').start_time, freq='7D')
+        else:
+            full_range = pd.date_range(start, end, freq='D')
+
+    # Fill missing periods with zeros so shifts compare adjacent periods
+    df = df.set_index('period').reindex(full_range, fill_value=0)
+    df.index.name = 'period'
+
+    previous = df['revenue'].shift(1)
+    df['revenue_change_pct'] = np.where(previous > 0, (df['revenue'] - previous) / previous * 100, np.nan)
+    if granularity == 'month':
+        last_year = df['revenue'].shift(12)
+        df['revenue_yoy_pct'] = np.where(last_year > 0, (df['revenue'] - last_year) / last_year * 100, np.nan)
+
+    df = df.reset_index()
+    df['period'] = df['period'].astype(str).str[:10]
+    return df
+
+def period_over_period(start, end, dimension='item', limit=20):
+    """Compare start..end against the preceding window of equal length, per dimension"""
+    import numpy as np
+    import pandas as pd
+
+    column_name, model = DIMENSIONS[dimension]
+    column = getattr(SalesDailyRollup, column_name)
+    days = (end - start).days + 1
+    previous_start = start - timedelta(days=days)
+
+    is_current = SalesDailyRollup.sale_date >= start
+    rows = db.session.query(
+        column,
+        db.func.sum(db.case((is_current, SalesDailyRollup.revenue), else_=0)),
+        db.func.sum(db.case((is_current, 0), else_=SalesDailyRollup.revenue)),
+        db.func.sum(db.case((is_current, SalesDailyRollup.quantity), else_=0)),
+        db.func.sum(db.case((is_current, 0), else_=SalesDailyRollup.quantity)),
+    ).filter(SalesDailyRollup.sale_date >= previous_start, SalesDailyRollup.sale_date <= end) \
+     .group_by(column).all()
+
+    df = pd.DataFrame(rows, columns=['id', 'revenue', 'previous_revenue', 'quantity', 'previous_quantity'])
+    if df.empty:
+        return df
+
+    df['revenue_change'] = df['revenue'] - df['previous_revenue']
+    df['revenue_change_pct'] = np.where(
+        df['previous_revenue'] > 0, df['revenue_change'] / df['previous_revenue'] * 100, np.nan
+    )
+    df = df.reindex(df['revenue_change'].abs().sort_values(ascending=False).index).head(limit)
+
+    names = dict(db.session.query(model.id, model.name).filter(model.id.in_(df['id'].tolist())).all())
+    df.insert(1, 'name', df['id'].map(names).fillna('N/A'))
+    return df
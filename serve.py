@@ -0,0 +1,140 @@
+# serve.py - Production entry point (gunicorn on Linux/macOS, waitress on Windows)
+"""Run the inventory system under a production WSGI server.
+
+    python serve.py                          # auto: gunicorn if available, else waitress
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:8000
+    python serve.py --server waitress --threads 16
+    python serve.py --worker-class gevent --worker-connections 1000
+
+gunicorn runs `workers` processes with `threads` threads each. The app is preloaded in
+the master process, the schema check runs there exactly once before any worker forks, and each
+worker disposes the inherited connection pool so no SQLite handle crosses a fork.
+Send SIGHUP to the master for a graceful reload (new workers start, old ones finish
+their requests). With preloading the application code itself is not re-imported on
+HUP; restart the master after deploying new code.
+
+waitress (Windows, or when gunicorn is missing) is a single process with `threads`
+threads; the schema check runs once before serving.
+
+Startup never seeds data. On a new database run `flask --app app seed-db` once to
+create the admin account (and the sample records); `flask --app app init-db` creates
+only the tables and triggers.
+
+Live updates (/events/stream) keep one response open per browser tab. With the default
+gthread workers and with waitress each open stream occupies a thread, so at most half
+of the threads serve streams and the rest stay free for page requests. For hundreds of
+connected screens use `--worker-class gevent` (gunicorn only, needs gevent installed):
+each worker then serves up to `worker-connections` clients on greenlets, and the
+standard library is monkey-patched before the app is imported so the event queues and
+SQLite calls yield instead of blocking the worker. Events reach clients of other
+workers only when EVENTS_REDIS_URL is set (see events.py).
+
+SQLite allows one writer at a time across all processes. The engine runs in WAL mode
+with a busy timeout (see database.py) so readers never block and writers queue.
+benchmarks/sqlite_load_test.py shows how throughput and lock errors change with the
+number of writer processes.
+"""
+import argparse
+import os
+import sys
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serve the inventory system with a production WSGI server')
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'waitress'], default=os.environ.get('SERVER', 'auto'))
+    parser.add_argument('--bind', default=os.environ.get('BIND', '0.0.0.0:5000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WORKERS', min(os.cpu_count() or 1, 4))))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('THREADS', 4)))
+    parser.add_argument('--worker-class', choices=['gthread', 'gevent'], default=os.environ.get('WORKER_CLASS', 'gthread'))
+    parser.add_argument('--worker-connections', type=int, default=int(os.environ.get('WORKER_CONNECTIONS', 1000)),
+                        help='concurrent clients per gevent worker')
+    parser.add_argument('--keepalive', type=int, default=int(os.environ.get('KEEPALIVE', 5)))
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('TIMEOUT', 60)))
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.environ.get('GRACEFUL_TIMEOUT', 30)))
+    parser.add_argument('--max-requests', type=int, default=int(os.environ.get('MAX_REQUESTS', 2000)),
+                        help='recycle a worker after this many requests (0 disables)')
+    parser.add_argument('--max-requests-jitter', type=int, default=int(os.environ.get('MAX_REQUESTS_JITTER', 200)))
+    return parser.parse_args()
+
+def initialize(max_streams=None):
+    """Create missing tables once, then drop pooled connections before workers start"""
+    from app import app, init_db
+    from database import db
+
+    init_db(seed=False)
+    with app.app_context():
+        # Loaded before the fork, so workers start with the index already in (shared) memory
+        from barcodes import barcode_index
+        barcode_index.load()
+        db.engine.dispose()
+    if max_streams is not None:
+        app.config['EVENTS_MAX_SUBSCRIBERS'] = max_streams
+    return app
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class InventoryApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                'bind': args.bind,
+                'workers': args.workers,
+                'threads': args.threads,
+                'worker_class': args.worker_class,
+                'worker_connections': args.worker_connections,
+                'keepalive': args.keepalive,
+                'timeout': args.timeout,
+                'graceful_timeout': args.graceful_timeout,
+                'max_requests': args.max_requests,
+                'max_requests_jitter': args.max_requests_jitter,
+                'preload_app': True,
+                'post_fork': post_fork,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if args.worker_class == 'gevent':
+                return initialize()
+            return initialize(max_streams=max(1, args.threads // 2))
+
+    InventoryApplication().run()
+
+def post_fork(server, worker):
+    # Each worker opens its own SQLite connections
+    from app import app
+    from database import db
+
+    with app.app_context():
+        db.engine.dispose()
+
+def run_waitress(args):
+    from waitress import serve
+
+    app = initialize(max_streams=max(1, args.threads // 2))
+    host, _, port = args.bind.rpartition(':')
+    print(f"Serving on http://{host or '0.0.0.0'}:{port} with waitress ({args.threads} threads)")
+    serve(app, host=host or '0.0.0.0', port=int(port), threads=args.threads,
+          channel_timeout=args.timeout, connection_limit=max(100, args.threads * 10))
+
+def main():
+    args = parse_args()
+    server = args.server
+    if server == 'auto':
+        server = 'waitress' if sys.platform == 'win32' else 'gunicorn'
+        if server == 'gunicorn':
+            try:
+                import gunicorn  # noqa: F401
+            except ImportError:
+                server = 'waitress'
+
+    if server == 'gunicorn':
+        if args.worker_class == 'gevent':
+            # Patch before the app (and its locks and sockets) is imported by the preload
+            from gevent import monkey
+            monkey.patch_all()
+        run_gunicorn(args)
+    else:
+        run_waitress(args)
+
+if __name__ == '__main__':
+    main()
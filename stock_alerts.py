@@ -0,0 +1,132 @@
+# stock_alerts.py - Set-wise stock alert refresh for bulk operations
+from datetime import datetime, date, timedelta
+from database import db
+
+CHUNK_SIZE = 500
+
+# Alert types by what raises them: stock levels, or lots nearing / past expiry
+STOCK_ALERT_TYPES = ('out_of_stock', 'low_stock')
+EXPIRY_ALERT_TYPES = ('expiring', 'expired')
+EXPIRY_WARNING_DAYS = 30
+
+_REFRESH_SQL = """
+    INSERT INTO stock_alert (item_id, alert_type, message, created_date, resolved)
+    SELECT id,
+           CASE WHEN current_stock <= 0 THEN 'out_of_stock' ELSE 'low_stock' END,
+           CASE WHEN current_stock <= 0
+                THEN 'OUT OF STOCK: ' || name || ' needs immediate restocking'
+                ELSE 'Low stock alert: ' || name || ' has only ' || current_stock || ' units left'
+           END,
+           :now, 0
+    FROM item
+    WHERE current_stock - min_stock_level <= 0 {item_filter}
+"""
+
+# Per-location alerts for item x warehouse rows that have their own reorder level
+_LOCATION_REFRESH_SQL = """
+    INSERT INTO stock_alert (item_id, warehouse_id, alert_type, message, created_date, resolved)
+    SELECT s.item_id, s.warehouse_id,
+           CASE WHEN s.quantity <= 0 THEN 'out_of_stock' ELSE 'low_stock' END,
+           CASE WHEN s.quantity <= 0
+                THEN 'OUT OF STOCK at ' || w.name || ': ' || i.name || ' needs restocking'
+                ELSE 'Low stock at ' || w.name || ': ' || i.name || ' has only ' || s.quantity || ' units left'
+           END,
+           :now, 0
+    FROM item_stock s
+    JOIN item i ON i.id = s.item_id
+    JOIN warehouse w ON w.id = s.warehouse_id
+    WHERE s.min_stock_level IS NOT NULL AND s.quantity <= s.min_stock_level AND w.active = 1 {item_filter}
+"""
+
+def location_shortfalls(item_id):
+    """(warehouse_id, warehouse name, quantity) where an item is at or below its location reorder level"""
+    return db.session.execute(db.text("""
+        SELECT s.warehouse_id, w.name, s.quantity
+        FROM item_stock s
+        JOIN warehouse w ON w.id = s.warehouse_id
+        WHERE s.item_id = :item_id AND s.min_stock_level IS NOT NULL
+          AND s.quantity <= s.min_stock_level AND w.active = 1
+    """), {'item_id': item_id}).all()
+
+def refresh_stock_alerts(item_ids=None):
+    """Recreate unresolved stock alerts for many items at once.
+
+    Same rules as update_stock_alert in app.py, but done with one DELETE and two
+    INSERT ... SELECTs (total stock, then per location) per chunk of items instead of
+    queries per item. Passing no item_ids refreshes every item. The caller commits.
+    """
+    now = datetime.utcnow()
+    if item_ids is None:
+        db.session.execute(db.text("DELETE FROM stock_alert WHERE resolved = 0 "
+                                   "AND alert_type IN ('out_of_stock', 'low_stock')"))
+        db.session.execute(db.text(_REFRESH_SQL.format(item_filter='')), {'now': now})
+        db.session.execute(db.text(_LOCATION_REFRESH_SQL.format(item_filter='')), {'now': now})
+        return
+
+    item_ids = sorted({int(item_id) for item_id in item_ids})
+    delete = db.text("DELETE FROM stock_alert WHERE resolved = 0 AND item_id IN :ids "
+                     "AND alert_type IN ('out_of_stock', 'low_stock')") \
+        .bindparams(db.bindparam('ids', expanding=True))
+    insert = db.text(_REFRESH_SQL.format(item_filter='AND id IN :ids')) \
+        .bindparams(db.bindparam('ids', expanding=True))
+    insert_locations = db.text(_LOCATION_REFRESH_SQL.format(item_filter='AND s.item_id IN :ids')) \
+        .bindparams(db.bindparam('ids', expanding=True))
+    for start in range(0, len(item_ids), CHUNK_SIZE):
+        chunk = item_ids[start:start + CHUNK_SIZE]
+        db.session.execute(delete, {'ids': chunk})
+        db.session.execute(insert, {'ids': chunk, 'now': now})
+        db.session.execute(insert_locations, {'ids': chunk, 'now': now})
+
+# One alert per open lot inside the warning window, unless the same alert for that lot
+# was already resolved: resolving 'expiring' keeps a lot quiet until it has 'expired'
+_EXPIRY_REFRESH_SQL = """
+    INSERT INTO stock_alert (item_id, warehouse_id, lot_id, alert_type, message, created_date, resolved)
+    SELECT l.item_id, l.warehouse_id, l.id, l.alert_type,
+           CASE WHEN l.alert_type = 'expired'
+                THEN 'EXPIRED: ' || i.name || ' lot ' || COALESCE(l.lot_number, '-') || ' expired on '
+                     || l.expiry_date || ', ' || l.remaining_quantity || ' units to write off'
+                ELSE 'Expiring: ' || i.name || ' lot ' || COALESCE(l.lot_number, '-') || ' expires on '
+                     || l.expiry_date || ', ' || l.remaining_quantity || ' units left'
+           END,
+           :now, 0
+    FROM (
+        SELECT id, item_id, warehouse_id, lot_number, expiry_date, remaining_quantity,
+               CASE WHEN expiry_date < :today THEN 'expired' ELSE 'expiring' END AS alert_type
+        FROM stock_lot
+        WHERE remaining_quantity > 0 AND expiry_date <= :horizon {item_filter}
+    ) l
+    JOIN item i ON i.id = l.item_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM stock_alert a
+        WHERE a.lot_id = l.id AND a.alert_type = l.alert_type AND a.resolved = 1
+    )
+"""
+
+def refresh_expiry_alerts(item_ids=None, warning_days=EXPIRY_WARNING_DAYS, today=None):
+    """Recreate unresolved expiring / expired alerts from the open lots.
+
+    Reads only open lots within `warning_days` of expiry through the partial
+    ix_stock_lot_expiry index, however many depleted lots the history holds.
+    Passing no item_ids scans every item. Returns the alerts raised; the caller commits.
+    """
+    today = today or date.today()
+    # expiry_date is stored as ISO text, so compare against ISO text
+    params = {'today': today.isoformat(), 'horizon': (today + timedelta(days=warning_days)).isoformat(),
+              'now': datetime.utcnow()}
+    if item_ids is None:
+        db.session.execute(db.text("DELETE FROM stock_alert WHERE resolved = 0 "
+                                   "AND alert_type IN ('expiring', 'expired')"))
+        return db.session.execute(db.text(_EXPIRY_REFRESH_SQL.format(item_filter='')), params).rowcount
+
+    item_ids = sorted({int(item_id) for item_id in item_ids})
+    delete = db.text("DELETE FROM stock_alert WHERE resolved = 0 AND item_id IN :ids "
+                     "AND alert_type IN ('expiring', 'expired')") \
+        .bindparams(db.bindparam('ids', expanding=True))
+    insert = db.text(_EXPIRY_REFRESH_SQL.format(item_filter='AND item_id IN :ids')) \
+        .bindparams(db.bindparam('ids', expanding=True))
+    raised = 0
+    for start in range(0, len(item_ids), CHUNK_SIZE):
+        chunk = item_ids[start:start + CHUNK_SIZE]
+        db.session.execute(delete, {'ids': chunk})
+        raised += db.session.execute(insert, dict(params, ids=chunk)).rowcount
+    return raised
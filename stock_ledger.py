@@ -0,0 +1,128 @@
+# stock_ledger.py - Append-only stock movement ledger with periodic snapshots
+from datetime import datetime
+from database import db, StockMovement, StockSnapshot
+import reference_data
+
+def record_movement(item_id, quantity, movement_type, reference_type=None, reference_id=None, warehouse_id=None):
+    """Add a ledger entry for a stock change. Committed together with the change itself.
+
+    The entry also moves the quantity at `warehouse_id` (default location when None),
+    see warehouses.py.
+    Entries are stamped in local time, like the report dates and snapshot cut-offs
+    they are compared against.
+    """
+    if not quantity:
+        return
+    db.session.add(StockMovement(
+        item_id=int(item_id),
+        quantity=quantity,
+        movement_type=movement_type,
+        reference_type=reference_type,
+        reference_id=reference_id,
+        warehouse_id=warehouse_id or reference_data.default_warehouse_id(),
+        created_date=datetime.now()
+    ))
+
+def record_movements(rows):
+    """Bulk insert ledger entries given as dicts (item_id, quantity, movement_type, ...)"""
+    now = datetime.now()
+    default_warehouse_id = reference_data.default_warehouse_id()
+    rows = [dict(row, created_date=row.get('created_date') or now,
+                 warehouse_id=row.get('warehouse_id') or default_warehouse_id)
+            for row in rows if row.get('quantity')]
+    if rows:
+        db.session.execute(StockMovement.__table__.insert(), rows)
+
+def _latest_snapshot_date(at=None):
+    query = db.session.query(db.func.max(StockSnapshot.snapshot_date))
+    if at is not None:
+        query = query.filter(StockSnapshot.snapshot_date <= at)
+    return query.scalar()
+
+def _ledger_totals(after=None, until=None, item_id=None):
+    query = db.session.query(StockMovement.item_id, db.func.sum(StockMovement.quantity))
+    if after is not None:
+        query = query.filter(StockMovement.created_date > after)
+    if until is not None:
+        query = query.filter(StockMovement.created_date <= until)
+    if item_id is not None:
+        query = query.filter(StockMovement.item_id == item_id)
+    return dict(query.group_by(StockMovement.item_id).all())
+
+def take_snapshot(at=None):
+    """Snapshot every item's ledger balance, building on the previous snapshot.
+
+    Only movements since the last snapshot are scanned. Returns the row count.
+    """
+    at = at or datetime.now()
+    previous_date = _latest_snapshot_date(at)
+
+    balances = {}
+    if previous_date is not None:
+        balances = dict(db.session.query(StockSnapshot.item_id, StockSnapshot.quantity)
+                        .filter(StockSnapshot.snapshot_date == previous_date).all())
+    for item_id, quantity in _ledger_totals(after=previous_date, until=at).items():
+        balances[item_id] = balances.get(item_id, 0) + quantity
+
+    if balances:
+        db.session.execute(StockSnapshot.__table__.insert(), [
+            {'item_id': item_id, 'snapshot_date': at, 'quantity': quantity}
+            for item_id, quantity in balances.items()
+        ])
+    db.session.commit()
+    return len(balances)
+
+def stock_at(at, item_id=None):
+    """Stock per item at a point in time: nearest snapshot plus the movements after it"""
+    snapshot_date = _latest_snapshot_date(at)
+
+    balances = {}
+    if snapshot_date is not None:
+        query = db.session.query(StockSnapshot.item_id, StockSnapshot.quantity) \
+            .filter(StockSnapshot.snapshot_date == snapshot_date)
+        if item_id is not None:
+            query = query.filter(StockSnapshot.item_id == item_id)
+        balances = dict(query.all())
+    for movement_item_id, quantity in _ledger_totals(after=snapshot_date, until=at, item_id=item_id).items():
+        balances[movement_item_id] = balances.get(movement_item_id, 0) + quantity
+
+    if item_id is not None:
+        return balances.get(item_id, 0)
+    return balances
+
+def check_consistency():
+    """Items whose current_stock differs from the sum of their ledger entries"""
+    rows = db.session.execute(db.text("""
+        SELECT i.id, i.name, i.sku, i.current_stock, COALESCE(m.total, 0) AS ledger
+        FROM item i
+        LEFT JOIN (
+            SELECT item_id, SUM(quantity) AS total FROM stock_movement GROUP BY item_id
+        ) m ON m.item_id = i.id
+        WHERE ABS(COALESCE(i.current_stock, 0) - COALESCE(m.total, 0)) > 0.000001
+    """)).all()
+    return [
+        {'id': row.id, 'name': row.name, 'sku': row.sku, 'current_stock': row.current_stock,
+         'ledger': row.ledger, 'difference': (row.current_stock or 0) - row.ledger}
+        for row in rows
+    ]
+
+def backfill_opening_movements():
+    """Post an opening movement for any stock the ledger does not explain yet"""
+    mismatches = check_consistency()
+    record_movements([
+        {'item_id': row['id'], 'quantity': row['difference'], 'movement_type': 'opening'}
+        for row in mismatches
+    ])
+    db.session.commit()
+    return len(mismatches)
+
+if __name__ == '__main__':
+    # Run periodically (cron / Task Scheduler) to keep stock-at-date queries bounded
+    from app import app
+
+    with app.app_context():
+        count = take_snapshot()
+        print(f"Stock snapshot taken for {count} items")
+        mismatches = check_consistency()
+        if mismatches:
+            print(f"WARNING: {len(mismatches)} items do not match the stock ledger")
@@ -1,9 +1,10 @@
 # tally_integration.py - COMPLETE WORKING VERSION
 import xml.etree.ElementTree as ET
-import requests
 import os
 from datetime import datetime
 from database import db, Item, Supplier, Customer, PurchaseOrder, SalesOrder, TallySyncLog
+import inventory_valuation
+import stock_ledger
 
 class TallyIntegration:
     def __init__(self, tally_url="http://localhost:9000"):
@@ -33,7 +34,7 @@ class TallyIntegration:
         # Add opening balance if needed
         opening_balance = ET.SubElement(stock_item, "OPENINGBALANCE")
         ET.SubElement(opening_balance, "OPBALANCE").text = str(item.current_stock)
-        ET.SubElement(opening_balance, "OPVALUE").text = str(item.current_stock * item.cost_price)
+        ET.SubElement(opening_balance, "OPVALUE").text = str(inventory_valuation.item_stock_value(item))
         
         return ET.tostring(root, encoding='unicode', method='xml')
     
@@ -222,6 +223,7 @@ class TallyIntegration:
     
     def send_to_tally(self, xml_data):
         """Send XML data to Tally"""
+        import requests
         try:
             headers = {'Content-Type': 'application/xml'}
             response = requests.post(self.tally_url, data=xml_data, headers=headers, timeout=30)
@@ -305,6 +307,10 @@ class TallyIntegration:
                     # Update existing item
                     existing_item.name = item_data['name']
                     existing_item.category = item_data['category']
+                    inventory_valuation.adjust_layers(existing_item, item_data['current_stock'] - (existing_item.current_stock or 0),
+                                                      unit_cost=item_data['cost_price'])
+                    stock_ledger.record_movement(existing_item.id, item_data['current_stock'] - (existing_item.current_stock or 0),
+                                                 'tally_import', 'Item', existing_item.id)
                     existing_item.current_stock = item_data['current_stock']
                     existing_item.cost_price = item_data['cost_price']
                     existing_item.selling_price = item_data['selling_price']
@@ -325,6 +331,9 @@ class TallyIntegration:
                         tally_guid=item_data['tally_guid']
                     )
                     db.session.add(new_item)
+                    db.session.flush()
+                    inventory_valuation.adjust_layers(new_item, new_item.current_stock, source='opening')
+                    stock_ledger.record_movement(new_item.id, new_item.current_stock, 'tally_import', 'Item', new_item.id)
                     imported_count += 1
             
             db.session.commit()
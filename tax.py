@@ -0,0 +1,235 @@
+# tax.py - GST by item: HSN codes, rate slabs, the CGST/SGST/IGST split and GSTR-1 summaries
+"""Each item carries an HSN code and a GST rate, Config.GST_PERCENT when it has none.
+
+Discounts come off each line before tax: the line's own discount plus its share of
+the invoice discount, in proportion to the line's value. Tax is then worked out per
+line and rounded to the paisa - CGST and SGST at half the rate each when the buyer is
+in our state, IGST at the full rate when not. The state is the first two digits of
+the buyer's GSTIN against ours; buyers without a GSTIN are taken to buy at our counter.
+
+compute_invoices() prices any number of invoices in one numpy pass over all their
+lines, so a POS batch costs the same few array operations as a single sale. Each
+priced invoice gets its tax lines - totals per HSN code and rate - stored in
+sale_tax_line with the sale; the GSTR-1 summaries read nothing else.
+"""
+import re
+from datetime import timedelta
+from config import Config
+from database import db, SaleTaxLine
+
+# The slabs since the September 2025 rationalisation, plus the 12% and 28% that older
+# items and a few goods still carry
+GST_SLABS = (0, 0.25, 3, 5, 12, 18, 28, 40)
+# Unregistered inter-state invoices above this value are reported one by one (B2CL)
+B2CL_LIMIT = 100000
+GSTIN_PATTERN = re.compile(r'\d{2}[0-9A-Z]{13}')
+HSN_PATTERN = re.compile(r'\d{4}|\d{6}|\d{8}')
+# Amounts tax.py sets on a sale line, in SaleItem column names
+LINE_FIELDS = ('total_price', 'discount', 'gst_rate', 'taxable_value', 'tax_amount')
+
+class TaxError(ValueError):
+    """Invalid tax details on an item, or discounts larger than what they apply to"""
+
+def normalize_gstin(gstin):
+    """The GSTIN upper-cased, or None when it is blank or not in GSTIN form"""
+    gstin = (gstin or '').strip().upper()
+    return gstin if GSTIN_PATTERN.fullmatch(gstin) else None
+
+def company_state():
+    gstin = normalize_gstin(Config.COMPANY_GSTIN)
+    return gstin[:2] if gstin else (Config.COMPANY_STATE_CODE or None)
+
+def place_of_supply(customer_gstin):
+    """(state code, inter_state) for a sale to a buyer with this GSTIN (or none)"""
+    ours = company_state()
+    gstin = normalize_gstin(customer_gstin)
+    state = gstin[:2] if gstin else ours
+    return state, bool(state and ours and state != ours)
+
+def item_tax(hsn_code, gst_rate):
+    """Validated (hsn_code, gst_rate) from form input; blanks become None"""
+    hsn_code = (hsn_code or '').strip() or None
+    if hsn_code and not HSN_PATTERN.fullmatch(hsn_code):
+        raise TaxError(f'HSN code {hsn_code} must be 4, 6 or 8 digits')
+    if gst_rate is None or str(gst_rate).strip() == '':
+        return hsn_code, None
+    gst_rate = float(gst_rate)
+    if gst_rate not in GST_SLABS:
+        raise TaxError(f"GST rate {gst_rate:g}% is not a GST slab ({', '.join(f'{rate:g}' for rate in GST_SLABS)})")
+    return hsn_code, gst_rate
+
+def compute_invoices(invoices):
+    """Price invoices in one vectorized pass over all their lines.
+
+    An invoice is a dict with 'lines', the invoice-level 'discount' and 'inter_state';
+    a line has 'quantity', 'unit_price', 'gst_rate' (None for the default), 'hsn_code'
+    and optionally its own 'discount'. Sets on every line total_price, discount (its
+    own plus its share), taxable_value, gst_rate, cgst/sgst/igst_amount and tax_amount;
+    on every invoice subtotal, discount (now all discounts), taxable_value, gst_amount,
+    total_amount, tax_lines, and error - a message when the discounts are invalid,
+    which the caller must check. Returns the invoices.
+    """
+    # Imported here so only pricing pays for numpy, not every process that imports tax
+    import numpy as np
+
+    def paise(values):
+        # Half up, as invoices round; np.round rounds half to even. The nudge absorbs float error.
+        return np.sign(values) * np.floor(np.abs(values) * 100 + 0.5 + 1e-6) / 100
+
+    count = len(invoices)
+    lines = [line for invoice in invoices for line in invoice['lines']]
+    owner = np.repeat(np.arange(count), [len(invoice['lines']) for invoice in invoices])
+    quantity = np.array([line['quantity'] for line in lines], dtype=float)
+    unit_price = np.array([line['unit_price'] for line in lines], dtype=float)
+    own_discount = np.array([line.get('discount') or 0 for line in lines], dtype=float)
+    rate = np.array([Config.GST_PERCENT if line.get('gst_rate') is None else line['gst_rate'] for line in lines],
+                    dtype=float)
+    inter_state = np.array([bool(invoice.get('inter_state')) for invoice in invoices], dtype=bool)[owner]
+    invoice_discount = np.array([invoice.get('discount') or 0 for invoice in invoices], dtype=float)
+
+    gross = paise(quantity * unit_price)
+    net = gross - own_discount
+    invoice_net = np.bincount(owner, weights=net, minlength=count)
+    share = np.divide(net, invoice_net[owner], out=np.zeros_like(net), where=invoice_net[owner] > 0)
+    allocated = paise(invoice_discount[owner] * share)
+    # Rounding leftovers go to each invoice's largest line, so the shares add up to the discount
+    order = np.lexsort((-net, owner))
+    largest = order[np.diff(owner[order], prepend=-1) != 0]
+    leftover = invoice_discount - np.bincount(owner, weights=allocated, minlength=count)
+    allocated[largest] += leftover[owner[largest]]
+
+    taxable = paise(net - allocated)
+    half = paise(taxable * rate / 200)
+    igst = np.where(inter_state, paise(taxable * rate / 100), 0.0)
+    cgst = np.where(inter_state, 0.0, half)
+    tax = cgst * 2 + igst
+
+    bad_line = (own_discount < 0) | (own_discount > gross + 0.005)
+    bad_lines = np.bincount(owner, weights=bad_line, minlength=count) > 0
+    bad_discount = (invoice_discount < 0) | (invoice_discount > invoice_net + 0.005)
+    totals = [paise(np.bincount(owner, weights=values, minlength=count)).tolist()
+              for values in (gross, own_discount + allocated, taxable, tax)]
+
+    for line, values in zip(lines, zip(gross.tolist(), paise(own_discount + allocated).tolist(), taxable.tolist(),
+                                       rate.tolist(), cgst.tolist(), igst.tolist(), tax.tolist())):
+        line.update(zip(('total_price', 'discount', 'taxable_value', 'gst_rate', 'cgst_amount', 'igst_amount',
+                         'tax_amount'), values))
+        line['sgst_amount'] = line['cgst_amount']
+    for index, invoice in enumerate(invoices):
+        subtotal, discount, taxable_value, gst_amount = (column[index] for column in totals)
+        invoice.update(subtotal=subtotal, discount=discount, taxable_value=taxable_value, gst_amount=gst_amount,
+                       total_amount=round(taxable_value + gst_amount, 2), tax_lines=_tax_lines(invoice['lines']),
+                       error=('A line discount is negative or larger than the line' if bad_lines[index]
+                              else 'Discount cannot be negative or larger than the sale' if bad_discount[index]
+                              else None))
+    return invoices
+
+def _tax_lines(lines):
+    """An invoice's lines added up per HSN code and rate"""
+    groups = {}
+    for line in lines:
+        group = groups.setdefault((line.get('hsn_code'), line['gst_rate']), {
+            'hsn_code': line.get('hsn_code'), 'gst_rate': line['gst_rate'], 'quantity': 0, 'taxable_value': 0,
+            'cgst_amount': 0, 'sgst_amount': 0, 'igst_amount': 0})
+        for name in ('quantity', 'taxable_value', 'cgst_amount', 'sgst_amount', 'igst_amount'):
+            group[name] += line[name]
+    return [dict(group, **{name: round(group[name], 2) for name in
+                           ('taxable_value', 'cgst_amount', 'sgst_amount', 'igst_amount')})
+            for group in groups.values()]
+
+def price_sale(sale, customer, line_discounts=()):
+    """Price a SalesOrder from its lines and its invoice-level sale.discount.
+
+    `line_discounts` are the lines' own discounts, in sale.items order. Sets the lines'
+    amounts, the order's totals and place of supply, and replaces its tax lines.
+    Raises TaxError for invalid discounts. The caller commits.
+    """
+    state, inter_state = place_of_supply(customer.gst_number if customer else None)
+    line_discounts = list(line_discounts) + [0] * (len(sale.items) - len(line_discounts))
+    invoice = {'discount': sale.discount or 0, 'inter_state': inter_state, 'lines': [{
+        'quantity': line.quantity, 'unit_price': line.unit_price, 'discount': discount,
+        'gst_rate': line.item.gst_rate, 'hsn_code': line.item.hsn_code,
+    } for line, discount in zip(sale.items, line_discounts)]}
+    compute_invoices([invoice])
+    if invoice['error']:
+        raise TaxError(invoice['error'])
+
+    for line, priced in zip(sale.items, invoice['lines']):
+        for name in LINE_FIELDS:
+            setattr(line, name, priced[name])
+    sale.discount = invoice['discount']
+    sale.gst_amount = invoice['gst_amount']
+    sale.total_amount = invoice['total_amount']
+    sale.customer_gstin = normalize_gstin(customer.gst_number if customer else None)
+    sale.place_of_supply, sale.inter_state = state, inter_state
+    sale.tax_lines = [SaleTaxLine(**tax_line) for tax_line in invoice['tax_lines']]
+    return sale
+
+# GSTR-1 tables, all from sale_tax_line. B2B: registered buyers, per invoice and rate.
+# B2CL: unregistered inter-state invoices above B2CL_LIMIT, likewise. B2CS: all other
+# unregistered sales per place of supply and rate. HSN: per code and rate, B2B and B2C apart.
+_PERIOD = "so.status = 'completed' AND so.sale_date >= :start AND so.sale_date < :end"
+_LARGE_INTER_STATE = "(COALESCE(so.inter_state, 0) = 1 AND so.total_amount > :b2cl_limit)"
+_TAX_SUMS = """SUM(t.taxable_value) AS taxable_value, SUM(t.igst_amount) AS igst_amount,
+               SUM(t.cgst_amount) AS cgst_amount, SUM(t.sgst_amount) AS sgst_amount"""
+
+_INVOICE_RATES_SQL = f"""
+    SELECT so.invoice_number, date(so.sale_date) AS invoice_date, so.customer_gstin, c.name AS customer_name,
+           so.place_of_supply, so.total_amount AS invoice_value, t.gst_rate, {_TAX_SUMS}
+    FROM sales_order so
+    JOIN sale_tax_line t ON t.sales_order_id = so.id
+    LEFT JOIN customer c ON c.id = so.customer_id
+    WHERE {_PERIOD} AND (so.customer_gstin IS NOT NULL OR {_LARGE_INTER_STATE})
+    GROUP BY so.id, t.gst_rate
+    ORDER BY so.sale_date, so.id, t.gst_rate
+"""
+
+_B2CS_SQL = f"""
+    SELECT so.place_of_supply, COALESCE(so.inter_state, 0) AS inter_state, t.gst_rate, {_TAX_SUMS}
+    FROM sales_order so
+    JOIN sale_tax_line t ON t.sales_order_id = so.id
+    WHERE {_PERIOD} AND so.customer_gstin IS NULL AND NOT {_LARGE_INTER_STATE}
+    GROUP BY so.place_of_supply, COALESCE(so.inter_state, 0), t.gst_rate
+    ORDER BY so.place_of_supply, t.gst_rate
+"""
+
+_HSN_SQL = f"""
+    SELECT CASE WHEN so.customer_gstin IS NULL THEN 'B2C' ELSE 'B2B' END AS supply, t.hsn_code, t.gst_rate,
+           SUM(t.quantity) AS quantity, {_TAX_SUMS}
+    FROM sales_order so
+    JOIN sale_tax_line t ON t.sales_order_id = so.id
+    WHERE {_PERIOD}
+    GROUP BY 1, t.hsn_code, t.gst_rate
+    ORDER BY 1, t.hsn_code, t.gst_rate
+"""
+
+GSTR1_SECTIONS = ('b2b', 'b2cl', 'b2cs', 'hsn')
+TAX_COLUMNS = ('taxable_value', 'igst_amount', 'cgst_amount', 'sgst_amount')
+
+def _rows(sql, params):
+    rows = []
+    for row in db.session.execute(db.text(sql), params):
+        row = dict(row._mapping)
+        for name in TAX_COLUMNS + ('invoice_value', 'quantity'):
+            if row.get(name) is not None:
+                row[name] = round(row[name], 2)
+        row['total_tax'] = round(row['igst_amount'] + row['cgst_amount'] + row['sgst_amount'], 2)
+        rows.append(row)
+    return rows
+
+def gstr1_summary(start, end):
+    """GSTR-1 tables for completed sales dated start to end (inclusive dates).
+
+    Returns {'b2b': [...], 'b2cl': [...], 'b2cs': [...], 'hsn': [...], 'totals': {...}},
+    where totals holds the tax columns per section.
+    """
+    params = {'start': start.isoformat(), 'end': (end + timedelta(days=1)).isoformat(), 'b2cl_limit': B2CL_LIMIT}
+    summary = {'b2b': [], 'b2cl': []}
+    for row in _rows(_INVOICE_RATES_SQL, params):
+        summary['b2b' if row['customer_gstin'] else 'b2cl'].append(row)
+    summary['b2cs'] = _rows(_B2CS_SQL, params)
+    summary['hsn'] = _rows(_HSN_SQL, params)
+    summary['totals'] = {section: {name: round(sum(row[name] for row in summary[section]), 2)
+                                   for name in TAX_COLUMNS + ('total_tax',)}
+                         for section in GSTR1_SECTIONS}
+    return summary
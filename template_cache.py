@@ -0,0 +1,89 @@
+# template_cache.py - Jinja fragment cache keyed by table data versions
+import time
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from cache import LRUCache, RedisCache
+from data_versions import make_etag, request_versions
+
+class FragmentCache:
+    """Rendered template fragments, keyed by name, the versions of the tables they
+    depend on and any extra vary values. A write to one of the tables changes its
+    data_version counter, so stale fragments are never served; old entries simply
+    age out of the LRU.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LRUCache(maxsize=128, ttl=3600)
+        self._stats = {}
+
+    def init_app(self, app):
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        redis_url = app.config.get('CACHE_REDIS_URL')
+        if redis_url:
+            try:
+                self.backend = RedisCache(redis_url, ttl=3600, prefix='inventory:fragment:')
+            except ImportError:
+                pass
+
+    def load_versions(self):
+        """All table versions for this request, read once.
+
+        Routes that query fragment data eagerly should call this before querying, so a
+        write landing in between cannot be cached under the newer version.
+        """
+        return request_versions()
+
+    def render(self, name, tables, vary, caller):
+        versions = self.load_versions()
+        key = make_etag(name, [(table, versions.get(table, 0)) for table in tables], vary)
+        stats = self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'render_ms': 0.0, 'errors': 0})
+
+        try:
+            found, html = self.backend.get(key)
+        except Exception:
+            stats['errors'] += 1
+            found, html = False, None
+        if found:
+            stats['hits'] += 1
+            return Markup(html)
+
+        started = time.perf_counter()
+        html = caller()
+        stats['render_ms'] += (time.perf_counter() - started) * 1000
+        stats['misses'] += 1
+        try:
+            self.backend.set(key, str(html))
+        except Exception:
+            stats['errors'] += 1
+        return Markup(html)
+
+    def metrics(self):
+        fragments = {}
+        for name, stats in self._stats.items():
+            lookups = stats['hits'] + stats['misses']
+            fragments[name] = dict(
+                stats,
+                render_ms=round(stats['render_ms'], 2),
+                avg_render_ms=round(stats['render_ms'] / stats['misses'], 2) if stats['misses'] else None,
+                hit_rate=round(stats['hits'] / lookups, 3) if lookups else None
+            )
+        return {'backend': type(self.backend).__name__, 'size': len(self.backend), 'fragments': fragments}
+
+fragment_cache = FragmentCache()
+
+class FragmentCacheExtension(Extension):
+    """{% cache_fragment 'name', ['table', ...] [, vary...] %} ... {% endcache_fragment %}"""
+    tags = {'cache_fragment'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache_fragment'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        name, tables, *vary = args
+        return fragment_cache.render(name, tables, vary, caller)
@@ -0,0 +1,46 @@
+# tests/conftest.py - A throwaway SQLite database per test, created the way a fresh install is
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Before app is imported: the engine binds to DATABASE_URL once
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='inventory-tests-'), 'test.db')}"
+
+@pytest.fixture
+def app():
+    import app as app_module
+    from cache import reference_cache
+    from database import db
+    flask_app = app_module.app
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.session.execute(db.text('DROP TABLE IF EXISTS schema_migrations'))
+        db.session.commit()
+        reference_cache.clear()
+        app_module.login_throttle.init_app(flask_app)  # fresh rate limits for each test's logins
+        app_module.create_schema()
+        app_module.seed_database()
+        yield flask_app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
+
+@pytest.fixture
+def ahead_of_utc(monkeypatch):
+    """A local clock well ahead of UTC, where utcnow() and now() fall on different days in the morning"""
+    monkeypatch.setenv('TZ', 'Asia/Kolkata')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
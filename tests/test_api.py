@@ -0,0 +1,8 @@
+# tests/test_api.py - REST API request validation
+import pytest
+
+@pytest.mark.parametrize('body', ['[1, 2]', '"sales"', '42', 'null', '{"sales": {}}', 'not json'])
+def test_sales_batch_rejects_bodies_that_are_not_an_object_with_sales(client, body):
+    response = client.post('/api/v1/sales/batch', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert 'sales' in response.get_json()['error']
@@ -0,0 +1,21 @@
+# tests/test_commissions.py - Task completion dates and monthly productivity
+from datetime import datetime, timedelta
+
+import commissions
+from database import db, Employee, EmployeePerformance, WorkerTask
+
+def test_completing_a_task_stamps_local_time(app, client, ahead_of_utc):
+    employee = Employee.query.first()
+    task = WorkerTask(employee_id=employee.id, task_type='count', due_date=datetime.now() + timedelta(days=1))
+    db.session.add(task)
+    db.session.commit()
+
+    client.get(f'/update_task_status/{task.id}/completed')
+    db.session.refresh(task)
+    assert abs(task.completed_date - datetime.now()) < timedelta(minutes=1)
+
+    month = datetime.now().strftime('%Y-%m')
+    commissions.refresh_months([month])
+    row = EmployeePerformance.query.filter_by(month=month, employee_id=employee.id).one()
+    assert (row.tasks_completed, row.tasks_late) == (1, 0)
+    assert abs(row.computed_at - datetime.now()) < timedelta(minutes=1)
@@ -0,0 +1,43 @@
+# tests/test_credit_control.py - Credit limits against completed and pending sales
+import pytest
+
+from credit_control import check_credit_limit
+from database import db, Customer, Employee, Item, SalesOrder
+
+def _create_sale(client, customer, employee, item, quantity):
+    return client.post('/create_sale', data={
+        'customer_id': customer.id, 'employee_id': employee.id, 'discount': 0,
+        'item_id[]': [item.id], 'quantity[]': [quantity], 'assigned_employee[]': [employee.id],
+    })
+
+def test_pending_orders_count_against_the_credit_limit(app, client):
+    customer, employee = Customer.query.first(), Employee.query.first()
+    item = Item.query.filter_by(sku='MOU001').first()
+    _create_sale(client, customer, employee, item, 1)
+    first = SalesOrder.query.filter_by(customer_id=customer.id, status='pending').one()
+    customer.credit_limit = (customer.outstanding_balance or 0) + first.total_amount * 1.5
+    db.session.commit()
+
+    # Either order fits on its own; together they would take the exposure past the limit
+    allowed, available = check_credit_limit(customer, first.total_amount, exclude_order_id=first.id)
+    assert allowed and available == pytest.approx(first.total_amount * 1.5)
+    allowed, available = check_credit_limit(customer, first.total_amount)
+    assert not allowed and available == pytest.approx(first.total_amount * 0.5)
+
+    _create_sale(client, customer, employee, item, 1)
+    assert SalesOrder.query.filter_by(customer_id=customer.id, status='pending').count() == 1
+
+def test_pos_batch_counts_pending_orders_like_create_sale(app, client):
+    customer, employee = Customer.query.first(), Employee.query.first()
+    item = Item.query.filter_by(sku='MOU001').first()
+    _create_sale(client, customer, employee, item, 1)
+    pending = SalesOrder.query.filter_by(customer_id=customer.id, status='pending').one().total_amount
+    customer.credit_limit = (customer.outstanding_balance or 0) + pending * 1.5
+    db.session.commit()
+
+    response = client.post('/api/v1/sales/batch', json={'sales': [{
+        'idempotency_key': 'pos-credit-1', 'customer_id': customer.id, 'employee_id': employee.id,
+        'items': [{'item_id': item.id, 'quantity': 1}],
+    }]})
+    result = response.get_json()['results'][0]
+    assert result['status'] == 'rejected' and 'Credit limit exceeded' in result['error']
@@ -0,0 +1,26 @@
+# tests/test_demand_forecast.py - Forecast minimum stock levels and the alerts they raise
+from datetime import datetime, timedelta
+
+import pytest
+
+import demand_forecast
+from database import db, Customer, Employee, Item, SaleItem, SalesOrder, StockAlert
+
+def test_forecast_levels_refresh_stock_alerts(app):
+    item = Item.query.filter_by(sku='LAP001').first()
+    employee = Employee.query.first()
+    sale = SalesOrder(customer_id=Customer.query.first().id, employee_id=employee.id, invoice_number='T-FC-1',
+                      status='completed', sale_date=datetime.now() - timedelta(days=1), total_amount=0)
+    sale.items.append(SaleItem(item_id=item.id, employee_id=employee.id, quantity=50, unit_price=0, total_price=0))
+    db.session.add(sale)
+    db.session.commit()
+    assert not StockAlert.query.filter_by(item_id=item.id, resolved=False).count()
+
+    assert demand_forecast.apply_forecast() == 1
+    db.session.refresh(item)
+    assert item.min_stock_level > item.current_stock
+    assert StockAlert.query.filter_by(item_id=item.id, alert_type='low_stock', resolved=False).count() == 1
+
+def test_unknown_forecast_method_is_rejected(app):
+    with pytest.raises(ValueError):
+        demand_forecast.apply_forecast(method='arima')
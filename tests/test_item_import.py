@@ -0,0 +1,45 @@
+# tests/test_item_import.py - CSV item import through the staging table
+import item_import
+from database import db, CostLayer, Item, ItemImportBatch, StockMovement, User
+
+CSV = """sku,name,stock,cost,price
+NEW001,Desk Lamp,12,300,550
+MOU001,,60,,
+NEW002,Desk Fan,4,900,1400
+"""
+
+def _run(app, tmp_path):
+    path = tmp_path / 'items.csv'
+    path.write_text(CSV, encoding='utf-8')
+    batch = ItemImportBatch(filename='items.csv', user_id=User.query.first().id)
+    db.session.add(batch)
+    db.session.commit()
+    item_import.run_import(app, batch.id, str(path))
+    db.session.expire_all()
+    return db.session.get(ItemImportBatch, batch.id)
+
+def _movement_type(sku):
+    item = Item.query.filter_by(sku=sku).one()
+    return StockMovement.query.filter_by(item_id=item.id, reference_type='ItemImportBatch').one().movement_type
+
+def test_import_posts_opening_stock_and_adjustments(app, tmp_path):
+    batch = _run(app, tmp_path)
+    assert batch.status == 'completed' and (batch.created_count, batch.updated_count) == (2, 1)
+    assert (_movement_type('NEW001'), _movement_type('MOU001')) == ('opening', 'adjustment')
+    lamp = Item.query.filter_by(sku='NEW001').one()
+    assert [layer.source for layer in CostLayer.query.filter_by(item_id=lamp.id)] == ['opening']
+
+def test_failed_chunk_reports_what_was_imported(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(item_import, 'UPSERT_CHUNK', 1)
+    upsert_chunk = item_import._upsert_chunk
+
+    def fail_on_third_row(batch, rows, touched):
+        if rows[0]['row_number'] == 4:
+            raise RuntimeError('disk I/O error')
+        upsert_chunk(batch, rows, touched)
+
+    monkeypatch.setattr(item_import, '_upsert_chunk', fail_on_third_row)
+    batch = _run(app, tmp_path)
+    assert batch.status == 'failed' and batch.processed_rows == 2
+    assert 'file row 4' in batch.message and 'disk I/O error' in batch.message
+    assert Item.query.filter_by(sku='NEW001').count() == 1 and Item.query.filter_by(sku='NEW002').count() == 0
@@ -0,0 +1,13 @@
+# tests/test_items.py - Deleting items along with their stock history
+from database import db, CostLayer, Item, ItemStock, StockMovement
+
+def test_deleting_an_unsold_item_removes_its_history(app, client):
+    item = Item.query.filter_by(sku='MON001').first()
+    item_id = item.id
+    assert StockMovement.query.filter_by(item_id=item_id).count() and CostLayer.query.filter_by(item_id=item_id).count()
+
+    client.get(f'/delete_item/{item_id}')
+    db.session.expire_all()
+    assert db.session.get(Item, item_id) is None
+    for model in (StockMovement, CostLayer, ItemStock):
+        assert model.query.filter_by(item_id=item_id).count() == 0
@@ -0,0 +1,39 @@
+# tests/test_lots.py - FEFO picking with expired lots on hand
+from datetime import date, datetime, timedelta
+
+import lots
+import reference_data
+from database import db, Customer, Employee, Item, SaleItem, SalesOrder, StockLot
+
+def _lot(item, quantity, expiry_date, lot_number):
+    lot = StockLot(item_id=item.id, warehouse_id=reference_data.default_warehouse_id(), lot_number=lot_number,
+                   expiry_date=expiry_date, received_date=datetime.now() - timedelta(days=30),
+                   quantity=quantity, remaining_quantity=quantity)
+    db.session.add(lot)
+    return lot
+
+def _sale(item, quantity, invoice_number):
+    employee = Employee.query.first()
+    sale = SalesOrder(customer_id=Customer.query.first().id, employee_id=employee.id, invoice_number=invoice_number,
+                      status='completed', sale_date=datetime.now(), total_amount=quantity)
+    sale.items.append(SaleItem(item_id=item.id, employee_id=employee.id, quantity=quantity, unit_price=1,
+                               total_price=quantity))
+    db.session.add(sale)
+    db.session.flush()
+    return sale
+
+def test_selling_through_draws_expired_lots_last(app):
+    item = Item.query.first()
+    expired = _lot(item, 4, date.today() - timedelta(days=1), 'OLD')
+    undated = _lot(item, 2, None, 'NODATE')
+    good = _lot(item, 3, date.today() + timedelta(days=30), 'GOOD')
+    db.session.flush()
+
+    assert lots.allocate_sale(_sale(item, 4, 'T-LOT-1')) == 0
+    assert (good.remaining_quantity, undated.remaining_quantity, expired.remaining_quantity) == (0, 1, 4)
+
+    # Past every good lot the stock sold can only be the expired lot's
+    assert lots.allocate_sale(_sale(item, 4, 'T-LOT-2')) == 0
+    assert (undated.remaining_quantity, expired.remaining_quantity) == (0, 1)
+    assert lots.allocate_sale(_sale(item, 3, 'T-LOT-3')) == 2
+    assert expired.remaining_quantity == 0
@@ -0,0 +1,56 @@
+# tests/test_migrations.py - Upgrading a database from before versioned migrations
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+PRE_SERIES_DB = os.path.join(ROOT, 'instance', 'inventory.db')
+
+@pytest.fixture
+def migrated(tmp_path):
+    """A copy of the repo's pre-series database (baseline schema, with data) after `python -m migrations`"""
+    if not os.path.exists(PRE_SERIES_DB):
+        pytest.skip('no pre-series database to migrate')
+    path = str(tmp_path / 'inventory.db')
+    shutil.copy(PRE_SERIES_DB, path)
+    result = subprocess.run([sys.executable, '-m', 'migrations', '--database', path, '--no-backup'],
+                            cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+def test_upgrade_applies_every_migration(migrated):
+    from migrations import discover
+    applied = {row[0] for row in migrated.execute('SELECT version FROM schema_migrations')}
+    assert applied == {migration.version for migration in discover()}
+
+def test_upgrade_keeps_data_and_installs_version_triggers(migrated):
+    items = migrated.execute('SELECT id, name, version FROM item ORDER BY id').fetchall()
+    assert len(items) == 4 and all(version == 1 for _, _, version in items)
+    before = migrated.execute("SELECT version FROM data_version WHERE table_name = 'item'").fetchone()[0]
+    migrated.execute('UPDATE item SET min_stock_level = min_stock_level + 1 WHERE id = ?', (items[0][0],))
+    assert migrated.execute('SELECT version FROM item WHERE id = ?', (items[0][0],)).fetchone()[0] == 2
+    assert migrated.execute("SELECT version FROM data_version WHERE table_name = 'item'").fetchone()[0] == before + 1
+
+def test_backfill_after_upgrade_keeps_located_stock_equal_to_current_stock(migrated, tmp_path):
+    path = migrated.execute('PRAGMA database_list').fetchone()[2]
+    backfill = ("from app import app; import stock_ledger\n"
+                "with app.app_context(): print(stock_ledger.backfill_opening_movements())")
+    result = subprocess.run([sys.executable, '-c', backfill], cwd=ROOT, capture_output=True, text=True,
+                            env=dict(os.environ, DATABASE_URL=f'sqlite:///{path}'))
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert result.stdout.split()[-1] == '0'  # the upgrade already posted the opening movements
+    rows = migrated.execute("""
+        SELECT i.current_stock, COALESCE(SUM(s.quantity), 0), COALESCE(m.total, 0)
+        FROM item i
+        LEFT JOIN item_stock s ON s.item_id = i.id
+        LEFT JOIN (SELECT item_id, SUM(quantity) AS total FROM stock_movement GROUP BY item_id) m ON m.item_id = i.id
+        GROUP BY i.id
+    """).fetchall()
+    assert rows and all(current == located == ledger for current, located, ledger in rows)
@@ -0,0 +1,15 @@
+# tests/test_passwords.py - Password changes go through the login throttle
+def _change(client, current, new='n3w-secret'):
+    return client.post('/change_password', data={'current_password': current, 'new_password': new,
+                                                 'confirm_password': new})
+
+def test_change_password_is_rate_limited_like_login(app, client):
+    statuses = [_change(client, f'guess-{attempt}').status_code for attempt in range(6)]
+    assert statuses[:5] == [200] * 5 and statuses[5] == 429
+    # Refused before the hash is checked, even with the right password
+    assert _change(client, 'admin123').status_code == 429
+
+def test_change_password_with_the_current_password(app, client):
+    assert _change(client, 'admin123').status_code == 302
+    client.get('/logout')
+    assert client.post('/login', data={'username': 'admin', 'password': 'n3w-secret'}).status_code == 302
@@ -0,0 +1,205 @@
+# tests/test_query_plans.py - EXPLAIN QUERY PLAN checks for the hot queries
+"""SQLite is asked how it would run each hot query against the migrated schema.
+
+A query fails when its plan contains a full table scan ("SCAN <table>" without an
+index) or, for queries marked ordered, a temporary B-tree for ORDER BY - both mean
+the query's cost grows with the table instead of the result. Plans that read a whole
+index ("SCAN ... USING COVERING INDEX") are fine for the dropdown queries, which
+return every row anyway.
+
+Service-module queries come from the modules' own query builders and SQL constants,
+so a changed query is checked as it now runs. The view queries are written inline in
+app.py and are mirrored here; when one of those changes, change it here too.
+"""
+import re
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import barcodes
+import commissions
+import credit_control
+import lots
+import reference_data
+import reorder_engine
+import stock_alerts
+import tax
+import warehouses
+import database as m
+from app import app as flask_app, create_schema
+from database import db
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+SORT = re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY')
+# Queries whose plan must use one particular index, not merely avoid a full scan
+EXPECTED_INDEXES = {
+    # Partial index on open lots; the FEFO order comes from lots._fefo_key, not the index
+    'lots.fefo_pick': 'ix_stock_lot_item_expiry',
+}
+# Tables (as named in the plan, i.e. by alias) a query reads in full by design
+ALLOWED_SCANS = {
+    # One performance row per employee, including those with no sales or tasks that month
+    'performance.refresh': {'e'},
+}
+
+def _sql(sql, **params):
+    """A raw SQL constant with its parameters bound; lists bind as expanding IN params"""
+    return db.text(sql).bindparams(*[db.bindparam(name, value, expanding=isinstance(value, list))
+                                     for name, value in params.items()])
+
+def hot_queries():
+    """(name, statement, ordered) for each hot query; needs an app context for the builders"""
+    now = datetime.now()
+    today = date.today()
+    months = ['2026-01', '2026-02']
+    start, end = commissions.month_bounds('2026-01')
+    return [
+        # Dashboard and reports (app.py views)
+        ('dashboard.low_stock', db.select(db.func.count()).select_from(m.StockAlert)
+            .where(m.StockAlert.resolved == False), False),  # noqa: E712
+        ('dashboard.total_payable', db.select(db.func.sum(m.AccountsPayable.amount))
+            .where(m.AccountsPayable.status == 'pending'), False),
+        ('dashboard.total_receivable', db.select(db.func.sum(m.AccountsReceivable.amount))
+            .where(m.AccountsReceivable.status == 'pending'), False),
+        ('dashboard.pending_task_count', db.select(db.func.count()).select_from(m.WorkerTask)
+            .where(m.WorkerTask.status == 'pending'), False),
+        ('dashboard.sales_today', db.select(db.func.sum(m.SalesOrder.total_amount))
+            .where(m.SalesOrder.sale_date >= now, m.SalesOrder.sale_date < now + timedelta(days=1)), False),
+        ('dashboard.recent_alerts', db.select(m.StockAlert).where(m.StockAlert.resolved == False)  # noqa: E712
+            .order_by(m.StockAlert.created_date.desc()).limit(5), True),
+        ('dashboard.pending_tasks', db.select(m.WorkerTask).where(m.WorkerTask.status == 'pending')
+            .order_by(m.WorkerTask.due_date).limit(5), True),
+        ('dashboard.recent_sales', db.select(m.SalesOrder).order_by(m.SalesOrder.sale_date.desc()).limit(5), True),
+        ('reports.recent_tasks', db.select(m.WorkerTask).order_by(m.WorkerTask.assigned_date.desc()).limit(10), True),
+        ('reports.pending_payables', db.select(m.AccountsPayable).where(m.AccountsPayable.status == 'pending'), False),
+        ('reports.pending_receivables', db.select(m.AccountsReceivable)
+            .where(m.AccountsReceivable.status == 'pending'), False),
+
+        # Order lines, ledger entries and barcodes (relationship loads)
+        ('sale.lines', db.select(m.SaleItem).where(m.SaleItem.sales_order_id == 1), False),
+        ('purchase.lines', db.select(m.PurchaseItem).where(m.PurchaseItem.purchase_order_id == 1), False),
+        ('sale.receivable', db.select(m.AccountsReceivable).where(m.AccountsReceivable.sales_order_id == 1), False),
+        ('purchase.payable', db.select(m.AccountsPayable).where(m.AccountsPayable.purchase_order_id == 1), False),
+        ('sale.tax_lines', db.select(m.SaleTaxLine).where(m.SaleTaxLine.sales_order_id == 1), False),
+        ('customer.sales', db.select(m.SalesOrder).where(m.SalesOrder.customer_id == 1), False),
+        ('customer.receivables', db.select(m.AccountsReceivable).where(m.AccountsReceivable.customer_id == 1), False),
+        ('supplier.purchase_orders', db.select(m.PurchaseOrder).where(m.PurchaseOrder.supplier_id == 1), False),
+        ('employee.tasks', db.select(m.WorkerTask).where(m.WorkerTask.employee_id == 1), False),
+        ('employee.sale_items', db.select(m.SaleItem).where(m.SaleItem.employee_id == 1), False),
+        ('item.sale_items', db.select(m.SaleItem).where(m.SaleItem.item_id == 1), False),
+        ('item.barcodes', db.select(m.ItemBarcode).where(m.ItemBarcode.item_id.in_([1, 2])), False),
+
+        # Stock alerts: the views, and the per-item refresh after stock changes
+        ('update_stock_alert.delete', db.delete(m.StockAlert)
+            .where(m.StockAlert.item_id == 1, m.StockAlert.resolved == False), False),  # noqa: E712
+        ('alerts.active', db.select(m.StockAlert).where(m.StockAlert.resolved == False)  # noqa: E712
+            .order_by(m.StockAlert.created_date.desc()), True),
+        ('alerts.refresh_items', _sql(stock_alerts._REFRESH_SQL.format(item_filter='AND id IN :ids'),
+                                      ids=[1, 2], now=now), False),
+        ('alerts.refresh_locations', _sql(stock_alerts._LOCATION_REFRESH_SQL.format(item_filter=''), now=now), False),
+        ('alerts.refresh_expiry', _sql(stock_alerts._EXPIRY_REFRESH_SQL.format(item_filter=''), now=now,
+                                       today=today, horizon=today + timedelta(days=30)), False),
+
+        # Credit control and reorder engine
+        ('credit.pending_orders', credit_control.pending_orders_query(1, exclude_order_id=2).statement, False),
+        ('credit.pending_by_customer', credit_control.pending_receivables_query().statement, False),
+        ('reorder.sold_since', reorder_engine.units_sold_query(now).statement, False),
+        ('reorder.open_orders', reorder_engine.on_order_query().statement, False),
+
+        # Reference dropdowns (whole table, but from an index)
+        ('options.items', reference_data.item_options_query().statement, True),
+        ('options.customers', reference_data.options_query(m.Customer).statement, True),
+        ('options.suppliers', reference_data.options_query(m.Supplier).statement, True),
+        ('options.employees', reference_data.options_query(m.Employee).statement, True),
+
+        # Stock ledger (app.py view)
+        ('item.movements', db.select(m.StockMovement).where(m.StockMovement.item_id == 1)
+            .order_by(m.StockMovement.created_date.desc()).limit(100), True),
+
+        # Warehouses: per-location stock, rollups and transfers
+        ('warehouse.stock_page', warehouses.stock_page_query(1).statement, False),
+        ('warehouse.totals', _sql(warehouses._SUMMARY_SQL), False),
+        ('warehouse.available', warehouses.available_query([1, 2], 1).statement, False),
+        ('warehouse.item_locations', warehouses.item_locations_query([1, 2]).statement, False),
+        ('transfers.recent', db.select(m.StockTransfer).order_by(m.StockTransfer.created_date.desc()).limit(50), True),
+
+        # Barcode index fallbacks
+        ('barcodes.by_code', _sql(barcodes._FIND_BARCODE_SQL, code='x'), False),
+        ('barcodes.by_sku', _sql(barcodes._FIND_SKU_SQL, code='x'), False),
+
+        # Lots: FEFO picking loads every open lot of the items, expired ones included,
+        # and orders them in Python (lots._fefo_key)
+        ('lots.fefo_pick', lots.open_lots_query([1, 2], 1).statement, False),
+
+        # GSTR-1 summaries over a period's completed sales
+        ('gstr1.invoice_rates', _sql(tax._INVOICE_RATES_SQL, start=start.isoformat(), end=end.isoformat(),
+                                     b2cl_limit=tax.B2CL_LIMIT), False),
+        ('gstr1.b2cs', _sql(tax._B2CS_SQL, start=start.isoformat(), end=end.isoformat(),
+                            b2cl_limit=tax.B2CL_LIMIT), False),
+        ('gstr1.hsn', _sql(tax._HSN_SQL, start=start.isoformat(), end=end.isoformat()), False),
+
+        # Commission and productivity: a month's refresh, and the stored summaries
+        ('performance.refresh', _sql(commissions._REFRESH_SQL, month='2026-01', start=start, end=end,
+                                     commission_percent=1, hours=160, source_version='x', computed_at=now), False),
+        ('performance.summary', commissions.summary_query(months).statement, False),
+        ('performance.employee_months', commissions.monthly_rows_query(months, 1).statement, True),
+
+        # Tally sync page and imports (app.py views)
+        ('tally.synced_items', db.select(db.func.count()).select_from(m.Item).where(m.Item.tally_synced == True), False),  # noqa: E712
+        ('tally.unsynced_items', db.select(m.Item).where(m.Item.tally_synced == False), False),  # noqa: E712
+        ('tally.synced_sales', db.select(db.func.count()).select_from(m.SalesOrder)
+            .where(m.SalesOrder.tally_synced == True), False),  # noqa: E712
+        ('tally.recent_logs', db.select(m.TallySyncLog).order_by(m.TallySyncLog.created_date.desc()).limit(50), True),
+        ('tally.match_customer', db.select(m.Customer)
+            .where((m.Customer.name == 'x') | (m.Customer.tally_guid == 'x')).limit(1), False),
+        ('tally.match_item', db.select(m.Item).where((m.Item.sku == 'x') | (m.Item.tally_guid == 'x')).limit(1), False),
+
+        # Admin (app.py views)
+        ('login.user', db.select(m.User).where(m.User.username == 'admin', m.User.is_active == True), False),  # noqa: E712
+        ('admin.recent_logs', db.select(m.SystemLog).order_by(m.SystemLog.created_date.desc()).limit(100), True),
+        ('admin.clear_old_logs', db.delete(m.SystemLog).where(m.SystemLog.created_date < now), False),
+    ]
+
+with flask_app.app_context():
+    HOT_QUERIES = hot_queries()
+
+def explain(connection, statement):
+    # Values inline, as SQLite plans the real query with its bound values: a partial index
+    # (remaining_quantity > 0) is only usable when the planner can see the value satisfies it
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {compiled}')
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def problems(plan, ordered, index=None, allowed_scans=()):
+    found = []
+    for detail in plan:
+        scan = FULL_SCAN.match(detail)
+        if scan and scan.group(1) not in allowed_scans:
+            found.append(f'full scan of {scan.group(1)}')
+        if ordered and SORT.search(detail):
+            found.append('sorts in a temp B-tree')
+    if index and not any(f'INDEX {index} ' in f'{detail} ' for detail in plan):
+        found.append(f'does not use {index}')
+    return found
+
+@pytest.fixture(scope='module')
+def connection():
+    # One migrated, empty schema for the module: plans depend on the schema, not the rows
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.session.execute(db.text('DROP TABLE IF EXISTS schema_migrations'))
+        db.session.commit()
+        create_schema()
+        with db.engine.connect() as connection:
+            yield connection
+        db.session.remove()
+
+@pytest.mark.parametrize('name, statement, ordered', HOT_QUERIES, ids=[query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_indexes(connection, name, statement, ordered):
+    plan = explain(connection, statement)
+    assert problems(plan, ordered, EXPECTED_INDEXES.get(name), ALLOWED_SCANS.get(name, ())) == [], plan
@@ -0,0 +1,43 @@
+# tests/test_reference_data.py - Cached dropdown lists against writes from other processes
+import sqlite3
+
+from sqlalchemy import event
+
+import reference_data
+import warehouses
+from database import db
+
+def _other_process(sql, *params):
+    """Write through a separate connection, as another worker or a CLI command would"""
+    conn = sqlite3.connect(db.engine.url.database)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+def test_warehouse_added_elsewhere_is_seen_on_next_read(app):
+    assert [option.code for option in reference_data.warehouse_options()] == ['MAIN']
+    _other_process("INSERT INTO warehouse (code, name, is_default, active, created_date) "
+                   "VALUES ('WH2', 'Second', 0, 1, datetime('now'))")
+    with app.app_context():  # the next request
+        options = reference_data.warehouse_options()
+        assert {option.code for option in options} == {'MAIN', 'WH2'}
+        assert warehouses.resolve_warehouse_id(options[-1].id) == options[-1].id
+
+def test_unchanged_tables_are_served_from_cache(app):
+    reference_data.customer_options()
+    hits = reference_data.reference_cache.metrics()['entries']['customer_options']['hits']
+    reference_data.customer_options()
+    assert reference_data.reference_cache.metrics()['entries']['customer_options']['hits'] == hits + 1
+
+def test_hits_within_a_request_run_no_queries(app):
+    with app.app_context():
+        reference_data.default_warehouse_id()
+        statements = []
+        record = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            for _ in range(10):
+                reference_data.default_warehouse_id()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        assert statements == []
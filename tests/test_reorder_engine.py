@@ -0,0 +1,26 @@
+# tests/test_reorder_engine.py - Draft purchase orders from low stock
+from datetime import datetime
+
+import reorder_engine
+from database import db, Item, PurchaseOrder, Supplier
+
+class _FrozenClock(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 3, 2, 10, 15, 30)
+
+def test_runs_within_the_same_second_get_distinct_po_numbers(app, monkeypatch):
+    monkeypatch.setattr(reorder_engine, 'datetime', _FrozenClock)
+    item = Item.query.first()
+    item.current_stock, item.min_stock_level = 1, 5
+    item.preferred_supplier_id = Supplier.query.first().id
+    db.session.commit()
+
+    numbers = []
+    for _ in range(3):
+        numbers += reorder_engine.generate_draft_orders()['orders']
+        # Cancelled drafts no longer count as on order, so the next run orders the item again
+        PurchaseOrder.query.filter_by(status='draft').update({'status': 'cancelled'})
+        db.session.commit()
+    assert len(numbers) == 3 and len(set(numbers)) == 3
+    assert all(number.startswith('PO20260302101530R') for number in numbers)
@@ -0,0 +1,20 @@
+# tests/test_sales_analytics.py - Sales trends from the rollup tables
+from datetime import date, datetime, timedelta
+
+import sales_analytics
+from database import db, Customer, Employee, Item, SaleItem, SalesOrder
+
+def test_weekly_trend_covers_every_week_of_the_range(app):
+    item, employee = Item.query.first(), Employee.query.first()
+    sold_on = date(2026, 3, 11)  # a Wednesday
+    sale = SalesOrder(customer_id=Customer.query.first().id, employee_id=employee.id, invoice_number='T-TREND-1',
+                      status='completed', sale_date=datetime.combine(sold_on, datetime.min.time()), total_amount=100)
+    sale.items.append(SaleItem(item_id=item.id, employee_id=employee.id, quantity=1, unit_price=100, total_price=100))
+    db.session.add(sale)
+    db.session.flush()
+    sales_analytics.record_sale(sale)
+    db.session.commit()
+
+    trend = sales_analytics.sales_trend(sold_on - timedelta(days=21), sold_on + timedelta(days=21), 'week')
+    assert list(trend['period']) == [str(date(2026, 2, 16) + timedelta(weeks=week)) for week in range(7)]
+    assert list(trend['quantity']) == [0, 0, 0, 1, 0, 0, 0]
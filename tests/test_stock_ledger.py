@@ -0,0 +1,22 @@
+# tests/test_stock_ledger.py - Movement timestamps against report dates, movement history endpoint
+from datetime import datetime, timedelta
+
+import stock_ledger
+from database import db, Item, StockMovement
+
+def test_movements_are_stamped_in_local_time(app, ahead_of_utc):
+    item = Item.query.first()
+    stock_ledger.record_movement(item.id, 3, 'adjustment')
+    db.session.commit()
+    movement = StockMovement.query.order_by(StockMovement.id.desc()).first()
+    assert abs(movement.created_date - datetime.now()) < timedelta(minutes=1)
+    # the stock-at report's cut-off for today counts it
+    today_end = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(days=1, microseconds=-1)
+    assert stock_ledger.stock_at(today_end, item.id) == stock_ledger.stock_at(datetime.now(), item.id)
+
+def test_movement_history_limit_is_parsed_and_clamped(app, client):
+    item = Item.query.first()
+    for limit in ('abc', '-5', '100000'):
+        response = client.get(f'/items/{item.id}/movements?limit={limit}')
+        assert response.status_code == 200
+    assert len(client.get(f'/items/{item.id}/movements?limit=0').get_json()) <= 1
@@ -0,0 +1,96 @@
+# user_cache.py - Short-lived cache of logged-in users for the Flask-Login user loader
+from flask_login import UserMixin
+from database import User
+from cache import LRUCache, RedisCache, commit_listeners
+
+USER_CACHE_TTL = 30
+
+class CachedUser(UserMixin):
+    """Read-only stand-in for User built from cached columns. The password hash is
+    never cached; code that needs it or wants to modify the user loads User itself.
+    """
+    FIELDS = ('id', 'username', 'role', 'email', 'phone', 'is_active')
+
+    def __init__(self, fields):
+        self.id = fields['id']
+        self.username = fields['username']
+        self.role = fields['role']
+        self.email = fields['email']
+        self.phone = fields['phone']
+        self._active = fields['is_active']
+
+    @property
+    def is_active(self):
+        return bool(self._active)
+
+class UserCache:
+    """User rows keyed by id with a short TTL.
+
+    Writes to the user table drop the whole cache when they commit, and the TTL
+    bounds how long another worker process can keep serving an old row when the
+    in-process backend is used.
+    """
+
+    def __init__(self):
+        self.backend = LRUCache(maxsize=1024, ttl=USER_CACHE_TTL)
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        ttl = app.config.get('USER_CACHE_TTL', USER_CACHE_TTL)
+        redis_url = app.config.get('CACHE_REDIS_URL')
+        self.backend = LRUCache(maxsize=1024, ttl=ttl)
+        if redis_url:
+            try:
+                self.backend = RedisCache(redis_url, ttl=ttl, prefix='inventory:user:')
+            except ImportError:
+                pass
+        commit_listeners.append(self._on_commit)
+
+    def load(self, user_id):
+        """CachedUser for an active user, None for unknown or deactivated ones"""
+        key = str(int(user_id))
+        try:
+            found, fields = self.backend.get(key)
+        except Exception:
+            found, fields = False, None
+
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+            user = User.query.get(int(user_id))
+            # Unknown users are cached too, so a stale session cookie costs one query per TTL
+            fields = {field: getattr(user, field) for field in CachedUser.FIELDS} if user else None
+            try:
+                self.backend.set(key, fields)
+            except Exception:
+                pass
+
+        if not fields or not fields['is_active']:
+            return None
+        return CachedUser(fields)
+
+    def invalidate(self, user_id):
+        try:
+            self.backend.delete_many([str(int(user_id))])
+        except Exception:
+            pass
+
+    def _on_commit(self, tables):
+        if 'user' in tables:
+            try:
+                self.backend.clear()
+            except Exception:
+                pass
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None
+        }
+
+user_cache = UserCache()
@@ -0,0 +1,239 @@
+# warehouses.py - Stock per location, rollups across locations and transfer orders
+"""Each stock_movement row carries the warehouse it happened at; an AFTER INSERT
+trigger adds its quantity to item_stock (item x warehouse), so every ledger write -
+ORM, Core executemany or raw SQL - keeps the per-location quantities current without
+the callers knowing about them. item.current_stock remains the total across all
+locations, and movements without a warehouse land in the default one, which is how
+routes and imports that predate locations keep working.
+
+item_stock is a WITHOUT ROWID table clustered on (item_id, warehouse_id); with
+100k items x 50 locations an item's rows are adjacent, per-item rollups stream
+from the primary key and per-location listings from ix_item_stock_warehouse.
+"""
+import random
+from datetime import datetime
+from database import db, Item, Warehouse, ItemStock, StockTransfer, StockTransferItem
+import lots
+import reference_data
+import stock_ledger
+
+EPSILON = 1e-9
+
+STOCK_TRIGGERS = {
+    'trg_stock_movement_item_stock': """
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movement_item_stock AFTER INSERT ON stock_movement
+        BEGIN
+            INSERT INTO item_stock (item_id, warehouse_id, quantity)
+            VALUES (NEW.item_id,
+                    COALESCE(NEW.warehouse_id, (SELECT id FROM warehouse WHERE is_default = 1 ORDER BY id LIMIT 1)),
+                    NEW.quantity)
+            ON CONFLICT (item_id, warehouse_id) DO UPDATE SET quantity = quantity + excluded.quantity;
+        END
+    """,
+}
+
+class TransferError(Exception):
+    """A transfer order cannot be created or completed as requested"""
+
+def install_stock_triggers(execute):
+    """Create the ledger -> item_stock trigger; safe to run repeatedly (see data_versions)"""
+    for statement in STOCK_TRIGGERS.values():
+        execute(statement)
+
+def drop_stock_triggers(execute):
+    """Remove the trigger around bulk ledger loads; follow with rebuild_item_stock()"""
+    for name in STOCK_TRIGGERS:
+        execute(f"DROP TRIGGER IF EXISTS {name}")
+
+def ensure_default_warehouse():
+    """Create the default location on a new database. The caller commits."""
+    if not db.session.query(Warehouse.id).filter(Warehouse.is_default == True).first():  # noqa: E712
+        db.session.add(Warehouse(code='MAIN', name='Main Warehouse', is_default=True))
+
+def resolve_warehouse_id(warehouse_id):
+    """The given location if it exists and is active, the default location for None"""
+    if warehouse_id in (None, ''):
+        return reference_data.default_warehouse_id()
+    warehouse_id = int(warehouse_id)
+    if warehouse_id not in {option.id for option in reference_data.warehouse_options()}:
+        raise ValueError(f'Warehouse {warehouse_id} does not exist or is inactive')
+    return warehouse_id
+
+def rebuild_item_stock():
+    """Recompute item_stock from the ledger, e.g. after a bulk load with the trigger dropped"""
+    default_id = reference_data.default_warehouse_id()
+    db.session.execute(db.text("DELETE FROM item_stock"))
+    db.session.execute(db.text("""
+        INSERT INTO item_stock (item_id, warehouse_id, quantity)
+        SELECT item_id, COALESCE(warehouse_id, :default_id), SUM(quantity)
+        FROM stock_movement
+        GROUP BY item_id, COALESCE(warehouse_id, :default_id)
+    """), {'default_id': default_id})
+    db.session.commit()
+
+def check_consistency():
+    """Items whose current_stock differs from the sum of their per-location quantities"""
+    rows = db.session.execute(db.text("""
+        SELECT i.id, i.name, i.sku, i.current_stock, COALESCE(s.total, 0) AS located
+        FROM item i
+        LEFT JOIN (
+            SELECT item_id, SUM(quantity) AS total FROM item_stock GROUP BY item_id
+        ) s ON s.item_id = i.id
+        WHERE ABS(COALESCE(i.current_stock, 0) - COALESCE(s.total, 0)) > 0.000001
+    """)).all()
+    return [
+        {'id': row.id, 'name': row.name, 'sku': row.sku, 'current_stock': row.current_stock,
+         'located': row.located, 'difference': (row.current_stock or 0) - row.located}
+        for row in rows
+    ]
+
+_SUMMARY_SQL = """
+    SELECT s.warehouse_id,
+           SUM(CASE WHEN s.quantity > 0 THEN 1 ELSE 0 END) AS item_count,
+           SUM(s.quantity) AS units,
+           SUM(s.quantity * COALESCE(i.average_cost, i.cost_price)) AS value
+    FROM item_stock s
+    JOIN item i ON i.id = s.item_id
+    GROUP BY s.warehouse_id
+"""
+
+def warehouse_summaries():
+    """Per location: items held, units and value at cost, from one GROUP BY"""
+    totals = {row.warehouse_id: row for row in db.session.execute(db.text(_SUMMARY_SQL))}
+    summaries = []
+    for warehouse in Warehouse.query.order_by(Warehouse.is_default.desc(), Warehouse.name):
+        row = totals.get(warehouse.id)
+        summaries.append({
+            'warehouse': warehouse,
+            'item_count': (row.item_count or 0) if row else 0,
+            'units': (row.units or 0) if row else 0,
+            'value': (row.value or 0) if row else 0
+        })
+    return summaries
+
+def stock_page_query(warehouse_id, search=None):
+    """A location's non-zero stock rows, optionally matching a name or SKU search; unordered, unpaged"""
+    query = db.session.query(Item.id, Item.name, Item.sku, Item.category, ItemStock.quantity,
+                             ItemStock.min_stock_level, Item.current_stock) \
+        .join(ItemStock, ItemStock.item_id == Item.id) \
+        .filter(ItemStock.warehouse_id == warehouse_id, ItemStock.quantity != 0)
+    if search:
+        pattern = f'%{search}%'
+        query = query.filter(Item.name.ilike(pattern) | Item.sku.ilike(pattern))
+    return query
+
+def warehouse_stock(warehouse_id, page=1, per_page=100, search=None):
+    """One page of a location's stock, ordered by item name. Returns (rows, total)."""
+    query = stock_page_query(warehouse_id, search)
+    total = query.count()
+    rows = query.order_by(Item.name).limit(per_page).offset((page - 1) * per_page).all()
+    return rows, total
+
+def item_locations_query(item_ids):
+    return db.session.query(ItemStock.item_id, ItemStock.warehouse_id, ItemStock.quantity) \
+        .filter(ItemStock.item_id.in_(item_ids), ItemStock.quantity != 0)
+
+def item_locations(item_ids):
+    """item_id -> [(warehouse_id, quantity)] for the given items, read in primary-key order"""
+    locations = {}
+    item_ids = sorted({int(item_id) for item_id in item_ids})
+    for start in range(0, len(item_ids), 500):
+        for item_id, warehouse_id, quantity in item_locations_query(item_ids[start:start + 500]):
+            locations.setdefault(item_id, []).append((warehouse_id, quantity))
+    return locations
+
+def holds_stock(warehouse_id):
+    """Whether any item has a non-zero quantity at the location"""
+    return db.session.query(ItemStock.item_id).filter(
+        ItemStock.warehouse_id == warehouse_id, ItemStock.quantity != 0).first() is not None
+
+def available_query(item_ids, warehouse_id):
+    return db.session.query(ItemStock.item_id, ItemStock.quantity) \
+        .filter(ItemStock.warehouse_id == warehouse_id, ItemStock.item_id.in_(item_ids))
+
+def available(item_ids, warehouse_id):
+    """item_id -> quantity on hand at one location"""
+    item_ids = list({int(item_id) for item_id in item_ids})
+    if not item_ids:
+        return {}
+    return dict(available_query(item_ids, warehouse_id))
+
+def oversold(warehouse_id, item_ids):
+    """Whether any of the items is below zero at the location, after movements were written"""
+    return bool(db.session.execute(db.text("""
+        SELECT COUNT(*) FROM item_stock
+        WHERE warehouse_id = :warehouse_id AND item_id IN :item_ids AND quantity < :floor
+    """).bindparams(db.bindparam('item_ids', expanding=True)), {
+        'warehouse_id': warehouse_id, 'item_ids': sorted({int(item_id) for item_id in item_ids}), 'floor': -EPSILON
+    }).scalar())
+
+def generate_transfer_number():
+    return f"TR{datetime.now().strftime('%Y%m%d')}{random.randint(1000, 9999)}"
+
+def create_transfer(from_warehouse_id, to_warehouse_id, lines, notes=None, user_id=None):
+    """Pending transfer order for [(item_id, quantity)]; stock moves when it is completed"""
+    from_warehouse_id = resolve_warehouse_id(from_warehouse_id)
+    to_warehouse_id = resolve_warehouse_id(to_warehouse_id)
+    if from_warehouse_id == to_warehouse_id:
+        raise TransferError('Source and destination must be different warehouses')
+
+    quantities = {}
+    for item_id, quantity in lines:
+        if quantity <= 0:
+            raise TransferError('Transfer quantities must be positive')
+        quantities[int(item_id)] = quantities.get(int(item_id), 0) + quantity
+    if not quantities:
+        raise TransferError('A transfer needs at least one item')
+    known = {item_id for (item_id,) in db.session.query(Item.id).filter(Item.id.in_(quantities))}
+    if len(known) != len(quantities):
+        raise TransferError(f'Unknown items: {sorted(set(quantities) - known)}')
+
+    transfer = StockTransfer(
+        transfer_number=generate_transfer_number(),
+        from_warehouse_id=from_warehouse_id,
+        to_warehouse_id=to_warehouse_id,
+        notes=notes,
+        created_by=user_id
+    )
+    transfer.items = [StockTransferItem(item_id=item_id, quantity=quantity) for item_id, quantity in quantities.items()]
+    db.session.add(transfer)
+    return transfer
+
+def complete_transfer(transfer):
+    """Move the stock: one movement out of the source and one into the destination per line.
+
+    item.current_stock does not change, since the total across locations is the same.
+    Fails without moving anything if the source lacks stock for any line. The caller commits.
+    """
+    if transfer.status != 'pending':
+        raise TransferError(f'Transfer {transfer.transfer_number} is already {transfer.status}')
+    on_hand = available([line.item_id for line in transfer.items], transfer.from_warehouse_id)
+    short = [line for line in transfer.items if on_hand.get(line.item_id, 0) + EPSILON < line.quantity]
+    if short:
+        details = ', '.join(f'{line.item.name} (has {on_hand.get(line.item_id, 0):g}, needs {line.quantity:g})'
+                            for line in short)
+        raise TransferError(f'Not enough stock at {transfer.from_warehouse.name}: {details}')
+
+    now = datetime.now()
+    stock_ledger.record_movements([
+        {'item_id': line.item_id, 'quantity': quantity, 'movement_type': movement_type,
+         'reference_type': 'StockTransfer', 'reference_id': transfer.id, 'warehouse_id': warehouse_id,
+         'created_date': now}
+        for line in transfer.items
+        for quantity, movement_type, warehouse_id in (
+            (-line.quantity, 'transfer_out', transfer.from_warehouse_id),
+            (line.quantity, 'transfer_in', transfer.to_warehouse_id),
+        )
+    ])
+    # Re-check under the write lock the inserts took, in case another transfer or sale got there first
+    if oversold(transfer.from_warehouse_id, [line.item_id for line in transfer.items]):
+        raise TransferError(f'Stock at {transfer.from_warehouse.name} changed while the transfer was being completed')
+    for line in transfer.items:
+        lots.transfer_lots(line.item_id, line.quantity, transfer.from_warehouse_id, transfer.to_warehouse_id)
+    transfer.status = 'completed'
+    transfer.completed_date = now
+
+def cancel_transfer(transfer):
+    if transfer.status != 'pending':
+        raise TransferError(f'Transfer {transfer.transfer_number} is already {transfer.status}')
+    transfer.status = 'cancelled'